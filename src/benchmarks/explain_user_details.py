@@ -0,0 +1,192 @@
+"""
+EXPLAIN Benchmark for user_details Query Patterns
+Seeds a scratch schema with synthetic users, then compares query plans and
+execution times before and after applying migrations/add_user_details_indexes.sql.
+
+Usage:
+    DATABASE_URL=postgresql://... python benchmarks/explain_user_details.py --rows 1000000
+
+Requires the optional 'psycopg' (v3) package and a direct Postgres connection
+(PostgREST cannot run EXPLAIN ANALYZE). Everything happens in a separate
+schema, which is dropped afterwards unless --keep is given.
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from typing import Any, Dict, List, Tuple
+
+SRC_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MIGRATION = os.path.join(SRC_ROOT, 'migrations', 'add_user_details_indexes.sql')
+
+SCHEMA_SQL = """
+CREATE TABLE roles (
+    id SERIAL PRIMARY KEY,
+    role_name VARCHAR(50) UNIQUE NOT NULL,
+    role_code VARCHAR(20) UNIQUE NOT NULL,
+    description TEXT,
+    dashboard_route VARCHAR(100) NOT NULL,
+    created_at TIMESTAMP DEFAULT NOW()
+);
+
+INSERT INTO roles (role_name, role_code, description, dashboard_route) VALUES
+('User Admin', 'USER_ADMIN', 'System administrator with full access', '/dashboard/admin'),
+('PIN', 'PIN', 'Product Innovation Narrator', '/dashboard/pin'),
+('CSR Rep', 'CSR_REP', 'Customer Service Representative', '/dashboard/csr'),
+('Platform Management', 'PLATFORM_MGMT', 'Platform management team', '/dashboard/platform');
+
+CREATE TABLE users (
+    id SERIAL PRIMARY KEY,
+    username VARCHAR(50) UNIQUE NOT NULL,
+    password TEXT NOT NULL,
+    email VARCHAR(100),
+    full_name VARCHAR(100) NOT NULL,
+    role_id INTEGER NOT NULL REFERENCES roles(id),
+    is_active BOOLEAN DEFAULT TRUE,
+    last_login TIMESTAMP,
+    created_at TIMESTAMP DEFAULT NOW()
+);
+
+CREATE INDEX idx_users_username ON users(username);
+CREATE INDEX idx_users_role_id ON users(role_id);
+
+CREATE VIEW user_details AS
+SELECT u.id, u.username, u.email, u.full_name, u.is_active, u.last_login,
+       r.role_name, r.role_code, r.dashboard_route, u.created_at
+FROM users u
+JOIN roles r ON u.role_id = r.id;
+"""
+
+# Synthetic users: realistic-looking names, ~5% suspended, roles spread evenly
+SEED_SQL = """
+WITH names AS (
+    SELECT ARRAY['James','Mary','Wei','Aisha','Carlos','Priya','Liam','Sofia','Kenji','Fatima',
+                 'Noah','Olga','Mateo','Chloe','Ahmed','Yuki','Ethan','Amara','Lucas','Ines'] AS firsts,
+           ARRAY['Smith','Tan','Garcia','Khan','Nguyen','Muller','Rossi','Kim','Silva','Cohen',
+                 'Lee','Okafor','Novak','Dubois','Sato','Patel','Jensen','Lopez','Ali','Brown'] AS lasts
+)
+INSERT INTO users (username, password, email, full_name, role_id, is_active, last_login)
+SELECT lower(f) || '_' || lower(l) || i,
+       '$2b$12$benchmarkbenchmarkbenchmarkbenchmarkbenchmarkbenchmark',
+       lower(f) || '.' || lower(l) || i || '@example.com',
+       f || ' ' || l,
+       1 + (i %% 4),
+       i %% 20 <> 0,
+       NOW() - (random() * INTERVAL '365 days')
+FROM names,
+     generate_series(1, %(rows)s) AS i,
+     LATERAL (SELECT firsts[1 + (i * 7) %% 20] AS f, lasts[1 + (i * 13) %% 20] AS l) AS n
+"""
+
+# SQL equivalents of the PostgREST queries built in controller/*
+QUERIES: List[Tuple[str, str]] = [
+    ('get_user (id)', "SELECT * FROM user_details WHERE id = %(mid)s"),
+    ('login (username)', "SELECT * FROM user_details WHERE username = %(username)s"),
+    ('lookup (email)', "SELECT * FROM user_details WHERE email = %(email)s"),
+    ('get_suspended_users', "SELECT * FROM user_details WHERE is_active = false ORDER BY id"),
+    ('get_users_by_role', "SELECT * FROM user_details WHERE role_code = 'PIN' ORDER BY id LIMIT 100"),
+    ('search username ilike', "SELECT * FROM user_details WHERE username ILIKE %(pattern)s"),
+    ('search full_name ilike', "SELECT * FROM user_details WHERE full_name ILIKE %(name_pattern)s"),
+    ('search email ilike', "SELECT * FROM user_details WHERE email ILIKE %(pattern)s"),
+]
+
+
+def scan_nodes(plan: Dict[str, Any]) -> List[str]:
+    """Collect the scan node types of a JSON plan (e.g. 'Seq Scan on users')"""
+    nodes = []
+    node_type = plan.get('Node Type', '')
+    if 'Scan' in node_type:
+        relation = plan.get('Relation Name')
+        index = plan.get('Index Name')
+        label = node_type + (f' on {relation}' if relation else '')
+        nodes.append(label + (f' ({index})' if index else ''))
+    for child in plan.get('Plans', []):
+        nodes.extend(scan_nodes(child))
+    return nodes
+
+
+def explain(cursor, sql: str, params: Dict[str, Any], repeats: int) -> Dict[str, Any]:
+    """Run EXPLAIN ANALYZE several times and keep the fastest run"""
+    best = None
+    for _ in range(repeats):
+        cursor.execute(f"EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) {sql}", params)
+        result = cursor.fetchone()[0][0]
+        if best is None or result['Execution Time'] < best['Execution Time']:
+            best = result
+    return {
+        'ms': round(best['Execution Time'], 3),
+        'rows': best['Plan'].get('Actual Rows'),
+        'scans': [node for node in scan_nodes(best['Plan']) if 'roles' not in node]
+    }
+
+
+def run_all(cursor, params: Dict[str, Any], repeats: int) -> Dict[str, Dict[str, Any]]:
+    return {name: explain(cursor, sql, params, repeats) for name, sql in QUERIES}
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=1_000_000, help='synthetic users to seed (default: 1,000,000)')
+    parser.add_argument('--schema', default='bench_user_details', help='scratch schema name')
+    parser.add_argument('--repeats', type=int, default=3, help='EXPLAIN ANALYZE runs per query (fastest kept)')
+    parser.add_argument('--json', dest='json_path', help='also write the results to this JSON file')
+    parser.add_argument('--keep', action='store_true', help='keep the scratch schema afterwards')
+    args = parser.parse_args()
+
+    dsn = os.getenv('DATABASE_URL')
+    if not dsn:
+        print('DATABASE_URL must be set to a Postgres connection string')
+        return 2
+    try:
+        import psycopg
+    except ImportError:
+        print("This benchmark requires the 'psycopg' package (pip install psycopg)")
+        return 2
+
+    with psycopg.connect(dsn, autocommit=True) as conn, conn.cursor() as cursor:
+        cursor.execute(f'DROP SCHEMA IF EXISTS {args.schema} CASCADE')
+        cursor.execute(f'CREATE SCHEMA {args.schema}')
+        cursor.execute(f'SET search_path TO {args.schema}, public')
+        try:
+            cursor.execute(SCHEMA_SQL)
+            started = time.perf_counter()
+            cursor.execute(SEED_SQL, {'rows': args.rows})
+            cursor.execute('ANALYZE users')
+            cursor.execute('ANALYZE roles')
+            print(f'Seeded {args.rows:,} users in {time.perf_counter() - started:.1f}s')
+
+            cursor.execute('SELECT id, username, email FROM users WHERE id = %s', (args.rows // 2 or 1,))
+            mid, username, email = cursor.fetchone()
+            params = {'mid': mid, 'username': username, 'email': email,
+                      'pattern': f'%{username[2:8]}%', 'name_pattern': '%okafo%'}
+
+            before = run_all(cursor, params, args.repeats)
+
+            started = time.perf_counter()
+            with open(MIGRATION) as f:
+                cursor.execute(f.read())
+            print(f'Applied {os.path.basename(MIGRATION)} in {time.perf_counter() - started:.1f}s\n')
+
+            after = run_all(cursor, params, args.repeats)
+        finally:
+            if not args.keep:
+                cursor.execute(f'DROP SCHEMA IF EXISTS {args.schema} CASCADE')
+
+    print(f"{'query':<24} {'before ms':>10} {'after ms':>10} {'speedup':>8}  plan after")
+    for name, _ in QUERIES:
+        b, a = before[name], after[name]
+        speedup = b['ms'] / a['ms'] if a['ms'] else float('inf')
+        print(f"{name:<24} {b['ms']:>10.2f} {a['ms']:>10.2f} {speedup:>7.1f}x  {', '.join(a['scans'])}")
+        print(f"{'':<24} {'':>10} {'':>10} {'':>8}  plan before: {', '.join(b['scans'])}")
+
+    if args.json_path:
+        with open(args.json_path, 'w') as f:
+            json.dump({'rows': args.rows, 'before': before, 'after': after}, f, indent=2)
+        print(f'\nResults written to {args.json_path}')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
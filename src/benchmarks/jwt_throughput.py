@@ -0,0 +1,95 @@
+"""
+JWT Throughput Benchmark
+Measures tokens per second for create_access_token, create_refresh_token and
+decode_token under each available JWT backend (see security/jwt_backends.py),
+and checks that every backend accepts every other backend's tokens.
+
+Usage:
+    python benchmarks/jwt_throughput.py --iterations 20000
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from typing import Callable, Dict
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from security import jwt_utils
+from security.jwt_backends import BACKENDS, get_backend
+
+
+def tokens_per_second(fn: Callable[[], object], iterations: int, repeats: int) -> float:
+    """Best-of-repeats throughput for fn"""
+    best = float('inf')
+    for _ in range(repeats):
+        started = time.perf_counter()
+        for _ in range(iterations):
+            fn()
+        best = min(best, time.perf_counter() - started)
+    return iterations / best
+
+
+def bench_backend(iterations: int, repeats: int) -> Dict[str, float]:
+    access = jwt_utils.create_access_token('123', extra={'role': 'CSR_REP'})
+    return {
+        'create_access_token': tokens_per_second(
+            lambda: jwt_utils.create_access_token('123', extra={'role': 'CSR_REP'}), iterations, repeats),
+        'create_refresh_token': tokens_per_second(
+            lambda: jwt_utils.create_refresh_token('123'), iterations, repeats),
+        'decode_token': tokens_per_second(
+            lambda: jwt_utils.decode_token(access), iterations, repeats),
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--iterations', type=int, default=20_000, help='operations per measurement (default: 20,000)')
+    parser.add_argument('--repeats', type=int, default=3, help='measurements per operation, best kept (default: 3)')
+    parser.add_argument('--json', dest='json_path', help='also write the results to this JSON file')
+    args = parser.parse_args()
+
+    backends = {}
+    for name in BACKENDS:
+        try:
+            backends[name] = get_backend(name)
+        except ImportError as e:
+            print(f'Skipping {name}: {e}')
+
+    original = jwt_utils._backend
+    results = {}
+    tokens = {}
+    try:
+        for name, backend in backends.items():
+            jwt_utils.set_backend(backend)
+            tokens[name] = jwt_utils.create_access_token('123', extra={'role': 'CSR_REP'})
+            results[name] = bench_backend(args.iterations, args.repeats)
+
+        # Interoperability: every backend must accept every other backend's tokens with the same claims
+        for verifier_name, verifier in backends.items():
+            jwt_utils.set_backend(verifier)
+            for signer_name, token in tokens.items():
+                claims = jwt_utils.decode_token(token)
+                if not claims or claims['sub'] != '123' or claims['role'] != 'CSR_REP':
+                    print(f'MISMATCH: {verifier_name} rejected a token from {signer_name}')
+                    return 1
+    finally:
+        jwt_utils.set_backend(original)
+
+    operations = ['create_access_token', 'create_refresh_token', 'decode_token']
+    print(f"\n{'backend':<8}" + ''.join(f'{op:>22}' for op in operations))
+    for name, ops in results.items():
+        print(f'{name:<8}' + ''.join(f'{ops[op]:>16,.0f} tok/s' for op in operations))
+    print(f"\nAll {len(backends)} backends interoperate ({jwt_utils.JWT_ALGORITHM}).")
+
+    if args.json_path:
+        with open(args.json_path, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f'Results written to {args.json_path}')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
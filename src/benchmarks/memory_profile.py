@@ -0,0 +1,277 @@
+"""
+Memory Benchmark for User Listing and Search
+Measures, with tracemalloc, the peak and retained Python allocations of the
+full user listing and the search controllers at a given number of synthetic
+users, from the PostgREST response body to the rendered JSON response, and
+compares them with stored baselines.
+
+Usage:
+    python benchmarks/memory_profile.py                       # 10k and 100k users, compare with baselines
+    python benchmarks/memory_profile.py --sizes 1000000       # 1M users (needs several GB of RAM)
+    python benchmarks/memory_profile.py --update-baseline     # accept the current numbers
+
+Supabase is replaced by an in-process table that returns the encoded JSON
+body PostgREST would send, so the numbers cover everything this process
+allocates (body, parsed rows, User objects, dicts, rendered response) and
+nothing else. Baselines live in benchmarks/baselines/memory.json, per Python
+minor version, because object sizes differ between versions.
+"""
+
+import argparse
+import asyncio
+import gc
+import json
+import os
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+from typing import Any, Callable, Dict, List
+
+SRC_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, SRC_ROOT)
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+from controller.search_user_account_controller import SearchUserAccountController
+from controller.user_account_controller import ViewUserAccountController
+from data.circuit_breaker import CircuitBreaker
+from data.data_client import DataClient
+from scripts.generate_users import DEFAULT_ROLE_IDS, DEFAULT_ROLE_WEIGHTS, generate_rows, parse_role_weights
+
+BASELINE_PATH = os.path.join(SRC_ROOT, 'benchmarks', 'baselines', 'memory.json')
+DEFAULT_SIZES = (10_000, 100_000)
+
+# user_details columns the controllers filter on, in SyntheticTable.keys order
+FILTER_COLUMNS = {'username': 0, 'full_name': 1, 'email': 2, 'role_code': 3}
+
+ROLES = {
+    1: ('User Admin', 'USER_ADMIN', '/dashboard/admin'),
+    2: ('PIN', 'PIN', '/dashboard/pin'),
+    3: ('CSR Rep', 'CSR_REP', '/dashboard/csr'),
+    4: ('Platform Management', 'PLATFORM_MGMT', '/dashboard/platform'),
+}
+
+# Run-to-run noise (event loop and worker thread setup, interned strings, type caches)
+# is allowed on top of the relative tolerance, so small scenarios do not flap
+SLACK_BYTES = 512 * 1024
+
+
+class SyntheticTable:
+    """user_details rows, pre-encoded as the JSON PostgREST returns, plus lower-cased filter keys"""
+
+    def __init__(self, count: int, seed: int = 42):
+        role_ids, weights = parse_role_weights(DEFAULT_ROLE_WEIGHTS, DEFAULT_ROLE_IDS)
+        # Fixed clock so row lengths (and therefore the baselines) do not depend on when this runs
+        epoch = datetime(2025, 1, 1)
+        self.rows: List[bytes] = []
+        self.keys: List[tuple] = []
+        generated = generate_rows(count, 1, ['x'], role_ids, weights, 0.1, 'example.com', seed, now=epoch)
+        for user_id, (username, _, email, full_name, role_id, is_active, last_login, created_at) in enumerate(generated, 1):
+            role_name, role_code, dashboard_route = ROLES[role_id]
+            self.rows.append(json.dumps({
+                'id': user_id,
+                'username': username,
+                'email': email,
+                'full_name': full_name,
+                'is_active': is_active,
+                'last_login': last_login.isoformat(timespec='microseconds') if last_login else None,
+                'role_name': role_name,
+                'role_code': role_code,
+                'dashboard_route': dashboard_route,
+                'created_at': created_at.isoformat(timespec='microseconds'),
+                'updated_at': created_at.isoformat(timespec='microseconds'),
+                'version': 1
+            }, separators=(',', ':')).encode())
+            self.keys.append((username.lower(), full_name.lower(), email.lower(), role_code.lower()))
+
+
+class SyntheticQuery:
+    """Supports the eq/ilike/order chains the listing and search controllers build"""
+
+    def __init__(self, table: SyntheticTable):
+        self.table = table
+        self.filters = []
+
+    def eq(self, column: str, value: Any) -> 'SyntheticQuery':
+        self.filters.append((FILTER_COLUMNS[column], str(value).lower(), True))
+        return self
+
+    def ilike(self, column: str, pattern: str) -> 'SyntheticQuery':
+        self.filters.append((FILTER_COLUMNS[column], pattern.strip('%').lower(), False))
+        return self
+
+    def __getattr__(self, name: str) -> Callable[..., 'SyntheticQuery']:
+        # select('*'), order('id'): rows are already in id order
+        return lambda *args, **kwargs: self
+
+    def execute(self) -> Any:
+        # Encoded body as received from PostgREST, then parsed the way postgrest-py does
+        parts = [b'[']
+        for row, keys in zip(self.table.rows, self.table.keys):
+            if all(keys[i] == value if exact else value in keys[i] for i, value, exact in self.filters):
+                parts.append(row)
+                parts.append(b',')
+        parts[-1] = b']' if len(parts) > 1 else b'[]'
+        body = b''.join(parts)
+        del parts
+        return type('Response', (), {'data': json.loads(body)})()
+
+
+class SyntheticClient:
+    def __init__(self, table: SyntheticTable):
+        self._table = table
+
+    def table(self, name: str) -> SyntheticQuery:
+        return SyntheticQuery(self._table)
+
+    from_ = table
+
+
+def render(users: List[Any]) -> bytes:
+    """Response body as main.py's routes produce it"""
+    return JSONResponse(jsonable_encoder({'success': True, 'users': [user.to_dict() for user in users]})).body
+
+
+def scenarios(data_client: DataClient) -> Dict[str, Callable[[], bytes]]:
+    view = ViewUserAccountController(data_client)
+    search = SearchUserAccountController(data_client)
+    return {
+        # GET /api/users
+        'list_users': lambda: render(asyncio.run(view.get_all_users())),
+        # POST /api/users/search: a short query matches most rows in all three searched columns
+        'search_users_broad': lambda: render(asyncio.run(view.search_users('a'))),
+        'search_users_narrow': lambda: render(asyncio.run(view.search_users('smith'))),
+        'search_users_by_role': lambda: render(search.search_users_by_role('an', 'CSR_REP')),
+    }
+
+
+def measure(fn: Callable[[], bytes]) -> Dict[str, int]:
+    """
+    Peak and retained traced allocations of one call.
+
+    Retained is what is still allocated after the response is dropped:
+    caches and leaks, which should stay near zero.
+    """
+    gc.collect()
+    tracemalloc.start()
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        body = fn()
+        peak = tracemalloc.get_traced_memory()[1] - before
+        response_bytes = len(body)
+        del body
+        gc.collect()
+        retained = tracemalloc.get_traced_memory()[0] - before
+    finally:
+        tracemalloc.stop()
+    return {'peak_bytes': peak, 'retained_bytes': max(retained, 0), 'response_bytes': response_bytes}
+
+
+def run(sizes: List[int], seed: int = 42) -> Dict[str, Dict[str, Dict[str, int]]]:
+    """
+    Measure every scenario at every size.
+
+    Returns:
+        {size: {scenario: {'peak_bytes', 'retained_bytes', 'response_bytes'}}}
+    """
+    results = {}
+    for size in sizes:
+        table = SyntheticTable(size, seed)
+        data_client = DataClient(SyntheticClient(table), breaker=CircuitBreaker('memory-benchmark'))
+        results[str(size)] = {}
+        for name, fn in scenarios(data_client).items():
+            started = time.perf_counter()
+            results[str(size)][name] = measure(fn)
+            print(f'{size:>9,} users  {name:<22} {_mib(results[str(size)][name]["peak_bytes"]):>10} peak  '
+                  f'({time.perf_counter() - started:.1f}s)', flush=True)
+        del table, data_client
+    return results
+
+
+def python_version() -> str:
+    return f'{sys.version_info.major}.{sys.version_info.minor}'
+
+
+def load_baselines(path: str = BASELINE_PATH) -> Dict[str, Any]:
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+
+def compare(results: Dict[str, Dict[str, Dict[str, int]]], baseline: Dict[str, Dict[str, Dict[str, int]]],
+            tolerance: float) -> List[str]:
+    """
+    Regressions against a baseline for the same Python version.
+
+    Args:
+        results: Output of run()
+        baseline: Stored results for this Python version
+        tolerance: Allowed relative growth of peak and retained bytes (0.1 = 10%)
+
+    Returns:
+        One message per regression (empty if none)
+    """
+    regressions = []
+    for size, measured in results.items():
+        for name, stats in measured.items():
+            expected = baseline.get(size, {}).get(name)
+            if expected is None:
+                continue
+            for metric in ('peak_bytes', 'retained_bytes'):
+                limit = expected[metric] * (1 + tolerance) + SLACK_BYTES
+                if stats[metric] > limit:
+                    regressions.append(f'{name} at {int(size):,} users: {metric} {_mib(stats[metric])} '
+                                       f'> baseline {_mib(expected[metric])} (+{tolerance:.0%})')
+    return regressions
+
+
+def _mib(value: int) -> str:
+    return f'{value / 2**20:,.1f} MiB'
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', default=','.join(map(str, DEFAULT_SIZES)),
+                        help='comma-separated user counts (default: 10000,100000)')
+    parser.add_argument('--tolerance', type=float, default=0.10, help='allowed growth over baseline (default: 0.10)')
+    parser.add_argument('--update-baseline', action='store_true', help='store these results as the baseline')
+    parser.add_argument('--seed', type=int, default=42, help='random seed for the synthetic users (default: 42)')
+    args = parser.parse_args()
+
+    sizes = [int(size) for size in args.sizes.split(',') if size.strip()]
+    results = run(sizes, args.seed)
+
+    print(f"\n{'users':>9}  {'scenario':<22}{'peak':>14}{'retained':>14}{'response':>14}{'peak/user':>12}")
+    for size, measured in results.items():
+        for name, stats in measured.items():
+            print(f'{int(size):>9,}  {name:<22}{_mib(stats["peak_bytes"]):>14}{_mib(stats["retained_bytes"]):>14}'
+                  f'{_mib(stats["response_bytes"]):>14}{stats["peak_bytes"] / int(size):>10,.0f} B')
+
+    baselines = load_baselines()
+    version = python_version()
+    if args.update_baseline:
+        stored = baselines.setdefault(version, {})
+        stored.update(results)
+        os.makedirs(os.path.dirname(BASELINE_PATH), exist_ok=True)
+        with open(BASELINE_PATH, 'w') as f:
+            json.dump(baselines, f, indent=2, sort_keys=True)
+            f.write('\n')
+        print(f'\nBaseline for Python {version} written to {BASELINE_PATH}')
+        return 0
+
+    if version not in baselines:
+        print(f'\nNo baseline for Python {version}; run with --update-baseline to create one')
+        return 0
+    regressions = compare(results, baselines[version], args.tolerance)
+    for message in regressions:
+        print(f'REGRESSION: {message}')
+    if not regressions:
+        print(f'\nWithin {args.tolerance:.0%} of the Python {version} baseline.')
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
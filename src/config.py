@@ -18,8 +18,12 @@ def load_config():
     for port in env_config['frontendPorts']:
         origins.append(f"http://{env_config['backendHost']}:{port}")
     
+    # Read replicas: [{"name": "replica-1", "url": "https://<replica>.supabase.co", "keyEnv": "SUPABASE_KEY"}]
     return {
         'CORS_ORIGINS': origins,
         'BACKEND_PORT': env_config['backendPort'],
-        'BACKEND_HOST': env_config['backendHost']
+        'BACKEND_HOST': env_config['backendHost'],
+        'READ_REPLICAS': env_config.get('readReplicas', []),
+        'MAX_REPLICA_LAG_SECONDS': env_config.get('maxReplicaLagSeconds', 5),
+        'READ_YOUR_WRITES_SECONDS': env_config.get('readYourWritesSeconds', 5)
     }
\ No newline at end of file
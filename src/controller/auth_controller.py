@@ -3,13 +3,17 @@ Authentication Controller - Control Layer (BCE Framework)
 Handles authentication and role-based authorization
 """
 
-from typing import Optional
-from supabase import create_client, Client
+from typing import Optional, Set
+from supabase import Client
+import asyncio
 import os
 from dotenv import load_dotenv
-import bcrypt
 from entity.user import User
 from entity.auth_response import AuthResponse
+from data.change_tracker import change_tracker
+from data.data_client import get_data_client
+from data.hedging import hedged_reads
+from security import password_hashing
 
 # Load environment variables
 load_dotenv()
@@ -29,21 +33,43 @@ class AuthController:
         if not supabase_url or not supabase_key:
             raise ValueError("SUPABASE_URL and SUPABASE_KEY must be set in environment variables")
         
-        self.supabase: Client = create_client(supabase_url, supabase_key)
+        # Same DataClient as the CRUD controllers: one set of replicas, breakers and metrics
+        self.supabase: Client = get_data_client()
+        # Strong references so pending rehash tasks are not garbage collected
+        self._rehash_tasks: Set[asyncio.Task] = set()
     
     def hash_password(self, password: str) -> str:
         """Hash a password using bcrypt"""
-        salt = bcrypt.gensalt()
-        hashed = bcrypt.hashpw(password.encode('utf-8'), salt)
-        return hashed.decode('utf-8')
+        return password_hashing.hash_password(password)
     
     def verify_password(self, plain_password: str, hashed_password: str) -> bool:
-        """Verify a password against a hashed password"""
+        """Verify a password against a hashed (or legacy plaintext) password"""
+        return password_hashing.verify_password(plain_password, hashed_password)
+
+    def schedule_rehash(self, user_id: int, password: str, stored_password: str) -> None:
+        """
+        Rehash a password in the background after a successful login.
+
+        Used when the stored value is legacy plaintext or was hashed at a
+        different cost than BCRYPT_ROUNDS, so the cost can change without a
+        forced password reset and without adding hash time to the login.
+        """
+        task = asyncio.create_task(self._rehash(user_id, password, stored_password))
+        self._rehash_tasks.add(task)
+        task.add_done_callback(self._rehash_tasks.discard)
+
+    async def _rehash(self, user_id: int, password: str, stored_password: str) -> None:
         try:
-            return bcrypt.checkpw(plain_password.encode('utf-8'), hashed_password.encode('utf-8'))
+            new_hash = await asyncio.to_thread(password_hashing.hash_password, password)
+            # Conditional on the old value, so a password changed meanwhile by an admin is never overwritten
+            response = await asyncio.to_thread(
+                self.supabase.table("users").update({"password": new_hash})
+                .eq("id", user_id).eq("password", stored_password).execute
+            )
+            if response.data:
+                change_tracker.record('users', 'rehashed', user_id)
         except Exception as e:
-            print(f"Password verification error: {e}")
-            return False
+            print(f"Password rehash error for user {user_id}: {e}")
     
     async def login(self, username: str, password: str, role_code: Optional[str] = None) -> AuthResponse:
         """
@@ -55,7 +81,9 @@ class AuthController:
             query = self.supabase.table("user_details").select("*").eq("username", username)
             if role_code:
                 query = query.eq("role_code", role_code)
-            response = query.execute()
+            # Critical-path read: hedged against a slow replica/connection when enabled
+            with hedged_reads():
+                response = await asyncio.to_thread(query.execute)
 
             if not response.data or len(response.data) == 0:
                 return AuthResponse(
@@ -74,7 +102,9 @@ class AuthController:
                 )
 
             # Get password from users table
-            password_response = self.supabase.table("users").select("password").eq("username", username).execute()
+            password_response = await asyncio.to_thread(
+                self.supabase.table("users").select("password").eq("username", username).execute
+            )
 
             if not password_response.data:
                 return AuthResponse(
@@ -84,27 +114,24 @@ class AuthController:
 
             stored_password = password_response.data[0].get('password')
 
-            # Check if password is hashed
-            is_hashed = stored_password and stored_password.startswith(('$2b$', '$2a$', '$2y$'))
-
-            if is_hashed:
-                if not self.verify_password(password, stored_password):
-                    return AuthResponse(
-                        success=False,
-                        message="Invalid username or password"
-                    )
-            else:
-                # Plain text comparison (backward compatibility)
-                if password != stored_password:
-                    return AuthResponse(
-                        success=False,
-                        message="Invalid username or password"
-                    )
+            # bcrypt is CPU-bound; keep it off the event loop
+            if not await asyncio.to_thread(self.verify_password, password, stored_password):
+                return AuthResponse(
+                    success=False,
+                    message="Invalid username or password"
+                )
+
+            # Plaintext (seed data) or outdated cost: upgrade the hash without delaying the response
+            if password_hashing.needs_rehash(stored_password):
+                self.schedule_rehash(user_data.get('id'), password, stored_password)
 
             # Update last login
-            self.supabase.table("users").update({
-                "last_login": "now()"
-            }).eq("id", user_data.get('id')).execute()
+            await asyncio.to_thread(
+                self.supabase.table("users").update({
+                    "last_login": "now()"
+                }).eq("id", user_data.get('id')).execute
+            )
+            change_tracker.record('users', 'login', user_data.get('id'))
 
             # Create user object with role information
             user = User.from_db(user_data)
@@ -5,7 +5,10 @@ Use Case: As a user admin, I want to create user accounts so that the users can
 
 from typing import Dict, Any
 from supabase import Client
-import bcrypt
+from postgrest.exceptions import APIError
+from security import password_hashing
+from data.change_tracker import change_tracker
+from data.db_errors import unique_violation_field, is_foreign_key_violation
 
 
 class CreateUserAccountController:
@@ -27,9 +30,7 @@ class CreateUserAccountController:
         Returns:
             Hashed password string
         """
-        salt = bcrypt.gensalt()
-        hashed = bcrypt.hashpw(password.encode('utf-8'), salt)
-        return hashed.decode('utf-8')
+        return password_hashing.hash_password(password)
 
     def validate_username(self, username: str) -> bool:
         """
@@ -70,40 +71,6 @@ class CreateUserAccountController:
         """
         return email and '@' in email and '.' in email
 
-    def check_username_exists(self, username: str) -> bool:
-        """
-        Check if username already exists in the database.
-        
-        Args:
-            username: Username to check
-            
-        Returns:
-            True if exists, False otherwise
-        """
-        try:
-            existing = self.supabase.table('users').select('id').eq('username', username).execute()
-            return bool(existing.data)
-        except Exception as e:
-            print(f"Error checking username: {e}")
-            return False
-
-    def check_email_exists(self, email: str) -> bool:
-        """
-        Check if email already exists in the database.
-        
-        Args:
-            email: Email to check
-            
-        Returns:
-            True if exists, False otherwise
-        """
-        try:
-            existing = self.supabase.table('users').select('id').eq('email', email).execute()
-            return bool(existing.data)
-        except Exception as e:
-            print(f"Error checking email: {e}")
-            return False
-
     def create_user(self, username: str, password: str, full_name: str, email: str, role_id: int) -> Dict[str, Any]:
         """
         Create a new user account.
@@ -117,6 +84,11 @@ class CreateUserAccountController:
             
         Returns:
             Dictionary with success status, message, and user data if successful
+
+        Note:
+        - Inserts directly and lets the unique constraints on username and
+          lower(email) reject duplicates (no check_*_exists round-trips,
+          and no race between the check and the insert)
         """
         try:
             # Validate inputs
@@ -144,33 +116,40 @@ class CreateUserAccountController:
                     'message': 'Full name is required (minimum 2 characters).'
                 }
 
-            # Check for duplicates
-            if self.check_username_exists(username):
-                return {
-                    'success': False,
-                    'message': 'Username already exists. Please choose a different username.'
-                }
-
-            if self.check_email_exists(email):
-                return {
-                    'success': False,
-                    'message': 'Email already exists. Please use a different email address.'
-                }
-
             # Hash password
             hashed_password = self.hash_password(password)
 
             # Insert user into database
-            result = self.supabase.table('users').insert({
-                'username': username,
-                'password': hashed_password,
-                'full_name': full_name,
-                'email': email,
-                'role_id': role_id,
-                'is_active': True
-            }).execute()
+            try:
+                result = self.supabase.table('users').insert({
+                    'username': username,
+                    'password': hashed_password,
+                    'full_name': full_name,
+                    'email': email,
+                    'role_id': role_id,
+                    'is_active': True
+                }).execute()
+            except APIError as e:
+                field = unique_violation_field(e, ('username', 'email'))
+                if field == 'username':
+                    return {
+                        'success': False,
+                        'message': 'Username already exists. Please choose a different username.'
+                    }
+                if field == 'email':
+                    return {
+                        'success': False,
+                        'message': 'Email already exists. Please use a different email address.'
+                    }
+                if is_foreign_key_violation(e):
+                    return {
+                        'success': False,
+                        'message': 'Role not found.'
+                    }
+                raise
 
             if result.data:
+                change_tracker.record('users', 'created', result.data[0].get('id'))
                 return {
                     'success': True,
                     'message': 'User account created successfully.',
@@ -7,7 +7,8 @@ from typing import Optional
 from supabase import Client
 from entity.user import User
 from entity.auth_response import AuthResponse
-import bcrypt
+from data.change_tracker import change_tracker
+from security import password_hashing
 from datetime import datetime, timedelta
 from jose import jwt
 import os
@@ -26,15 +27,8 @@ class LoginController:
         self.ACCESS_TOKEN_EXPIRE_MINUTES = 60
 
     def verify_password(self, plain_password: str, hashed_password: str) -> bool:
-        """Verify a password against a bcrypt hash"""
-        try:
-            return bcrypt.checkpw(
-                plain_password.encode('utf-8'),
-                hashed_password.encode('utf-8')
-            )
-        except Exception as e:
-            print(f"Password verification error: {e}")
-            return False
+        """Verify a password against a bcrypt hash (or legacy plaintext value)"""
+        return password_hashing.verify_password(plain_password, hashed_password)
 
     def create_access_token(self, data: dict) -> str:
         """Create a JWT access token"""
@@ -90,27 +84,17 @@ class LoginController:
 
             stored_password = password_response.data[0].get('password')
 
-            # Check if password is hashed
-            is_hashed = stored_password and stored_password.startswith(('$2b$', '$2a$', '$2y$'))
-
-            if is_hashed:
-                if not self.verify_password(password, stored_password):
-                    return AuthResponse(
-                        success=False,
-                        message="Invalid username or password"
-                    )
-            else:
-                # Plain text comparison (backward compatibility)
-                if password != stored_password:
-                    return AuthResponse(
-                        success=False,
-                        message="Invalid username or password"
-                    )
+            if not self.verify_password(password, stored_password):
+                return AuthResponse(
+                    success=False,
+                    message="Invalid username or password"
+                )
 
             # Update last login
             self.supabase.table("users").update({
                 "last_login": "now()"
             }).eq("id", user_data.get('id')).execute()
+            change_tracker.record('users', 'login', user_data.get('id'))
 
             # Create user object with role information
             user = User.from_db(user_data)
@@ -5,6 +5,7 @@ Use Case: As a user admin, I want to suspend user accounts so that inactive user
 
 from typing import Dict, Any
 from supabase import Client
+from data.change_tracker import change_tracker
 
 
 class SuspendUserAccountController:
@@ -84,6 +85,7 @@ class SuspendUserAccountController:
             }).eq('id', user_id).execute()
 
             if result.data:
+                change_tracker.record('users', 'suspended', user_id)
                 return {
                     'success': True,
                     'message': f'User "{user_data.get("username")}" has been suspended successfully.',
@@ -136,6 +138,7 @@ class SuspendUserAccountController:
             }).eq('id', user_id).execute()
 
             if result.data:
+                change_tracker.record('users', 'activated', user_id)
                 return {
                     'success': True,
                     'message': f'User "{user_data.get("username")}" has been activated successfully.',
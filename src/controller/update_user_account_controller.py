@@ -5,7 +5,10 @@ Use Case: As a user admin, I want to update user accounts so that information st
 
 from typing import Optional, Dict, Any
 from supabase import Client
-import bcrypt
+from postgrest.exceptions import APIError
+from security import password_hashing
+from data.change_tracker import change_tracker
+from data.db_errors import unique_violation_field, is_foreign_key_violation
 
 
 class UpdateUserAccountController:
@@ -27,45 +30,35 @@ class UpdateUserAccountController:
         Returns:
             Hashed password string
         """
-        salt = bcrypt.gensalt()
-        hashed = bcrypt.hashpw(password.encode('utf-8'), salt)
-        return hashed.decode('utf-8')
+        return password_hashing.hash_password(password)
 
-    def check_username_conflict(self, user_id: int, username: str) -> bool:
+    def map_constraint_violation(self, error: APIError) -> Optional[Dict[str, Any]]:
         """
-        Check if username already exists for a different user.
+        Translate a constraint violation from the UPDATE into a user-facing result.
         
         Args:
-            user_id: Current user's ID (to exclude from check)
-            username: Username to check
+            error: Error raised by PostgREST
             
         Returns:
-            True if conflict exists, False otherwise
+            Failure dictionary, or None if the error is not a known violation
         """
-        try:
-            existing = self.supabase.table('users').select('id').eq('username', username).neq('id', user_id).execute()
-            return bool(existing.data)
-        except Exception as e:
-            print(f"Error checking username conflict: {e}")
-            return False
-
-    def check_email_conflict(self, user_id: int, email: str) -> bool:
-        """
-        Check if email already exists for a different user.
-        
-        Args:
-            user_id: Current user's ID (to exclude from check)
-            email: Email to check
-            
-        Returns:
-            True if conflict exists, False otherwise
-        """
-        try:
-            existing = self.supabase.table('users').select('id').eq('email', email).neq('id', user_id).execute()
-            return bool(existing.data)
-        except Exception as e:
-            print(f"Error checking email conflict: {e}")
-            return False
+        field = unique_violation_field(error, ('username', 'email'))
+        if field == 'username':
+            return {
+                'success': False,
+                'message': 'Username already exists. Please choose a different username.'
+            }
+        if field == 'email':
+            return {
+                'success': False,
+                'message': 'Email already exists. Please use a different email address.'
+            }
+        if is_foreign_key_violation(error):
+            return {
+                'success': False,
+                'message': 'Role not found.'
+            }
+        return None
 
     def validate_email(self, email: str) -> bool:
         """
@@ -103,26 +96,18 @@ class UpdateUserAccountController:
             
         Returns:
             Dictionary with success status, message, and updated user data if successful
+
+        Note:
+        - Runs as a single UPDATE ... RETURNING round-trip: an empty result means
+          the user does not exist, and the unique constraints on username and
+          email reject conflicts (no pre-read or conflict SELECTs)
         """
         try:
-            # Check if user exists
-            user_check = self.supabase.table('users').select('id').eq('id', user_id).execute()
-            if not user_check.data:
-                return {
-                    'success': False,
-                    'message': 'User not found.'
-                }
-
             # Build update data dictionary
             update_data = {}
 
             # Validate and add fields to update
             if username is not None:
-                if self.check_username_conflict(user_id, username):
-                    return {
-                        'success': False,
-                        'message': 'Username already exists. Please choose a different username.'
-                    }
                 update_data['username'] = username
 
             if password is not None and password.strip():
@@ -142,11 +127,6 @@ class UpdateUserAccountController:
                         'success': False,
                         'message': 'Invalid email format.'
                     }
-                if self.check_email_conflict(user_id, email):
-                    return {
-                        'success': False,
-                        'message': 'Email already exists. Please use a different email address.'
-                    }
                 update_data['email'] = email
 
             if role_id is not None:
@@ -163,9 +143,16 @@ class UpdateUserAccountController:
                 }
 
             # Perform update
-            result = self.supabase.table('users').update(update_data).eq('id', user_id).execute()
+            try:
+                result = self.supabase.table('users').update(update_data).eq('id', user_id).execute()
+            except APIError as e:
+                conflict = self.map_constraint_violation(e)
+                if conflict:
+                    return conflict
+                raise
 
             if result.data:
+                change_tracker.record('users', 'updated', user_id)
                 return {
                     'success': True,
                     'message': 'User account updated successfully.',
@@ -174,7 +161,7 @@ class UpdateUserAccountController:
             else:
                 return {
                     'success': False,
-                    'message': 'Failed to update user account.'
+                    'message': 'User not found.'
                 }
 
         except Exception as e:
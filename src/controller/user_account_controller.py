@@ -5,10 +5,27 @@ Handles user account management operations (CRUD + Search)
 
 from typing import Optional, List, Dict, Any
 from supabase import Client
+from postgrest.exceptions import APIError
 from entity.user import User
-from datetime import datetime
-import bcrypt
+from data.change_tracker import change_tracker
+from data.db_errors import unique_violation_field, is_foreign_key_violation
+from data.data_client import primary_reads
+from data.hedging import hedged_reads
+from datetime import datetime, timedelta, timezone
+import asyncio
+import os
+from security import password_hashing
 
+# updated_at comes from clock_timestamp() when the row is written, not when the transaction
+# commits, so the change-feed cursor trails the database clock by this much: a transaction that
+# commits up to this long after stamping its rows is still picked up by the next poll
+CHANGE_FEED_SAFETY_LAG = timedelta(seconds=float(os.getenv('CHANGE_FEED_SAFETY_LAG_SECONDS', '10')))
+# Rows (and, separately, tombstones) per change-feed page. A full page ends at its last
+# timestamp and the next one starts there (gte), so a page must be larger than any set of
+# rows sharing one clock_timestamp() value
+CHANGE_FEED_PAGE_SIZE = 1000
+CHANGE_FEED_MIN_PAGE_SIZE = 100
+CHANGE_FEED_MAX_PAGE_SIZE = 5000
 
 
 # CreateUserAccountController: Handles user creation
@@ -17,25 +34,32 @@ class CreateUserAccountController:
         self.supabase = supabase_client
 
     def hash_password(self, password: str) -> str:
-        salt = bcrypt.gensalt()
-        hashed = bcrypt.hashpw(password.encode('utf-8'), salt)
-        return hashed.decode('utf-8')
+        return password_hashing.hash_password(password)
 
     async def create_user(self, username: str, password: str, full_name: str, email: str, role_id: int) -> Dict[str, Any]:
         try:
-            existing = self.supabase.table('users').select('id').eq('username', username).execute()
-            if existing.data:
-                return {'success': False, 'message': 'Username already exists'}
-            hashed_password = self.hash_password(password)
-            result = self.supabase.table('users').insert({
-                'username': username,
-                'password': hashed_password,
-                'full_name': full_name,
-                'email': email,
-                'role_id': role_id,
-                'is_active': True
-            }).execute()
+            # No pre-select: the unique constraints reject duplicates atomically, even under concurrent creates
+            hashed_password = await asyncio.to_thread(self.hash_password, password)
+            try:
+                result = self.supabase.table('users').insert({
+                    'username': username,
+                    'password': hashed_password,
+                    'full_name': full_name,
+                    'email': email,
+                    'role_id': role_id,
+                    'is_active': True
+                }).execute()
+            except APIError as e:
+                field = unique_violation_field(e, ('username', 'email'))
+                if field == 'username':
+                    return {'success': False, 'message': 'Username already exists'}
+                if field == 'email':
+                    return {'success': False, 'message': 'Email already exists'}
+                if is_foreign_key_violation(e):
+                    return {'success': False, 'message': 'Role not found.'}
+                raise
             if result.data:
+                change_tracker.record('users', 'created', result.data[0].get('id'))
                 return {'success': True, 'message': 'User created successfully', 'user': result.data[0]}
             else:
                 return {'success': False, 'message': 'Failed to create user'}
@@ -49,29 +73,40 @@ class ViewUserAccountController:
 
     async def get_user(self, user_id: int) -> Optional[User]:
         try:
-            result = self.supabase.from_('user_details').select('*').eq('id', user_id).execute()
-            if result.data and len(result.data) > 0:
-                user_data = result.data[0]
-                return User(
-                    id=user_data['id'],
-                    username=user_data['username'],
-                    full_name=user_data['full_name'],
-                    email=user_data.get('email'),
-                    role_id=user_data.get('role_id'),
-                    role_name=user_data.get('role_name'),
-                    role_code=user_data.get('role_code'),
-                    dashboard_route=user_data.get('dashboard_route'),
-                    is_active=user_data.get('is_active', True),
-                    last_login=user_data.get('last_login')
-                )
-            return None
+            return await self.lookup_user(user_id)
         except Exception as e:
             print(f"Error fetching user: {e}")
             return None
 
+    async def lookup_user(self, user_id: int) -> Optional[User]:
+        """
+        Like get_user, but data-layer errors propagate instead of reading as
+        'no such user' (for callers that must not treat an outage as a deletion).
+        """
+        # Run the blocking PostgREST call off the event loop so concurrent reads can overlap;
+        # single-user lookups are on the critical path, so they may be hedged
+        with hedged_reads():
+            result = await asyncio.to_thread(self.supabase.from_('user_details').select('*').eq('id', user_id).execute)
+        if result.data and len(result.data) > 0:
+            user_data = result.data[0]
+            return User(
+                id=user_data['id'],
+                username=user_data['username'],
+                full_name=user_data['full_name'],
+                email=user_data.get('email'),
+                role_id=user_data.get('role_id'),
+                role_name=user_data.get('role_name'),
+                role_code=user_data.get('role_code'),
+                dashboard_route=user_data.get('dashboard_route'),
+                is_active=user_data.get('is_active', True),
+                last_login=user_data.get('last_login'),
+                version=user_data.get('version')
+            )
+        return None
+
     async def get_all_users(self) -> List[User]:
         try:
-            result = self.supabase.from_('user_details').select('*').order('id').execute()
+            result = await asyncio.to_thread(self.supabase.from_('user_details').select('*').order('id').execute)
             users = []
             if result.data:
                 for user_data in result.data:
@@ -89,8 +124,9 @@ class ViewUserAccountController:
                     ))
             return users
         except Exception as e:
+            # Re-raise rather than return [] so an outage is never served (and ETag-cached) as an empty list
             print(f"Error fetching users: {e}")
-            return []
+            raise
 
     async def search_users(self, query: str) -> List[User]:
         try:
@@ -99,9 +135,9 @@ class ViewUserAccountController:
                 return await self.get_all_users()
 
             query_str = f"%{query}%"
-            usernames = self.supabase.from_('user_details').select('*').ilike('username', query_str).execute()
-            fullnames = self.supabase.from_('user_details').select('*').ilike('full_name', query_str).execute()
-            emails = self.supabase.from_('user_details').select('*').ilike('email', query_str).execute()
+            usernames = await asyncio.to_thread(self.supabase.from_('user_details').select('*').ilike('username', query_str).execute)
+            fullnames = await asyncio.to_thread(self.supabase.from_('user_details').select('*').ilike('full_name', query_str).execute)
+            emails = await asyncio.to_thread(self.supabase.from_('user_details').select('*').ilike('email', query_str).execute)
 
             # Merge results, avoid duplicates by id
             seen = set()
@@ -129,9 +165,73 @@ class ViewUserAccountController:
             print(f"Error searching users: {e}")
             return []
 
+    async def get_user_changes(self, since: Optional[str] = None, limit: int = CHANGE_FEED_PAGE_SIZE) -> Dict[str, Any]:
+        """
+        Incremental change feed over user_details, one page at a time.
+
+        Args:
+            since: Cursor returned by a previous call; omit for a full snapshot
+            limit: Maximum users (and, separately, deleted IDs) per page (clamped to 100-5000)
+
+        Returns:
+            Dictionary with changed users, deleted user IDs, the next cursor and
+            has_more (call again with the cursor right away when True)
+        """
+        since_dt = None
+        if since:
+            try:
+                since_dt = datetime.fromisoformat(since)
+            except ValueError:
+                return {'success': False, 'message': 'Invalid cursor'}
+            if since_dt.tzinfo is None:
+                since_dt = since_dt.replace(tzinfo=timezone.utc)
+        limit = max(CHANGE_FEED_MIN_PAGE_SIZE, min(limit, CHANGE_FEED_MAX_PAGE_SIZE))
+
+        try:
+            # Rows and clock from the same place: a lagging replica could hide rows older than its clock
+            with primary_reads():
+                now = await asyncio.to_thread(self.supabase.rpc('change_feed_now', read_only=True).execute)
+                query = self.supabase.from_('user_details').select('*')
+                if since_dt:
+                    # gte, not gt: rows sharing the cursor timestamp are re-sent rather than missed
+                    query = query.gte('updated_at', since_dt.isoformat())
+                result = await asyncio.to_thread(query.order('updated_at').limit(limit).execute)
+                rows = result.data or []
+
+                tombstones = []
+                if since_dt:
+                    deleted = await asyncio.to_thread(
+                        self.supabase.table('user_tombstones').select('user_id, deleted_at')
+                        .gte('deleted_at', since_dt.isoformat()).order('deleted_at').limit(limit).execute
+                    )
+                    tombstones = deleted.data or []
+
+            # Held back by the safety lag from the database clock: rows in the window are re-sent,
+            # which clients apply idempotently, instead of late commits being lost. An idle feed
+            # still advances, so it stops re-sending the last burst
+            cursor = datetime.fromisoformat(now.data) - CHANGE_FEED_SAFETY_LAG
+            # A full page ends at its last row; the rest comes with the next call
+            if len(rows) == limit:
+                cursor = min(cursor, datetime.fromisoformat(rows[-1]['updated_at']))
+            if len(tombstones) == limit:
+                cursor = min(cursor, datetime.fromisoformat(tombstones[-1]['deleted_at']))
+            if since_dt:
+                cursor = max(cursor, since_dt)
+
+            return {
+                'success': True,
+                'users': [User.from_db(row) for row in rows],
+                'deleted': [row['user_id'] for row in tombstones],
+                'cursor': cursor.astimezone(timezone.utc).strftime('%Y-%m-%dT%H:%M:%S.%fZ'),
+                'has_more': len(rows) == limit or len(tombstones) == limit
+            }
+        except Exception as e:
+            print(f"Error fetching user changes: {e}")
+            raise
+
     async def get_all_roles(self) -> List[Dict[str, Any]]:
         try:
-            result = self.supabase.table('roles').select('*').order('id').execute()
+            result = await asyncio.to_thread(self.supabase.table('roles').select('*').order('id').execute)
             return result.data if result.data else []
         except Exception as e:
             print(f"Error fetching roles: {e}")
@@ -142,7 +242,7 @@ class UpdateUserAccountController:
     def __init__(self, supabase_client: Client):
         self.supabase = supabase_client
 
-    async def update_user(self, user_id: int, full_name: Optional[str] = None, email: Optional[str] = None, role_id: Optional[int] = None, is_active: Optional[bool] = None) -> Dict[str, Any]:
+    async def update_user(self, user_id: int, full_name: Optional[str] = None, email: Optional[str] = None, role_id: Optional[int] = None, is_active: Optional[bool] = None, expected_version: Optional[int] = None) -> Dict[str, Any]:
         try:
             update_data = {}
             if full_name is not None:
@@ -155,11 +255,28 @@ class UpdateUserAccountController:
                 update_data['is_active'] = is_active
             if not update_data:
                 return {'success': False, 'message': 'No fields to update'}
-            result = self.supabase.table('users').update(update_data).eq('id', user_id).execute()
+            # Single round-trip: constraints reject conflicts, an empty RETURNING means no such user
+            # (or, with expected_version, that someone else changed it first)
+            query = self.supabase.table('users').update(update_data).eq('id', user_id)
+            if expected_version is not None:
+                query = query.eq('version', expected_version)
+            try:
+                result = query.execute()
+            except APIError as e:
+                if unique_violation_field(e, ('email',)) == 'email':
+                    return {'success': False, 'message': 'Email already exists. Please use a different email address.'}
+                if is_foreign_key_violation(e):
+                    return {'success': False, 'message': 'Role not found.'}
+                raise
             if result.data:
+                change_tracker.record('users', 'updated', user_id)
                 return {'success': True, 'message': 'User updated successfully', 'user': result.data[0]}
-            else:
-                return {'success': False, 'message': 'User not found or update failed'}
+            if expected_version is not None:
+                # Failure path only: tell a stale version apart from a missing user
+                current = self.supabase.table('users').select('id').eq('id', user_id).execute()
+                if current.data:
+                    return {'success': False, 'conflict': True, 'message': 'User was modified by another admin. Reload and try again.'}
+            return {'success': False, 'message': 'User not found.'}
         except Exception as e:
             return {'success': False, 'message': f'Error updating user: {str(e)}'}
 
@@ -172,6 +289,7 @@ class SuspendUserAccountController:
         try:
             result = self.supabase.table('users').update({'is_active': False}).eq('id', user_id).execute()
             if result.data:
+                change_tracker.record('users', 'suspended', user_id)
                 return {'success': True, 'message': 'User suspended successfully'}
             else:
                 return {'success': False, 'message': 'User not found or suspend failed'}
@@ -5,6 +5,16 @@ Use Case: As a user admin, I want to manage user profiles (roles) so that access
 
 from typing import Optional, Dict, Any, List
 from supabase import Client
+from postgrest.exceptions import APIError
+from postgrest.types import ReturnMethod
+from data.change_tracker import change_tracker
+from data.data_client import quote_logic_value
+from data.db_errors import unique_violation_field
+
+# Users moved per UPDATE statement when reassigning a role
+REASSIGN_BATCH_SIZE = 1000
+# Users deleted per DELETE statement when cascading a role delete
+CASCADE_DELETE_BATCH_SIZE = 1000
 
 
 class UserProfileController:
@@ -130,6 +140,7 @@ class UserProfileController:
             result = self.supabase.table('roles').insert(role_data).execute()
             
             if result.data and len(result.data) > 0:
+                change_tracker.record('roles', 'created', result.data[0].get('id'))
                 return {
                     'success': True,
                     'message': 'Role created successfully.',
@@ -153,7 +164,8 @@ class UserProfileController:
         role_name: Optional[str] = None,
         role_code: Optional[str] = None,
         dashboard_route: Optional[str] = None,
-        description: Optional[str] = None
+        description: Optional[str] = None,
+        expected_version: Optional[int] = None
     ) -> Dict[str, Any]:
         """
         Update an existing role.
@@ -164,39 +176,23 @@ class UserProfileController:
             role_code: New role code (optional)
             dashboard_route: New dashboard route (optional)
             description: New description (optional)
+            expected_version: Only apply if the role is still at this version (optional)
             
         Returns:
             Dictionary with success status, message, and updated role data
+            
+        Note:
+        - Runs as a single UPDATE ... RETURNING; the unique constraints on
+          role_name and role_code reject duplicates, and an empty result means
+          the role does not exist (or, with expected_version, was changed first)
         """
         try:
-            # Check if role exists
-            existing_role = self.get_role_by_id(role_id)
-            if not existing_role:
-                return {
-                    'success': False,
-                    'message': 'Role not found.'
-                }
-            
             update_data = {}
             
-            # Check for duplicate role name
-            if role_name is not None and role_name != existing_role.get('role_name'):
-                result = self.supabase.table('roles').select('*').eq('role_name', role_name).execute()
-                if result.data and len(result.data) > 0:
-                    return {
-                        'success': False,
-                        'message': f'Role with name "{role_name}" already exists.'
-                    }
+            if role_name is not None:
                 update_data['role_name'] = role_name
             
-            # Check for duplicate role code
-            if role_code is not None and role_code.upper() != existing_role.get('role_code'):
-                result = self.supabase.table('roles').select('*').eq('role_code', role_code.upper()).execute()
-                if result.data and len(result.data) > 0:
-                    return {
-                        'success': False,
-                        'message': f'Role with code "{role_code}" already exists.'
-                    }
+            if role_code is not None:
                 update_data['role_code'] = role_code.upper()
             
             if dashboard_route is not None:
@@ -213,19 +209,44 @@ class UserProfileController:
                 }
             
             # Perform update
-            result = self.supabase.table('roles').update(update_data).eq('id', role_id).execute()
+            query = self.supabase.table('roles').update(update_data).eq('id', role_id)
+            if expected_version is not None:
+                query = query.eq('version', expected_version)
+            try:
+                result = query.execute()
+            except APIError as e:
+                field = unique_violation_field(e, ('role_name', 'role_code'))
+                if field == 'role_name':
+                    return {
+                        'success': False,
+                        'message': f'Role with name "{role_name}" already exists.'
+                    }
+                if field == 'role_code':
+                    return {
+                        'success': False,
+                        'message': f'Role with code "{role_code}" already exists.'
+                    }
+                raise
             
             if result.data and len(result.data) > 0:
+                change_tracker.record('roles', 'updated', role_id)
                 return {
                     'success': True,
                     'message': 'Role updated successfully.',
                     'role': result.data[0]
                 }
-            else:
+            
+            # Failure path only: tell a stale version apart from a missing role
+            if expected_version is not None and self.get_role_by_id(role_id):
                 return {
                     'success': False,
-                    'message': 'Failed to update role.'
+                    'conflict': True,
+                    'message': 'Role was modified by another admin. Reload and try again.'
                 }
+            return {
+                'success': False,
+                'message': 'Role not found.'
+            }
         except Exception as e:
             print(f"Error updating role: {e}")
             return {
@@ -261,6 +282,7 @@ class UserProfileController:
             
             if result.data and len(result.data) > 0:
                 action = 'activated' if new_status else 'suspended'
+                change_tracker.record('roles', action, role_id)
                 return {
                     'success': True,
                     'message': f'Role {action} successfully.',
@@ -278,21 +300,140 @@ class UserProfileController:
                 'message': f'Error updating role status: {str(e)}'
             }
     
-    def delete_role(self, role_id: int, cascade: bool = True) -> Dict[str, Any]:
+    def count_users_with_role(self, role_id: int) -> int:
+        """
+        Count the users assigned to a role without fetching them.
+
+        Args:
+            role_id: ID of the role
+
+        Returns:
+            Number of users with this role
+        """
+        try:
+            result = self.supabase.table('users').select('id', count='exact').eq('role_id', role_id).limit(1).execute()
+            return result.count or 0
+        except Exception as e:
+            print(f"Error counting users for role: {e}")
+            raise Exception(f'Error counting users for role: {str(e)}')
+
+    def delete_users_with_role(self, role_id: int, batch_size: int = CASCADE_DELETE_BATCH_SIZE) -> int:
+        """
+        Delete every user holding a role, one batch of known ids per statement,
+        recording each deleted id so caches, event streams and token
+        revocation see exactly which accounts went away.
+
+        Returns:
+            Number of users deleted
+        """
+        deleted = 0
+        while True:
+            rows = self.supabase.table('users').select('id').eq('role_id', role_id).order('id').limit(batch_size).execute().data
+            if not rows:
+                return deleted
+            ids = [row['id'] for row in rows]
+            self.supabase.table('users').delete(returning=ReturnMethod.minimal).eq('role_id', role_id).in_('id', ids).execute()
+            for user_id in ids:
+                change_tracker.record('users', 'deleted', user_id)
+            deleted += len(ids)
+
+    def validate_reassignment(self, from_role_id: int, to_role_id: int) -> Optional[str]:
+        """
+        Check that users can be moved from one role to another.
+
+        Args:
+            from_role_id: Role the users currently hold
+            to_role_id: Role to move them to
+
+        Returns:
+            Error message, or None if the reassignment is allowed
+        """
+        if from_role_id == to_role_id:
+            return 'Source and target role must be different.'
+        if not self.get_role_by_id(from_role_id):
+            return 'Role not found.'
+        target_role = self.get_role_by_id(to_role_id)
+        if not target_role:
+            return 'Target role not found.'
+        if target_role.get('is_active') is False:
+            return 'Target role is suspended.'
+        return None
+
+    def reassign_users_batch(self, from_role_id: int, to_role_id: int, batch_size: int = REASSIGN_BATCH_SIZE) -> int:
+        """
+        Move up to batch_size users to another role in one UPDATE statement
+        (reassign_role_users() in migrations/add_reassign_role_users_function.sql).
+
+        Returns:
+            Number of users moved
+        """
+        result = self.supabase.rpc('reassign_role_users', {
+            'p_from_role_id': from_role_id,
+            'p_to_role_id': to_role_id,
+            'p_batch_size': batch_size
+        }).execute()
+        return int(result.data or 0)
+
+    def reassign_role_users(self, from_role_id: int, to_role_id: int) -> Dict[str, Any]:
+        """
+        Move every user holding a role to another role, one batch per statement.
+
+        Args:
+            from_role_id: Role the users currently hold
+            to_role_id: Role to move them to
+
+        Returns:
+            Dictionary with success status, message, moved_users and remaining_users
+            (users still holding the source role, e.g. created during the move)
+        """
+        try:
+            error = self.validate_reassignment(from_role_id, to_role_id)
+            if error:
+                return {'success': False, 'message': error, 'moved_users': 0, 'remaining_users': 0}
+
+            moved = 0
+            while True:
+                batch = self.reassign_users_batch(from_role_id, to_role_id, REASSIGN_BATCH_SIZE)
+                moved += batch
+                if batch < REASSIGN_BATCH_SIZE:
+                    break
+            if moved:
+                change_tracker.record('users', 'updated')
+            remaining = self.count_users_with_role(from_role_id)
+            print(f"Reassigned {moved} user(s) from role {from_role_id} to role {to_role_id} ({remaining} remaining)")
+
+            return {
+                'success': True,
+                'message': f'{moved} user(s) moved to the new role.',
+                'moved_users': moved,
+                'remaining_users': remaining
+            }
+        except Exception as e:
+            print(f"Error reassigning role users: {e}")
+            return {
+                'success': False,
+                'message': f'Error reassigning users: {str(e)}',
+                'moved_users': 0,
+                'remaining_users': 0
+            }
+
+    def delete_role(self, role_id: int, cascade: bool = True, reassign_to: Optional[int] = None) -> Dict[str, Any]:
         """
         Delete a role (hard delete - use with caution).
         WARNING: If cascade=True, this will also delete all users assigned to this role!
+        With reassign_to, the users are moved to that role first and nobody is deleted.
         
         Args:
             role_id: ID of the role to delete
             cascade: If True, delete all users with this role first (default: True)
+            reassign_to: Role to move the users to before deleting the role
             
         Returns:
-            Dictionary with success status, message, and deleted_users count
+            Dictionary with success status, message, deleted_users and reassigned_users counts
         """
         try:
             print(f"\n=== DELETE ROLE REQUEST ===")
-            print(f"Role ID: {role_id}, Cascade: {cascade}")
+            print(f"Role ID: {role_id}, Cascade: {cascade}, Reassign to: {reassign_to}")
             
             # Check if role exists
             existing_role = self.get_role_by_id(role_id)
@@ -301,43 +442,50 @@ class UserProfileController:
                 return {
                     'success': False,
                     'message': 'Role not found.',
-                    'deleted_users': 0
+                    'deleted_users': 0,
+                    'reassigned_users': 0
                 }
             
             print(f"Found role: {existing_role.get('role_name')} (ID: {role_id})")
-            
-            # Check if any users have this role
-            users_with_role = self.supabase.table('users').select('id, username').eq('role_id', role_id).execute()
-            user_count = len(users_with_role.data) if users_with_role.data else 0
+
+            reassigned = 0
+            if reassign_to is not None:
+                reassignment = self.reassign_role_users(role_id, reassign_to)
+                reassigned = reassignment['moved_users']
+                if not reassignment['success']:
+                    return {**reassignment, 'deleted_users': 0, 'reassigned_users': reassigned}
+            
+            # Count (not fetch) the users still holding this role
+            user_count = self.count_users_with_role(role_id)
             print(f"Found {user_count} user(s) with role_id {role_id}")
             
             if user_count > 0:
-                if cascade:
+                if cascade and reassign_to is None:
                     # DELETE ALL USERS WITH THIS ROLE FIRST (CASCADE DELETE)
                     print(f"⚠️ CASCADE DELETE: Deleting {user_count} user(s) with role_id {role_id}")
-                    for user in users_with_role.data:
-                        print(f"  - Will delete user: {user.get('username')} (ID: {user.get('id')})")
-                    
-                    delete_users_result = self.supabase.table('users').delete().eq('role_id', role_id).execute()
+                    user_count = self.delete_users_with_role(role_id)
                     print(f"✅ Successfully deleted {user_count} user(s)")
-                    print(f"Delete users result: {delete_users_result}")
                 else:
-                    # Prevent deletion if cascade is False
-                    print(f"❌ Cannot delete: {user_count} users still assigned (cascade=False)")
+                    # Prevent deletion if cascade is False (or users arrived during reassignment)
+                    print(f"❌ Cannot delete: {user_count} users still assigned")
                     return {
                         'success': False,
                         'message': f'Cannot delete role. {user_count} user(s) still assigned to this role.',
-                        'deleted_users': 0
+                        'deleted_users': 0,
+                        'reassigned_users': reassigned
                     }
             
             # Delete role
             print(f"Deleting role {role_id} from roles table...")
             result = self.supabase.table('roles').delete().eq('id', role_id).execute()
             print(f"Role delete result: {result}")
+            change_tracker.record('roles', 'deleted', role_id)
             
             message = f'Role deleted successfully.'
-            if user_count > 0 and cascade:
+            if user_count > 0:
                 message = f'Role and {user_count} associated user(s) deleted successfully.'
+            elif reassigned > 0:
+                message = f'Role deleted successfully. {reassigned} user(s) moved to the new role.'
             
             print(f"✅ {message}")
             print(f"=== DELETE COMPLETE ===\n")
@@ -345,7 +493,8 @@ class UserProfileController:
             return {
                 'success': True,
                 'message': message,
-                'deleted_users': user_count
+                'deleted_users': user_count,
+                'reassigned_users': reassigned
             }
         except Exception as e:
             print(f"❌ Error deleting role: {e}")
@@ -354,7 +503,8 @@ class UserProfileController:
             return {
                 'success': False,
                 'message': f'Error deleting role: {str(e)}',
-                'deleted_users': 0
+                'deleted_users': 0,
+                'reassigned_users': 0
             }
     
     def search_roles(self, query: str) -> List[Dict[str, Any]]:
@@ -368,9 +518,10 @@ class UserProfileController:
             List of matching role dictionaries
         """
         try:
-            # Search in role_name and role_code
+            # Search in role_name and role_code; quoted so commas in the query cannot add filter terms
+            pattern = quote_logic_value(f'%{query}%')
             result = self.supabase.table('roles').select('*').or_(
-                f'role_name.ilike.%{query}%,role_code.ilike.%{query}%'
+                f'role_name.ilike.{pattern},role_code.ilike.{pattern}'
             ).order('id').execute()
             
             if result.data:
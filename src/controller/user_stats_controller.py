@@ -0,0 +1,71 @@
+"""
+User Stats Controller - Control Layer (BCE Framework)
+Use Case: As a user admin, I want dashboard counts (users per role, active vs
+suspended, recent logins) without downloading every user.
+"""
+
+import threading
+import time
+from typing import Any, Dict, Optional
+
+from supabase import Client
+
+from data.change_tracker import UNVERSIONED_ACTIONS
+
+
+class UserStatsController:
+    """
+    Serves the get_user_stats() aggregate (migrations/add_user_stats_function.sql)
+    from a short-lived cache.
+
+    Any user or role change recorded by the change tracker drops the cache, so
+    admin edits show up immediately. Logins and rehashes are ignored: they only
+    move the recent-login counts, and during a login burst dropping the cache
+    on each one would re-run the aggregate per login. The TTL bounds that
+    staleness and staleness from writes outside the API.
+    """
+
+    def __init__(self, supabase_client: Client, ttl_seconds: float = 10.0):
+        self.supabase = supabase_client
+        self.ttl_seconds = ttl_seconds
+        self._cached: Optional[Dict[str, Any]] = None
+        self._expires_at = 0.0
+        # Bumped on every invalidation; a refresh that started before one is not cached
+        self._generation = 0
+        self._lock = threading.Lock()
+
+    def invalidate(self, change: Optional[Dict[str, Any]] = None) -> None:
+        """Drop the cached stats (change tracker listener)"""
+        if change is not None and (change.get('table') not in ('users', 'roles')
+                                   or change.get('action') in UNVERSIONED_ACTIONS):
+            return
+        with self._lock:
+            self._generation += 1
+            self._cached = None
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Get dashboard statistics.
+
+        Returns:
+            Dictionary with total/active/suspended users, recent login counts,
+            per-role counts, generated_at and whether it came from the cache
+        """
+        with self._lock:
+            if self._cached is not None and time.monotonic() < self._expires_at:
+                return {**self._cached, 'cached': True}
+            generation = self._generation
+
+        try:
+            result = self.supabase.rpc('get_user_stats', read_only=True).execute()
+        except Exception as e:
+            print(f"Error fetching user stats: {e}")
+            raise Exception(f'Error retrieving user stats: {str(e)}')
+        stats = result.data or {}
+
+        with self._lock:
+            if generation == self._generation:
+                self._cached = stats
+                self._expires_at = time.monotonic() + self.ttl_seconds
+        return {**stats, 'cached': False}
+
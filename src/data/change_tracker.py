@@ -0,0 +1,85 @@
+"""
+Data Change Tracker
+Per-table change counters maintained by the mutation controllers
+"""
+
+import secrets
+import threading
+from typing import Any, Callable, Dict, List, Optional
+
+# Actions that leave what versioned responses protect unchanged: a login only moves
+# last_login and a rehash only the password hash. Listeners still see them.
+UNVERSIONED_ACTIONS = frozenset({'login', 'rehashed'})
+
+
+class ChangeTracker:
+    """
+    Keeps a cheap version number for each table.
+
+    Mutation controllers call ``record`` after a successful write; readers use
+    the versions to build strong ETags without touching the database.
+    Versions live in process memory and start from a random epoch, so a
+    restarted worker never reuses an ETag issued before the restart. Writes
+    made outside the API (e.g. in the Supabase SQL editor) are not seen.
+    """
+
+    def __init__(self):
+        self._epoch = secrets.token_hex(4)
+        self._versions: Dict[str, int] = {}
+        self._listeners: List[Callable[[Dict[str, Any]], None]] = []
+        self._lock = threading.Lock()
+
+    def record(self, table: str, action: str, record_id: Optional[int] = None, remote: bool = False) -> int:
+        """
+        Record a successful mutation.
+
+        Args:
+            table: Table that changed ('users' or 'roles')
+            action: What happened (e.g. 'created', 'updated', 'deleted')
+            record_id: ID of the affected row, if known
+            remote: True when the change was made by another worker and
+                arrived over the invalidation bus (it is not re-broadcast)
+
+        Returns:
+            The table's new version (unchanged for UNVERSIONED_ACTIONS)
+        """
+        with self._lock:
+            version = self._versions.get(table, 0)
+            if action not in UNVERSIONED_ACTIONS:
+                version += 1
+                self._versions[table] = version
+            listeners = list(self._listeners)
+
+        change = {'table': table, 'action': action, 'id': record_id, 'version': version, 'remote': remote}
+        for listener in listeners:
+            try:
+                listener(change)
+            except Exception as e:
+                print(f"Change listener error: {e}")
+        return version
+
+    def version(self, table: str) -> int:
+        """Current version of a table"""
+        return self._versions.get(table, 0)
+
+    def etag(self, *tables: str) -> str:
+        """
+        Build a strong ETag from the versions of the given tables.
+
+        Args:
+            *tables: Tables the resource is derived from
+
+        Returns:
+            Quoted ETag value, e.g. '"3f2a9c1d-users7-roles2"'
+        """
+        parts = '-'.join(f'{table}{self.version(table)}' for table in tables)
+        return f'"{self._epoch}-{parts}"'
+
+    def add_listener(self, listener: Callable[[Dict[str, Any]], None]) -> None:
+        """Register a callback invoked with each recorded change"""
+        with self._lock:
+            self._listeners.append(listener)
+
+
+# Create singleton instance
+change_tracker = ChangeTracker()
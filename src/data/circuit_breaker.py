@@ -0,0 +1,108 @@
+"""
+Circuit Breaker for the Data Layer
+Stops sending queries to a database endpoint that keeps failing, so requests
+fail fast with 503 instead of each waiting out a timeout.
+"""
+
+import threading
+import time
+from typing import Any, Dict
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+
+class DataLayerUnavailable(Exception):
+    """
+    The database could not serve a query in time (breaker open, deadline
+    exhausted, or transport failure after retries). Mapped to HTTP 503.
+    """
+
+    def __init__(self, message: str, retry_after: int = 1):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class CircuitOpenError(DataLayerUnavailable):
+    """Raised without contacting the database while the breaker is open"""
+
+
+class DeadlineExceeded(DataLayerUnavailable):
+    """Raised when the request's time budget ran out before or during a query"""
+
+
+class CircuitBreaker:
+    """
+    Classic three-state breaker, safe to use from worker threads.
+
+    closed:    calls flow; failure_threshold consecutive failures open it.
+    open:      calls are rejected for reset_timeout seconds.
+    half_open: one probe call is let through; success closes the breaker,
+               failure opens it again for another reset_timeout.
+    """
+
+    def __init__(self, name: str, failure_threshold: int = 5, reset_timeout: float = 10.0):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._state = CLOSED
+        self._consecutive_failures = 0
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+        self._lock = threading.Lock()
+        self._stats = {'successes': 0, 'failures': 0, 'rejected': 0, 'opened': 0}
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            self._refresh()
+            return self._state
+
+    def _refresh(self) -> None:
+        if self._state == OPEN and time.monotonic() - self._opened_at >= self.reset_timeout:
+            self._state = HALF_OPEN
+            self._probe_in_flight = False
+
+    def _retry_after(self) -> int:
+        return max(1, round(self.reset_timeout - (time.monotonic() - self._opened_at)))
+
+    def before_call(self) -> None:
+        """
+        Ask permission to call the endpoint.
+
+        Raises:
+            CircuitOpenError: If the breaker is open (or a half-open probe is already running)
+        """
+        with self._lock:
+            self._refresh()
+            if self._state == CLOSED:
+                return
+            if self._state == HALF_OPEN and not self._probe_in_flight:
+                self._probe_in_flight = True
+                return
+            self._stats['rejected'] += 1
+            raise CircuitOpenError(f"Database endpoint '{self.name}' is unavailable", self._retry_after())
+
+    def record_success(self) -> None:
+        with self._lock:
+            self._stats['successes'] += 1
+            self._consecutive_failures = 0
+            self._probe_in_flight = False
+            self._state = CLOSED
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._stats['failures'] += 1
+            self._consecutive_failures += 1
+            self._probe_in_flight = False
+            if self._state == HALF_OPEN or self._consecutive_failures >= self.failure_threshold:
+                if self._state != OPEN:
+                    self._stats['opened'] += 1
+                self._state = OPEN
+                self._opened_at = time.monotonic()
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            self._refresh()
+            return {'state': self._state, 'consecutive_failures': self._consecutive_failures, **self._stats}
@@ -0,0 +1,608 @@
+"""
+Data Client
+Wraps the Supabase client used by the controllers. Queries are built exactly
+as before (``client.table(...).select(...).eq(...)``) but ``.execute()`` goes
+through one choke point that routes reads to replicas, applies the request
+deadline as the HTTP timeout, consults the circuit breaker, and retries
+idempotent reads with jittered backoff. Reads on the critical path can
+also be hedged (see data/hedging.py).
+"""
+
+import asyncio
+import contextvars
+import os
+import random
+import re
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+import httpx
+from postgrest.exceptions import APIError
+
+from data.circuit_breaker import CircuitBreaker, DataLayerUnavailable, DeadlineExceeded
+from data.deadlines import Deadline, current_deadline
+from data.hedging import HedgePolicy, create_hedge_policy, hedging_requested
+
+# HTTP timeout for calls made outside any deadline scope (scripts, background tasks)
+DEFAULT_CALL_TIMEOUT = float(os.getenv('SUPABASE_CALL_TIMEOUT', '10'))
+# Retries for idempotent reads only; writes are never retried
+READ_RETRIES = int(os.getenv('SUPABASE_READ_RETRIES', '2'))
+RETRY_BASE_DELAY = 0.05
+RETRY_MAX_DELAY = 0.5
+
+# PostgREST/gateway errors that mean "database unavailable" rather than "bad query"
+UNAVAILABLE_CODES = {'502', '503', '504', '57014', 'PGRST000', 'PGRST001', 'PGRST002'}
+
+WRITE_METHODS = ('insert', 'update', 'upsert', 'delete')
+# Builder methods whose first argument is a column name (values are left out of fingerprints)
+FILTER_METHODS = ('eq', 'neq', 'gt', 'gte', 'lt', 'lte', 'like', 'ilike', 'is_', 'in_', 'contains',
+                  'contained_by', 'filter', 'not_', 'match', 'fts', 'text_search')
+# PostgREST operators recognised in or_() terms; anything else is treated as part of a value
+LOGIC_OPERATORS = frozenset({'eq', 'neq', 'gt', 'gte', 'lt', 'lte', 'like', 'ilike', 'match', 'imatch', 'is', 'in',
+                             'cs', 'cd', 'ov', 'sl', 'sr', 'nxr', 'nxl', 'adj', 'fts', 'plfts', 'phfts', 'wfts'})
+_IDENTIFIER = re.compile(r'[A-Za-z_][A-Za-z0-9_]*$')
+_LOGIC_GROUP = re.compile(r'(not\.)?(and|or)\((.*)\)$', re.S)
+# Supabase services that never touch PostgREST and may be used on the wrapped client directly
+PASSTHROUGH_ATTRIBUTES = frozenset({'auth', 'storage', 'functions', 'realtime', 'channel', 'remove_channel'})
+
+# Threads that run hedged attempts (both copies of a hedged read run here)
+_hedge_pool = ThreadPoolExecutor(max_workers=int(os.getenv('HEDGE_WORKERS', '32')), thread_name_prefix='hedge')
+
+Step = Tuple[str, Optional[tuple], Optional[dict]]
+
+# Who is making the current request (JWT subject), for read-your-writes stickiness
+_actor: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar('data_actor', default=None)
+
+
+def bind_actor(actor: Optional[str]) -> None:
+    """Associate the current request with an actor (call from the auth dependency)"""
+    _actor.set(actor)
+
+
+def current_actor() -> Optional[str]:
+    return _actor.get()
+
+
+# Set inside primary_reads(): reads skip the replicas
+_primary_only: contextvars.ContextVar[bool] = contextvars.ContextVar('primary_reads', default=False)
+
+
+@contextmanager
+def primary_reads() -> Iterator[None]:
+    """
+    Send every read executed inside the block to the primary.
+
+    For responses that carry an ETag: the ETag comes from this worker's change
+    counters, which may already count a write (by any admin) that a replica
+    has not applied yet, and replica rows served under it would then be
+    revalidated with 304s until the next change.
+    """
+    token = _primary_only.set(True)
+    try:
+        yield
+    finally:
+        _primary_only.reset(token)
+
+
+# One breaker per database endpoint, shared by every DataClient pointing at it
+_breakers: Dict[str, CircuitBreaker] = {}
+_breakers_lock = threading.Lock()
+
+
+def get_breaker(name: str) -> CircuitBreaker:
+    """Return the shared circuit breaker for a database endpoint"""
+    with _breakers_lock:
+        if name not in _breakers:
+            _breakers[name] = CircuitBreaker(
+                name,
+                failure_threshold=int(os.getenv('BREAKER_FAILURE_THRESHOLD', '5')),
+                reset_timeout=float(os.getenv('BREAKER_RESET_SECONDS', '10'))
+            )
+        return _breakers[name]
+
+
+def is_unavailable_error(error: Exception) -> bool:
+    """True for transport failures and PostgREST errors that indicate an unhealthy database"""
+    if isinstance(error, httpx.TransportError):
+        return True
+    return isinstance(error, APIError) and str(error.code) in UNAVAILABLE_CODES
+
+
+class _TimeoutSession:
+    """Session wrapper that adds a per-call timeout to the builder's request"""
+
+    def __init__(self, session: Any, timeout: float):
+        self._session = session
+        self._timeout = timeout
+
+    def request(self, *args, **kwargs):
+        kwargs.setdefault('timeout', self._timeout)
+        return self._session.request(*args, **kwargs)
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._session, name)
+
+
+def _split_logic_terms(expression: str) -> List[str]:
+    """Split a PostgREST or/and filter on its top-level commas, respecting "quoted" values and (groups)"""
+    terms, start, depth, quoted, escaped = [], 0, 0, False, False
+    for i, char in enumerate(expression):
+        if escaped:
+            escaped = False
+        elif quoted:
+            escaped = char == '\\'
+            quoted = char != '"'
+        elif char == '"':
+            quoted = True
+        elif char == '(':
+            depth += 1
+        elif char == ')':
+            depth -= 1
+        elif char == ',' and depth == 0:
+            terms.append(expression[start:i])
+            start = i + 1
+    terms.append(expression[start:])
+    return terms
+
+
+def quote_logic_value(value: str) -> str:
+    """Quote a value for an or_() term so commas, dots and parentheses in it stay part of the value"""
+    return '"' + value.replace('\\', '\\\\').replace('"', '\\"') + '"'
+
+
+def logic_shape(expression: str) -> str:
+    """
+    Shape of an or_() filter without its values:
+    'username.ilike.%x%,email.ilike.%x%' -> 'username.ilike|email.ilike'.
+    Terms that do not parse as column.operator become '?', so unquoted
+    search text containing commas or dots never leaks into a fingerprint.
+    """
+    shapes = []
+    for term in _split_logic_terms(expression):
+        term = term.strip()
+        group = _LOGIC_GROUP.match(term)
+        if group:
+            shapes.append(f"{group.group(1) or ''}{group.group(2)}({logic_shape(group.group(3))})")
+            continue
+        column, _, rest = term.partition('.')
+        operator, _, rest = rest.partition('.')
+        if operator == 'not':
+            operator = 'not.' + rest.partition('.')[0]
+        if _IDENTIFIER.match(column) and operator.split('.')[-1] in LOGIC_OPERATORS:
+            shapes.append(f'{column}.{operator}')
+        else:
+            shapes.append('?')
+    return '|'.join(shapes)
+
+
+class QueryProxy:
+    """
+    Records a query chain so it can be replayed at execute time.
+
+    Each call returns a new proxy, so partially built queries can be reused
+    the way the controllers already do (``query = query.eq(...)``).
+    """
+
+    def __init__(self, data_client: 'DataClient', steps: Tuple[Step, ...], read_only: bool = False):
+        self._data_client = data_client
+        self._steps = steps
+        self._read_only = read_only
+
+    def __getattr__(self, name: str) -> 'QueryProxy':
+        if name.startswith('_'):
+            raise AttributeError(name)
+        # Recorded as an attribute access; __call__ turns it into a method call
+        return QueryProxy(self._data_client, self._steps + ((name, None, None),), self._read_only)
+
+    def __call__(self, *args, **kwargs) -> 'QueryProxy':
+        name, _, _ = self._steps[-1]
+        return QueryProxy(self._data_client, self._steps[:-1] + ((name, args, kwargs),), self._read_only)
+
+    @property
+    def is_read(self) -> bool:
+        """Idempotent read: a table select (or an RPC declared read-only) with no write step"""
+        names = [name for name, _, _ in self._steps]
+        if any(name in WRITE_METHODS for name in names):
+            return False
+        return self._read_only or (names[0] == 'table' and 'select' in names)
+
+    @property
+    def label(self) -> str:
+        """Short description such as 'user_details.select' or 'rpc:get_user_stats'"""
+        root, args, _ = self._steps[0]
+        target = args[0] if args else '?'
+        if root == 'rpc':
+            return f'rpc:{target}'
+        verbs = [name for name, _, _ in self._steps[1:] if name in WRITE_METHODS + ('select',)]
+        return f"{target}.{verbs[0] if verbs else 'query'}"
+
+    @property
+    def fingerprint(self) -> str:
+        """
+        Query shape without values, e.g.
+        'user_details select(*) eq:role_code ilike:username order:id limit' or 'rpc:get_user_stats()'
+        """
+        root, args, _ = self._steps[0]
+        if root == 'rpc':
+            params = args[1] if args and len(args) > 1 else {}
+            return f"rpc:{args[0]}({','.join(sorted(params or {}))})"
+        parts = [args[0] if args else '?']
+        for name, step_args, kwargs in self._steps[1:]:
+            if name in WRITE_METHODS:
+                parts.append(name + (f"[count={kwargs['count']}]" if kwargs and kwargs.get('count') else ''))
+            elif name == 'select':
+                columns = ','.join(step_args or ()) or '*'
+                count = f"[count={kwargs['count']}]" if kwargs and kwargs.get('count') else ''
+                parts.append(f'select({columns}){count}')
+            elif name == 'or_' and step_args:
+                parts.append('or:' + logic_shape(str(step_args[0])))
+            elif name in FILTER_METHODS and step_args:
+                parts.append(f"{name.rstrip('_')}:{step_args[0]}")
+            elif name == 'order' and step_args:
+                parts.append(f"order:{step_args[0]}{' desc' if kwargs and kwargs.get('desc') else ''}")
+            else:
+                parts.append(name)
+        return ' '.join(parts)
+
+    def build(self, client: Any) -> Any:
+        """Replay the recorded chain against a raw Supabase client"""
+        target = client
+        for name, args, kwargs in self._steps:
+            target = getattr(target, name)
+            if args is not None:
+                target = target(*args, **kwargs)
+        return target
+
+    def execute(self) -> Any:
+        return self._data_client.execute(self)
+
+
+
+class Endpoint:
+    """One database endpoint (the primary or a read replica) and its health"""
+
+    def __init__(self, name: str, client: Any, breaker: Optional[CircuitBreaker] = None):
+        self.name = name
+        self.client = client
+        self.breaker = breaker or get_breaker(name)
+        # Replication lag in seconds from the lag monitor (None until measured or after a failed probe)
+        self.lag: Optional[float] = None
+        self.reads = 0
+
+
+class DataClient:
+    """
+    Supabase client wrapper shared by all controllers.
+
+    Writes always go to the primary. Idempotent reads go round-robin to read
+    replicas whose measured lag is within max_lag, except for an actor who
+    wrote within the last sticky_seconds (read-your-writes) and reads inside
+    ``primary_reads()``; a replica that is unavailable falls back to the
+    primary within the same deadline.
+
+    With a hedge_policy, reads executed inside ``hedged_reads()`` that have
+    not answered within the policy's delay get a second copy sent to another
+    replica (or over a second connection to the primary); the first answer wins.
+
+    Anything other than ``table``/``from_`` and ``rpc`` is passed through to
+    the primary client unchanged.
+    """
+
+    def __init__(self, client: Any, breaker: Optional[CircuitBreaker] = None, name: str = 'primary',
+                 replicas: Optional[List[Tuple[str, Any]]] = None, max_lag: float = 5.0,
+                 sticky_seconds: float = 5.0, hedge_policy: Optional[HedgePolicy] = None):
+        self.client = client
+        self.name = name
+        self.primary = Endpoint(name, client, breaker)
+        self.breaker = self.primary.breaker
+        self.replicas = [Endpoint(replica_name, replica) for replica_name, replica in replicas or []]
+        self.max_lag = max_lag
+        self.sticky_seconds = sticky_seconds
+        self.hedge_policy = hedge_policy
+        # Called after every database round trip (see add_observer)
+        self._observers: List[Callable[[Dict[str, Any]], None]] = []
+        self._sticky: Dict[str, float] = {}
+        self._next_replica = 0
+        self._lock = threading.Lock()
+        self._stats = {'calls': 0, 'retries': 0, 'unavailable': 0, 'deadline_exceeded': 0,
+                       'replica_reads': 0, 'replica_fallbacks': 0, 'sticky_reads': 0, 'primary_reads': 0}
+
+    def table(self, name: str) -> QueryProxy:
+        return QueryProxy(self, (('table', (name,), {}),))
+
+    # supabase-py alias used by the view and search controllers
+    from_ = table
+
+    def rpc(self, fn: str, params: Optional[Dict[str, Any]] = None, read_only: bool = False) -> QueryProxy:
+        """
+        Call a Postgres function.
+
+        Args:
+            fn: Function name
+            params: Function arguments
+            read_only: Mark the function as an idempotent read (enables retries and replicas)
+        """
+        return QueryProxy(self, (('rpc', (fn, params or {}), {}),), read_only=read_only)
+
+    def __getattr__(self, name: str) -> Any:
+        if name in PASSTHROUGH_ATTRIBUTES:
+            return getattr(self.client, name)
+        raise AttributeError(
+            f"DataClient has no attribute '{name}': start queries with table()/from_() or rpc() "
+            f"so they run through DataClient.execute()"
+        )
+
+    def _count(self, key: str) -> None:
+        with self._lock:
+            self._stats[key] += 1
+
+    def add_observer(self, observer: Callable[[Dict[str, Any]], None]) -> None:
+        """
+        Register a callback for every database round trip (profiling, slow-query log).
+
+        It runs in the thread that made the call, with the caller's context
+        variables, and receives a dict with query (the QueryProxy), label,
+        endpoint, seconds, ok, error (exception class name or None) and rows
+        (row count, or None for non-list responses).
+        """
+        self._observers.append(observer)
+
+    def _notify(self, event: Dict[str, Any]) -> None:
+        for observer in self._observers:
+            try:
+                observer(event)
+            except Exception as e:
+                print(f"Data client observer error: {e}")
+
+    # ---- routing ----
+
+    def _is_sticky(self, actor: Optional[str]) -> bool:
+        if actor is None:
+            return False
+        with self._lock:
+            until = self._sticky.get(actor)
+            if until is None:
+                return False
+            if until < time.monotonic():
+                del self._sticky[actor]
+                return False
+            return True
+
+    def _note_write(self, actor: Optional[str]) -> None:
+        if actor is None or not self.replicas:
+            return
+        now = time.monotonic()
+        with self._lock:
+            if len(self._sticky) > 10_000:
+                self._sticky = {a: until for a, until in self._sticky.items() if until > now}
+            self._sticky[actor] = now + self.sticky_seconds
+
+    def _pick_replica(self) -> Optional[Endpoint]:
+        with self._lock:
+            for offset in range(len(self.replicas)):
+                replica = self.replicas[(self._next_replica + offset) % len(self.replicas)]
+                if replica.lag is not None and replica.lag <= self.max_lag and replica.breaker.state != 'open':
+                    self._next_replica = (self._next_replica + offset + 1) % len(self.replicas)
+                    return replica
+        return None
+
+    def route(self, query: QueryProxy) -> List[Endpoint]:
+        """Endpoints to try for a query, in order"""
+        if not query.is_read or not self.replicas:
+            return [self.primary]
+        if _primary_only.get():
+            self._count('primary_reads')
+            return [self.primary]
+        if self._is_sticky(current_actor()):
+            self._count('sticky_reads')
+            return [self.primary]
+        replica = self._pick_replica()
+        return [replica, self.primary] if replica is not None else [self.primary]
+
+    # ---- execution ----
+
+    def execute(self, query: QueryProxy) -> Any:
+        """
+        Execute a recorded query under the current deadline.
+
+        Raises:
+            DataLayerUnavailable: If the breaker is open, the deadline ran out,
+                or the database stayed unreachable after retries
+            APIError: For ordinary query errors (constraint violations etc.)
+        """
+        self._count('calls')
+        deadline = current_deadline()
+        try:
+            if self.hedge_policy is not None and query.is_read and hedging_requested():
+                return self._execute_hedged(query, deadline)
+            return self._execute_routed(query, deadline, self.route(query))
+        except DataLayerUnavailable as error:
+            # Recorded here rather than per attempt, so a losing hedge cannot fail the request
+            if deadline is not None:
+                deadline.record_failure(error)
+            raise
+
+    def _execute_routed(self, query: QueryProxy, deadline: Optional[Deadline], endpoints: List[Endpoint]) -> Any:
+        started = time.monotonic()
+        for position, endpoint in enumerate(endpoints):
+            try:
+                result = self._execute_on(endpoint, query, deadline)
+            except DeadlineExceeded:
+                self._count('deadline_exceeded')
+                raise
+            except DataLayerUnavailable:
+                if position + 1 < len(endpoints):
+                    self._count('replica_fallbacks')
+                    continue
+                self._count('unavailable')
+                raise
+            if endpoint is not self.primary:
+                self._count('replica_reads')
+            elif not query.is_read:
+                self._note_write(current_actor())
+            if query.is_read and self.hedge_policy is not None:
+                self.hedge_policy.latency.record(query.label, time.monotonic() - started)
+            return result
+
+    def _hedge_route(self, route: List[Endpoint]) -> List[Endpoint]:
+        """Where the hedge goes: a different fresh replica, else the primary"""
+        if route[0] is not self.primary:
+            replica = self._pick_replica()
+            if replica is not None and replica is not route[0]:
+                return [replica, self.primary]
+        return [self.primary]
+
+    def _execute_hedged(self, query: QueryProxy, deadline: Optional[Deadline]) -> Any:
+        """
+        Run a read, and if it is still outstanding after the hedge delay (and
+        the budget allows) race a second copy against it.
+
+        The losing attempt cannot be cancelled mid-request; it finishes in the
+        background and only its latency is recorded.
+        """
+        policy = self.hedge_policy
+        policy.note_eligible()
+        route = self.route(query)
+        first = _hedge_pool.submit(contextvars.copy_context().run, self._execute_routed, query, deadline, route)
+
+        delay = policy.delay(query.label)
+        if deadline is not None:
+            delay = min(delay, max(0.0, deadline.remaining()))
+        done, _ = wait([first], timeout=delay)
+        if done or not policy.try_acquire():
+            return first.result()
+
+        hedge = _hedge_pool.submit(contextvars.copy_context().run, self._execute_routed, query, deadline,
+                                   self._hedge_route(route))
+        pending = {first, hedge}
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    if future is hedge:
+                        policy.note_hedge_win()
+                    return future.result()
+        # Both failed: report the original attempt's error
+        return first.result()
+
+    def _execute_on(self, endpoint: Endpoint, query: QueryProxy, deadline: Optional[Deadline]) -> Any:
+        attempts = 1 + (READ_RETRIES if query.is_read else 0)
+        for attempt in range(attempts):
+            timeout = DEFAULT_CALL_TIMEOUT
+            if deadline is not None:
+                timeout = min(timeout, deadline.remaining())
+                if timeout <= 0:
+                    raise DeadlineExceeded(f'Deadline exceeded before {query.label}')
+
+            endpoint.breaker.before_call()
+            started = time.perf_counter()
+            try:
+                result = self._send(endpoint, query, timeout)
+            except Exception as error:
+                if self._observers:
+                    self._notify({'query': query, 'label': query.label, 'endpoint': endpoint.name,
+                                  'seconds': time.perf_counter() - started, 'ok': False,
+                                  'error': type(error).__name__, 'rows': None})
+                if not is_unavailable_error(error):
+                    # The database answered; the query itself was rejected
+                    endpoint.breaker.record_success()
+                    raise
+                endpoint.breaker.record_failure()
+                delay = random.uniform(0, min(RETRY_MAX_DELAY, RETRY_BASE_DELAY * 2 ** attempt))
+                budget_left = deadline.remaining() if deadline is not None else float('inf')
+                if attempt + 1 < attempts and budget_left > delay + 0.05:
+                    self._count('retries')
+                    time.sleep(delay)
+                    continue
+                if isinstance(error, httpx.TimeoutException) and deadline is not None and deadline.expired():
+                    raise DeadlineExceeded(f'Deadline exceeded during {query.label}') from error
+                raise DataLayerUnavailable(f'{query.label} failed on {endpoint.name}: {error}') from error
+            endpoint.breaker.record_success()
+            endpoint.reads += query.is_read
+            if self._observers:
+                data = getattr(result, 'data', None)
+                self._notify({'query': query, 'label': query.label, 'endpoint': endpoint.name,
+                              'seconds': time.perf_counter() - started, 'ok': True, 'error': None,
+                              'rows': len(data) if isinstance(data, list) else None})
+            return result
+
+    def _send(self, endpoint: Endpoint, query: QueryProxy, timeout: float) -> Any:
+        builder = query.build(endpoint.client)
+        session = getattr(builder, 'session', None)
+        if session is not None:
+            builder.session = _TimeoutSession(session, timeout)
+        return builder.execute()
+
+    # ---- replica lag ----
+
+    def probe_lag(self, endpoint: Endpoint) -> Optional[float]:
+        """
+        Measure one replica's lag with the replication_lag_seconds() RPC
+        (migrations/add_replication_lag_function.sql). Failures mark the lag unknown.
+        """
+        try:
+            response = self._send(endpoint, QueryProxy(self, (('rpc', ('replication_lag_seconds', {}), {}),)), 2.0)
+            data = response.data
+            endpoint.lag = float(data[0] if isinstance(data, list) else data or 0)
+        except Exception as e:
+            print(f"Replica lag probe failed for {endpoint.name}: {e}")
+            endpoint.lag = None
+        return endpoint.lag
+
+    async def monitor_replica_lag(self, interval: float = 2.0) -> None:
+        """Poll every replica's lag until cancelled (run as a background task)"""
+        while True:
+            for replica in self.replicas:
+                await asyncio.to_thread(self.probe_lag, replica)
+            await asyncio.sleep(interval)
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self._stats)
+            sticky_actors = len(self._sticky)
+        endpoints = [
+            {'name': e.name, 'role': 'primary' if e is self.primary else 'replica', 'lag_seconds': e.lag,
+             'reads': e.reads, 'breaker': e.breaker.get_stats()}
+            for e in [self.primary] + self.replicas
+        ]
+        hedging = self.hedge_policy.get_stats() if self.hedge_policy is not None else None
+        return {**stats, 'sticky_actors': sticky_actors, 'max_lag_seconds': self.max_lag, 'endpoints': endpoints,
+                'hedging': hedging}
+
+
+_data_client: Optional[DataClient] = None
+_data_client_lock = threading.Lock()
+
+
+def get_data_client() -> DataClient:
+    """
+    Shared DataClient for the whole process (controllers and AuthController).
+
+    The primary comes from SUPABASE_URL / SUPABASE_KEY; read replicas, the
+    lag bound and the read-your-writes window come from config.json, and
+    hedging from HEDGED_READS (see create_hedge_policy).
+    """
+    global _data_client
+    with _data_client_lock:
+        if _data_client is None:
+            from supabase import create_client
+            from config import load_config
+
+            config = load_config()
+            key = os.getenv('SUPABASE_KEY')
+            replicas = [
+                (replica.get('name', f'replica-{i + 1}'),
+                 create_client(replica['url'], os.getenv(replica.get('keyEnv', 'SUPABASE_KEY'), key)))
+                for i, replica in enumerate(config['READ_REPLICAS'])
+            ]
+            _data_client = DataClient(
+                create_client(os.getenv('SUPABASE_URL'), key),
+                replicas=replicas,
+                max_lag=config['MAX_REPLICA_LAG_SECONDS'],
+                sticky_seconds=config['READ_YOUR_WRITES_SECONDS'],
+                hedge_policy=create_hedge_policy()
+            )
+        return _data_client
@@ -0,0 +1,49 @@
+"""
+Database Error Classification
+Maps PostgREST constraint violations to the field that caused them
+"""
+
+import re
+from typing import Iterable, Optional
+
+UNIQUE_VIOLATION = '23505'
+FOREIGN_KEY_VIOLATION = '23503'
+
+# PostgreSQL detail text: 'Key (username)=(bob) already exists.'
+_KEY_DETAIL = re.compile(r'Key \((.+?)\)=\(')
+# PostgreSQL message text: 'duplicate key value violates unique constraint "users_email_key"'
+_CONSTRAINT_NAME = re.compile(r'constraint "([^"]+)"')
+
+
+def unique_violation_field(error: Exception, fields: Iterable[str]) -> Optional[str]:
+    """
+    Identify which field a unique-constraint violation refers to.
+
+    Args:
+        error: Exception raised by a PostgREST call
+        fields: Candidate column names, e.g. ('username', 'email')
+
+    Returns:
+        The matching field, '' for a unique violation on an unknown column,
+        or None if the error is not a unique violation
+    """
+    if getattr(error, 'code', None) != UNIQUE_VIOLATION:
+        return None
+
+    # Prefer the key column from the details (it may be an expression such as
+    # lower((email)::text)); fall back to the constraint or index name
+    key = _KEY_DETAIL.search(getattr(error, 'details', None) or '')
+    constraint = _CONSTRAINT_NAME.search(getattr(error, 'message', None) or '')
+    for source in (key, constraint):
+        if source is None:
+            continue
+        text = source.group(1).lower()
+        for field in fields:
+            if field in text:
+                return field
+    return ''
+
+
+def is_foreign_key_violation(error: Exception) -> bool:
+    """True if the error is a foreign-key violation (e.g. unknown role_id)"""
+    return getattr(error, 'code', None) == FOREIGN_KEY_VIOLATION
@@ -0,0 +1,71 @@
+"""
+Request Deadlines
+A per-request time budget carried in a context variable, so every data-layer
+call made while serving the request (including calls in worker threads) can
+size its timeout to what is left instead of the client's fixed default.
+"""
+
+import contextvars
+import time
+from contextlib import contextmanager
+from typing import Iterator, Optional
+
+
+class Deadline:
+    """
+    Absolute deadline for one unit of work (usually an HTTP request).
+
+    Also records the first data-layer failure seen while it was active, so
+    the deadline middleware can answer 503 even when a controller caught the
+    exception and returned an ordinary error result.
+    """
+
+    def __init__(self, budget_seconds: float, label: str = '', parent: Optional['Deadline'] = None):
+        self.budget = budget_seconds
+        self.label = label
+        self.parent = parent
+        self.expires_at = time.monotonic() + budget_seconds
+        if parent is not None:
+            self.expires_at = min(self.expires_at, parent.expires_at)
+        self.failure: Optional[Exception] = None
+
+    def remaining(self) -> float:
+        """Seconds left (negative once expired)"""
+        return self.expires_at - time.monotonic()
+
+    def expired(self) -> bool:
+        return self.remaining() <= 0
+
+    def record_failure(self, error: Exception) -> None:
+        if self.failure is None:
+            self.failure = error
+        if self.parent is not None:
+            self.parent.record_failure(error)
+
+
+_current: contextvars.ContextVar[Optional[Deadline]] = contextvars.ContextVar('deadline', default=None)
+
+
+def current_deadline() -> Optional[Deadline]:
+    """Deadline of the work in progress, or None outside any deadline scope"""
+    return _current.get()
+
+
+@contextmanager
+def deadline_scope(budget_seconds: float, label: str = '') -> Iterator[Deadline]:
+    """
+    Run a block under a deadline. Nested scopes never extend an outer deadline.
+
+    Args:
+        budget_seconds: Time budget for the block
+        label: Name used in errors and metrics (e.g. the route class)
+
+    Yields:
+        The active Deadline
+    """
+    deadline = Deadline(budget_seconds, label, parent=_current.get())
+    token = _current.set(deadline)
+    try:
+        yield deadline
+    finally:
+        _current.reset(token)
@@ -0,0 +1,143 @@
+"""
+Change Event Hub
+Fans out user and role change events to Server-Sent Events subscribers
+"""
+
+import asyncio
+import json
+import secrets
+import threading
+from collections import deque
+from typing import Any, Deque, Dict, Optional, Set, Tuple
+
+
+class Subscription:
+    """One connected client with a bounded buffer of pending events"""
+
+    def __init__(self, buffer_size: int):
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=buffer_size)
+
+    def push(self, event: Tuple[str, str, Dict[str, Any]]) -> None:
+        """
+        Queue an event without ever blocking the publisher.
+
+        A client too slow to drain its buffer has its backlog dropped and
+        replaced by a single 'resync' event telling it to refetch.
+        """
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait((event[0], 'resync', {'reason': 'buffer overflow'}))
+
+
+class ChangeEventHub:
+    """
+    In-process pub/sub for change events.
+
+    Subscribers are idle asyncio queues, so thousands of connections cost a
+    few KB each. Publishing is safe from any thread. A short replay buffer
+    lets reconnecting clients resume from their Last-Event-ID.
+
+    Event IDs are '<epoch>-<sequence>' with a random per-process epoch, like
+    the ChangeTracker's ETags: an ID issued before a restart or by another
+    worker is unknown here and answered with 'resync', never mistaken for a
+    position in this process's sequence.
+    """
+
+    def __init__(self, buffer_size: int = 100, replay_size: int = 256, max_subscribers: int = 10000):
+        self.buffer_size = buffer_size
+        self.max_subscribers = max_subscribers
+        self._subscribers: Set[Subscription] = set()
+        self.epoch = secrets.token_hex(4)
+        self._replay: Deque[Tuple[int, Tuple[str, str, Dict[str, Any]]]] = deque(maxlen=replay_size)
+        self._next_id = 1
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._lock = threading.Lock()
+
+    def subscribe(self, last_event_id: Optional[str] = None) -> Optional[Subscription]:
+        """
+        Register a new client.
+
+        Args:
+            last_event_id: ID of the last event the client saw, when reconnecting
+
+        Returns:
+            Subscription, or None when the subscriber limit is reached
+        """
+        if len(self._subscribers) >= self.max_subscribers:
+            return None
+        self._loop = asyncio.get_running_loop()
+        subscription = Subscription(self.buffer_size)
+
+        if last_event_id is not None:
+            seen = self._sequence(last_event_id)
+            with self._lock:
+                latest = self._next_id - 1
+                oldest = self._replay[0][0] if self._replay else self._next_id
+                backlog = [event for seq, event in self._replay if seen is not None and seq > seen]
+            if seen is None or seen > latest or seen + 1 < oldest or len(backlog) >= self.buffer_size:
+                # Unknown ID (other process or epoch) or missed events have left the replay buffer;
+                # after refetching the client is current, so the resync carries the latest ID
+                subscription.push((self.event_id(latest), 'resync', {'reason': 'events expired'}))
+            else:
+                for event in backlog:
+                    subscription.push(event)
+
+        self._subscribers.add(subscription)
+        return subscription
+
+    def event_id(self, sequence: int) -> str:
+        return f'{self.epoch}-{sequence}'
+
+    def _sequence(self, event_id: str) -> Optional[int]:
+        """Sequence number of an ID issued by this hub, or None"""
+        epoch, _, sequence = event_id.strip().partition('-')
+        if epoch != self.epoch or not sequence.isdigit():
+            return None
+        return int(sequence)
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        self._subscribers.discard(subscription)
+
+    def publish(self, change: Dict[str, Any]) -> None:
+        """
+        Publish a change recorded by the ChangeTracker.
+
+        Args:
+            change: Change dictionary ({'table', 'action', 'id', 'version'})
+        """
+        with self._lock:
+            sequence = self._next_id
+            event = (self.event_id(sequence), change.get('table', 'change'), change)
+            self._next_id += 1
+            self._replay.append((sequence, event))
+
+        loop = self._loop
+        if loop is None or loop.is_closed() or not self._subscribers:
+            return
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is loop:
+            self._dispatch(event)
+        else:
+            loop.call_soon_threadsafe(self._dispatch, event)
+
+    def subscriber_count(self) -> int:
+        return len(self._subscribers)
+
+    def _dispatch(self, event: Tuple[str, str, Dict[str, Any]]) -> None:
+        for subscription in list(self._subscribers):
+            subscription.push(event)
+
+
+def format_sse(event_id: str, event: str, data: Dict[str, Any]) -> str:
+    """Encode one event in text/event-stream format"""
+    return f"id: {event_id}\nevent: {event}\ndata: {json.dumps(data, separators=(',', ':'))}\n\n"
+
+
+# Create singleton instance
+event_hub = ChangeEventHub()
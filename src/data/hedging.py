@@ -0,0 +1,126 @@
+"""
+Hedged Reads
+Latency tracking and the hedging policy used by the DataClient: when an
+idempotent read on the critical path has not answered within a high
+percentile of its usual latency, a second copy is sent and the first answer
+wins. A token budget caps the extra load.
+"""
+
+import contextvars
+import os
+import threading
+from collections import deque
+from contextlib import contextmanager
+from typing import Any, Deque, Dict, Iterator, List, Optional
+
+_hedging: contextvars.ContextVar[bool] = contextvars.ContextVar('hedged_reads', default=False)
+
+
+@contextmanager
+def hedged_reads() -> Iterator[None]:
+    """Allow reads executed inside the block to be hedged (if HEDGED_READS is enabled)"""
+    token = _hedging.set(True)
+    try:
+        yield
+    finally:
+        _hedging.reset(token)
+
+
+def hedging_requested() -> bool:
+    return _hedging.get()
+
+
+class LatencyTracker:
+    """Recent read latencies per query label (bounded sample per label)"""
+
+    def __init__(self, samples: int = 256):
+        self.samples = samples
+        self._latencies: Dict[str, Deque[float]] = {}
+        self._lock = threading.Lock()
+
+    def record(self, label: str, seconds: float) -> None:
+        with self._lock:
+            latencies = self._latencies.get(label)
+            if latencies is None:
+                latencies = self._latencies[label] = deque(maxlen=self.samples)
+            latencies.append(seconds)
+
+    def labels(self) -> List[str]:
+        with self._lock:
+            return list(self._latencies)
+
+    def percentile(self, label: str, percentile: float) -> Optional[float]:
+        """Latency at the given percentile (0-100), or None with too few samples"""
+        with self._lock:
+            latencies = sorted(self._latencies.get(label, ()))
+        if len(latencies) < 20:
+            return None
+        return latencies[min(len(latencies) - 1, int(len(latencies) * percentile / 100))]
+
+
+class HedgePolicy:
+    """
+    When to send a hedge, and whether the budget allows it.
+
+    The delay is the label's latency at `percentile` (so only the slowest
+    ~5% of reads are hedged), never below min_delay. Each hedge-eligible read
+    earns `budget` tokens (up to burst); a hedge spends one, so hedges stay
+    under `budget` of eligible reads even during a slowdown.
+    """
+
+    def __init__(self, percentile: float = 95.0, budget: float = 0.1, min_delay: float = 0.005,
+                 default_delay: float = 0.05, burst: float = 10.0):
+        self.percentile = percentile
+        self.budget = budget
+        self.min_delay = min_delay
+        self.default_delay = default_delay
+        self.burst = burst
+        self.latency = LatencyTracker()
+        self._tokens = burst
+        self._lock = threading.Lock()
+        self._stats = {'eligible': 0, 'hedged': 0, 'hedge_wins': 0, 'budget_denied': 0}
+
+    def delay(self, label: str) -> float:
+        observed = self.latency.percentile(label, self.percentile)
+        return max(self.min_delay, observed if observed is not None else self.default_delay)
+
+    def note_eligible(self) -> None:
+        with self._lock:
+            self._stats['eligible'] += 1
+            self._tokens = min(self.burst, self._tokens + self.budget)
+
+    def try_acquire(self) -> bool:
+        """Spend one hedge token; False (and counted) when the budget is exhausted"""
+        with self._lock:
+            if self._tokens >= 1:
+                self._tokens -= 1
+                self._stats['hedged'] += 1
+                return True
+            self._stats['budget_denied'] += 1
+            return False
+
+    def note_hedge_win(self) -> None:
+        with self._lock:
+            self._stats['hedge_wins'] += 1
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self._stats)
+        delays = {label: round(self.delay(label) * 1000, 1) for label in self.latency.labels()}
+        return {**stats, 'percentile': self.percentile, 'budget': self.budget, 'delay_ms': delays}
+
+
+def create_hedge_policy() -> Optional[HedgePolicy]:
+    """
+    Build the hedging policy from the environment, or None when disabled.
+
+    HEDGED_READS=1 enables hedging for reads inside hedged_reads() blocks;
+    HEDGE_PERCENTILE (default 95) and HEDGE_BUDGET (default 0.1, the maximum
+    extra reads as a fraction of eligible reads) tune it.
+    """
+    if os.getenv('HEDGED_READS', '0').lower() not in ('1', 'true', 'on'):
+        return None
+    return HedgePolicy(
+        percentile=float(os.getenv('HEDGE_PERCENTILE', '95')),
+        budget=float(os.getenv('HEDGE_BUDGET', '0.1'))
+    )
@@ -0,0 +1,326 @@
+"""
+Cross-Worker Cache Invalidation Bus
+Broadcasts compact change messages so every worker's caches stay coherent
+"""
+
+import asyncio
+import glob
+import json
+import os
+import queue
+import secrets
+import socket
+import threading
+from abc import ABC, abstractmethod
+from typing import Any, Callable, Dict, List, Optional
+
+# Postgres NOTIFY channel shared by every worker
+DEFAULT_CHANNEL = 'csr_invalidation'
+
+# Tables whose caches are dropped wholesale when messages may have been lost
+RESYNC_TABLES = ('users', 'roles')
+RESYNC_ACTION = 'resync'
+
+# Reconnect backoff for the Postgres connections (seconds)
+RECONNECT_MIN_DELAY = 0.5
+RECONNECT_MAX_DELAY = 30.0
+
+
+class InvalidationBus(ABC):
+    """
+    Base class for invalidation transports.
+
+    Messages are small JSON objects ({"o": origin, "t": table, "a": action,
+    "i": id}). Each worker tags its messages with a random origin and drops
+    its own messages on receipt, since local caches were already updated.
+    A 'resync' action with no id means messages may have been lost and the
+    table's caches should be dropped.
+    """
+
+    def __init__(self):
+        self.origin = secrets.token_hex(4)
+        self._handlers: List[Callable[[Dict[str, Any]], None]] = []
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def subscribe(self, handler: Callable[[Dict[str, Any]], None]) -> None:
+        """Register a handler called with each change made by another worker"""
+        self._handlers.append(handler)
+
+    def publish(self, change: Dict[str, Any]) -> None:
+        """
+        Broadcast a local change. Changes that themselves came from the bus
+        are ignored so messages never bounce between workers.
+
+        Args:
+            change: Change dictionary from the ChangeTracker
+        """
+        if change.get('remote'):
+            return
+        message = {'o': self.origin, 't': change['table'], 'a': change['action'], 'i': change.get('id')}
+        try:
+            self._send(json.dumps(message, separators=(',', ':')))
+        except Exception as e:
+            # Never fail the mutation because peers could not be told
+            print(f"Invalidation bus publish error: {e}")
+
+    async def start(self) -> None:
+        """Start receiving messages on the running event loop"""
+        self._loop = asyncio.get_running_loop()
+
+    async def stop(self) -> None:
+        """Stop receiving messages and release resources"""
+
+    @abstractmethod
+    def _send(self, payload: str) -> None:
+        """Transmit one encoded message to the other workers"""
+
+    def _resync_message(self, table: str, origin: Optional[str] = None) -> str:
+        return json.dumps({'o': origin, 't': table, 'a': RESYNC_ACTION, 'i': None}, separators=(',', ':'))
+
+    def _deliver(self, payload: str) -> None:
+        try:
+            message = json.loads(payload)
+        except ValueError:
+            print(f"Invalidation bus: ignoring malformed message {payload!r}")
+            return
+        if message.get('o') == self.origin:
+            return
+        change = {'table': message.get('t'), 'action': message.get('a'), 'id': message.get('i')}
+        for handler in list(self._handlers):
+            try:
+                handler(change)
+            except Exception as e:
+                print(f"Invalidation handler error: {e}")
+
+    def _deliver_threadsafe(self, payload: str) -> None:
+        if self._loop is not None and not self._loop.is_closed():
+            self._loop.call_soon_threadsafe(self._deliver, payload)
+
+
+class InMemoryInvalidationBus(InvalidationBus):
+    """
+    In-process stand-in used by tests and single-worker deployments.
+    Buses created with the same ``network`` list see each other's messages.
+    """
+
+    def __init__(self, network: Optional[List['InMemoryInvalidationBus']] = None):
+        super().__init__()
+        self._network = network if network is not None else []
+        self._network.append(self)
+
+    def _send(self, payload: str) -> None:
+        for bus in list(self._network):
+            bus._deliver(payload)
+
+
+class LocalSocketInvalidationBus(InvalidationBus):
+    """
+    Unix datagram sockets for workers on the same host.
+
+    Every worker binds ``<socket_dir>/<origin>.sock`` and publishes by
+    sending one datagram to each socket in the directory. Sockets left
+    behind by dead workers are removed on the first failed send.
+    """
+
+    def __init__(self, socket_dir: str):
+        super().__init__()
+        self.socket_dir = socket_dir
+        self.path = os.path.join(socket_dir, f'{self.origin}.sock')
+        self._sock: Optional[socket.socket] = None
+        self._sender = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        self._sender.setblocking(False)
+
+    async def start(self) -> None:
+        await super().start()
+        os.makedirs(self.socket_dir, exist_ok=True)
+        self._sock = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        self._sock.setblocking(False)
+        self._sock.bind(self.path)
+        self._loop.add_reader(self._sock.fileno(), self._on_readable)
+
+    async def stop(self) -> None:
+        if self._sock is not None:
+            self._loop.remove_reader(self._sock.fileno())
+            self._sock.close()
+            self._sock = None
+        self._sender.close()
+        if os.path.exists(self.path):
+            os.unlink(self.path)
+
+    def _send(self, payload: str) -> None:
+        data = payload.encode('utf-8')
+        for path in glob.glob(os.path.join(self.socket_dir, '*.sock')):
+            if path == self.path:
+                continue
+            try:
+                self._sender.sendto(data, path)
+            except (ConnectionRefusedError, FileNotFoundError):
+                try:
+                    os.unlink(path)
+                except OSError:
+                    pass
+            except BlockingIOError:
+                print(f"Invalidation bus: peer {path} is not draining, message dropped")
+
+    def _on_readable(self) -> None:
+        while self._sock is not None:
+            try:
+                data = self._sock.recv(65536)
+            except (BlockingIOError, InterruptedError):
+                return
+            self._deliver(data.decode('utf-8'))
+
+
+class PostgresInvalidationBus(InvalidationBus):
+    """
+    Postgres LISTEN/NOTIFY for workers spread across hosts or pods.
+
+    Requires the optional ``psycopg`` (v3) package and a direct database
+    URL (DATABASE_URL); PostgREST cannot hold a LISTEN session.
+
+    NOTIFY runs on a background thread fed by a bounded outbox, so
+    ChangeTracker.record() never waits for the database. Both connections
+    reconnect with exponential backoff. Messages may be lost while a
+    connection is down, so after reconnecting the listener drops this
+    worker's caches and the publisher tells every peer to drop theirs (a
+    'resync' change for each of RESYNC_TABLES).
+    """
+
+    def __init__(self, dsn: str, channel: str = DEFAULT_CHANNEL, outbox_size: int = 1000):
+        super().__init__()
+        try:
+            import psycopg
+        except ImportError:
+            raise ImportError("PostgresInvalidationBus requires the 'psycopg' package (pip install psycopg)")
+        if not channel.isidentifier():
+            raise ValueError(f"Invalid NOTIFY channel name '{channel}'")
+        self._psycopg = psycopg
+        self.dsn = dsn
+        self.channel = channel
+        self._outbox: queue.Queue = queue.Queue(maxsize=outbox_size)
+        self._publisher = None
+        self._publisher_thread: Optional[threading.Thread] = None
+        # Set when a message could not be sent; the next successful send is preceded by a resync
+        self._peers_stale = False
+        self._listener_thread: Optional[threading.Thread] = None
+        self._listen_conn = None
+        self._stopping = threading.Event()
+
+    async def start(self) -> None:
+        await super().start()
+        self._stopping.clear()
+        # Connect once up front so a bad DATABASE_URL fails at startup, not in a thread
+        self._listen_conn = self._connect_listener()
+        self._listener_thread = threading.Thread(target=self._listen, name='invalidation-listener', daemon=True)
+        self._listener_thread.start()
+        self._publisher_thread = threading.Thread(target=self._publish_loop, name='invalidation-publisher', daemon=True)
+        self._publisher_thread.start()
+
+    async def stop(self) -> None:
+        self._stopping.set()
+        try:
+            self._outbox.put_nowait(None)
+        except queue.Full:
+            pass
+        self._close(self._listen_conn)
+        for thread in (self._publisher_thread, self._listener_thread):
+            if thread is not None:
+                await asyncio.to_thread(thread.join, 2)
+        self._close(self._publisher)
+
+    def _send(self, payload: str) -> None:
+        try:
+            self._outbox.put_nowait(payload)
+        except queue.Full:
+            self._peers_stale = True
+            print("Invalidation bus: outbox full, message dropped (peers will be told to resync)")
+
+    def _connect_listener(self) -> Any:
+        conn = self._psycopg.connect(self.dsn, autocommit=True)
+        conn.execute(f'LISTEN {self.channel}')
+        return conn
+
+    def _close(self, conn: Any) -> None:
+        if conn is not None:
+            try:
+                conn.close()
+            except Exception:
+                pass
+
+    def _backoff(self, delay: float) -> float:
+        self._stopping.wait(delay)
+        return min(delay * 2, RECONNECT_MAX_DELAY)
+
+    def _publish_loop(self) -> None:
+        delay = RECONNECT_MIN_DELAY
+        payload = None
+        while True:
+            if payload is None:
+                payload = self._outbox.get()
+                if payload is None or self._stopping.is_set():
+                    return
+            try:
+                if self._publisher is None:
+                    self._publisher = self._psycopg.connect(self.dsn, autocommit=True)
+                if self._peers_stale:
+                    for table in RESYNC_TABLES:
+                        self._publisher.execute('SELECT pg_notify(%s, %s)',
+                                                (self.channel, self._resync_message(table, self.origin)))
+                    self._peers_stale = False
+                self._publisher.execute('SELECT pg_notify(%s, %s)', (self.channel, payload))
+                payload = None
+                delay = RECONNECT_MIN_DELAY
+            except Exception as e:
+                if self._stopping.is_set():
+                    return
+                print(f"Invalidation bus publish error, reconnecting in {delay:.1f}s: {e}")
+                self._close(self._publisher)
+                self._publisher = None
+                # Retry this message after reconnecting, preceded by a resync for anything lost meanwhile
+                self._peers_stale = True
+                delay = self._backoff(delay)
+
+    def _listen(self) -> None:
+        delay = RECONNECT_MIN_DELAY
+        while not self._stopping.is_set():
+            try:
+                if self._listen_conn is None:
+                    self._listen_conn = self._connect_listener()
+                    print("Invalidation bus listener reconnected; dropping local caches")
+                    for table in RESYNC_TABLES:
+                        self._deliver_threadsafe(self._resync_message(table))
+                    delay = RECONNECT_MIN_DELAY
+                for notify in self._listen_conn.notifies():
+                    if self._stopping.is_set():
+                        return
+                    self._deliver_threadsafe(notify.payload)
+            except Exception as e:
+                if self._stopping.is_set():
+                    return
+                print(f"Invalidation bus listener lost its connection, reconnecting in {delay:.1f}s: {e}")
+                self._close(self._listen_conn)
+                self._listen_conn = None
+                delay = self._backoff(delay)
+
+
+def create_invalidation_bus() -> InvalidationBus:
+    """
+    Build the bus selected by the INVALIDATION_BUS environment variable.
+
+    'memory' (default) keeps everything in-process, 'socket' uses
+    INVALIDATION_SOCKET_DIR, 'postgres' uses DATABASE_URL.
+
+    Returns:
+        Configured InvalidationBus (not yet started)
+    """
+    kind = os.getenv('INVALIDATION_BUS', 'memory').lower()
+    if kind == 'socket':
+        return LocalSocketInvalidationBus(os.getenv('INVALIDATION_SOCKET_DIR', '/tmp/csr-invalidation'))
+    if kind == 'postgres':
+        dsn = os.getenv('DATABASE_URL')
+        if not dsn:
+            raise ValueError("DATABASE_URL must be set when INVALIDATION_BUS=postgres")
+        return PostgresInvalidationBus(dsn, os.getenv('INVALIDATION_CHANNEL', DEFAULT_CHANNEL))
+    if kind != 'memory':
+        raise ValueError(f"Unknown INVALIDATION_BUS '{kind}' (expected memory, socket or postgres)")
+    return InMemoryInvalidationBus()
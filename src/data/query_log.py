@@ -0,0 +1,155 @@
+"""
+Query Log
+Per-fingerprint latency histograms and a ring buffer of recent slow queries,
+fed by the DataClient observer hook. Fingerprints carry the query shape
+(table, operation, filtered columns) but never the values.
+"""
+
+import bisect
+import hashlib
+import os
+import threading
+import time
+from collections import deque
+from typing import Any, Deque, Dict, Optional
+
+# Histogram bucket upper bounds in milliseconds (the last bucket is open-ended)
+BUCKETS_MS = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+OTHER_FINGERPRINT = '<other>'
+QUERY_SORT_FIELDS = ('total_ms', 'p95_ms', 'max_ms', 'calls', 'errors')
+
+
+def fingerprint_id(fingerprint: str) -> str:
+    """Short stable id for a fingerprint (for logs and URLs)"""
+    return hashlib.sha1(fingerprint.encode()).hexdigest()[:12]
+
+
+class QueryStats:
+    """Counters and a latency histogram for one fingerprint"""
+
+    def __init__(self, fingerprint: str):
+        self.fingerprint = fingerprint
+        self.calls = 0
+        self.errors = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.rows = 0
+        self.buckets = [0] * (len(BUCKETS_MS) + 1)
+
+    def add(self, ms: float, ok: bool, rows: Optional[int]) -> None:
+        self.calls += 1
+        self.errors += not ok
+        self.total_ms += ms
+        self.max_ms = max(self.max_ms, ms)
+        self.rows += rows or 0
+        self.buckets[bisect.bisect_left(BUCKETS_MS, ms)] += 1
+
+    def percentile(self, percentile: float) -> Optional[float]:
+        """Upper bound of the bucket holding the given percentile (max_ms for the open bucket)"""
+        if not self.calls:
+            return None
+        rank = self.calls * percentile / 100
+        seen = 0
+        for index, count in enumerate(self.buckets):
+            seen += count
+            if seen >= rank:
+                return float(BUCKETS_MS[index]) if index < len(BUCKETS_MS) else round(self.max_ms, 2)
+        return round(self.max_ms, 2)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'id': fingerprint_id(self.fingerprint),
+            'fingerprint': self.fingerprint,
+            'calls': self.calls,
+            'errors': self.errors,
+            'total_ms': round(self.total_ms, 2),
+            'mean_ms': round(self.total_ms / self.calls, 2) if self.calls else None,
+            'p50_ms': self.percentile(50),
+            'p95_ms': self.percentile(95),
+            'p99_ms': self.percentile(99),
+            'max_ms': round(self.max_ms, 2),
+            'mean_rows': round(self.rows / self.calls, 1) if self.calls else None,
+            'histogram': dict(zip([f'le_{bound}ms' for bound in BUCKETS_MS] + ['gt_10000ms'], self.buckets))
+        }
+
+
+class QueryLog:
+    """
+    Thread-safe query statistics for the whole process.
+
+    At most max_fingerprints distinct shapes are tracked; further shapes
+    share the '<other>' entry so dynamically built queries cannot grow
+    memory without bound. Calls slower than slow_ms go to a ring buffer of
+    the last slow_log_size slow queries and are printed.
+    """
+
+    def __init__(self, slow_ms: float = 200.0, slow_log_size: int = 100, max_fingerprints: int = 500):
+        self.slow_ms = slow_ms
+        self.max_fingerprints = max_fingerprints
+        self._stats: Dict[str, QueryStats] = {}
+        self._slow: Deque[Dict[str, Any]] = deque(maxlen=slow_log_size)
+        self._since = time.time()
+        self._lock = threading.Lock()
+
+    def observe(self, event: Dict[str, Any]) -> None:
+        """DataClient observer"""
+        fingerprint = event['query'].fingerprint
+        ms = event['seconds'] * 1000
+        with self._lock:
+            stats = self._stats.get(fingerprint)
+            if stats is None:
+                if len(self._stats) >= self.max_fingerprints:
+                    fingerprint = OTHER_FINGERPRINT
+                stats = self._stats.setdefault(fingerprint, QueryStats(fingerprint))
+            stats.add(ms, event['ok'], event['rows'])
+            if ms < self.slow_ms:
+                return
+            self._slow.append({
+                'at': time.time(),
+                'id': fingerprint_id(fingerprint),
+                'fingerprint': fingerprint,
+                'endpoint': event['endpoint'],
+                'ms': round(ms, 2),
+                'rows': event['rows'],
+                'ok': event['ok'],
+                'error': event['error']
+            })
+        print(f"Slow query ({ms:.0f} ms, {event['endpoint']}): {fingerprint}")
+
+    def get_stats(self, sort: str = 'total_ms', limit: int = 50) -> Dict[str, Any]:
+        """
+        Snapshot of the log.
+
+        Args:
+            sort: Field to rank fingerprints by (total_ms, p95_ms, max_ms, calls or errors)
+            limit: Number of fingerprints to return
+
+        Returns:
+            Dictionary with the top fingerprints, the slow-query buffer (newest first) and settings
+        """
+        with self._lock:
+            fingerprints = [stats.to_dict() for stats in self._stats.values()]
+            slow = list(reversed(self._slow))
+            tracked = len(self._stats)
+        fingerprints.sort(key=lambda stats: stats.get(sort) or 0, reverse=True)
+        return {
+            'since': self._since,
+            'slow_ms': self.slow_ms,
+            'fingerprints_tracked': tracked,
+            'fingerprints': fingerprints[:limit],
+            'slow_queries': slow
+        }
+
+    def reset(self) -> None:
+        with self._lock:
+            self._stats.clear()
+            self._slow.clear()
+            self._since = time.time()
+
+
+def create_query_log() -> QueryLog:
+    """Query log from the environment: SLOW_QUERY_MS (default 200) and SLOW_QUERY_LOG_SIZE (default 100)"""
+    return QueryLog(
+        slow_ms=float(os.getenv('SLOW_QUERY_MS', '200')),
+        slow_log_size=int(os.getenv('SLOW_QUERY_LOG_SIZE', '100'))
+    )
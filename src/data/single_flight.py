@@ -0,0 +1,90 @@
+"""
+Single-Flight Request Coalescing
+Concurrent identical reads share one in-flight query and its result
+"""
+
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Hashable
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls that share the same key.
+
+    The first caller for a key starts the query; callers that arrive while it
+    is still running await the same task instead of issuing their own query.
+    Nothing is cached: once the task finishes, the next call runs again.
+    """
+
+    def __init__(self):
+        self._inflight: Dict[Hashable, asyncio.Task] = {}
+        self._stats: Dict[str, Dict[str, int]] = {}
+
+    async def do(self, key: Hashable, fn: Callable[..., Awaitable[Any]], *args) -> Any:
+        """
+        Run ``fn(*args)`` once for all concurrent callers with the same key.
+
+        Args:
+            key: Identity of the read (tuple whose first item names the query)
+            fn: Coroutine function performing the read
+            *args: Arguments passed to fn
+
+        Returns:
+            The shared result of the in-flight call
+        """
+        stats = self._stats_for(key)
+        stats['calls'] += 1
+
+        task = self._inflight.get(key)
+        if task is not None:
+            stats['coalesced'] += 1
+        else:
+            stats['executions'] += 1
+            task = asyncio.ensure_future(fn(*args))
+            self._inflight[key] = task
+            task.add_done_callback(lambda t: self._finish(key, t))
+
+        # Shield so one caller disconnecting does not cancel the query for the others
+        return await asyncio.shield(task)
+
+    async def do_blocking(self, key: Hashable, fn: Callable[..., Any], *args) -> Any:
+        """
+        Coalesce a blocking (synchronous) read by running it in a worker thread.
+
+        Args:
+            key: Identity of the read
+            fn: Synchronous function performing the read
+            *args: Arguments passed to fn
+
+        Returns:
+            The shared result of the in-flight call
+        """
+        return await self.do(key, asyncio.to_thread, fn, *args)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Snapshot of coalescing metrics.
+
+        Returns:
+            Dictionary with per-query counters and the total DB calls saved
+        """
+        queries = {name: dict(counters) for name, counters in self._stats.items()}
+        return {
+            'in_flight': len(self._inflight),
+            'saved_db_calls': sum(c['coalesced'] for c in queries.values()),
+            'queries': queries
+        }
+
+    def _stats_for(self, key: Hashable) -> Dict[str, int]:
+        name = str(key[0] if isinstance(key, tuple) and key else key)
+        if name not in self._stats:
+            self._stats[name] = {'calls': 0, 'executions': 0, 'coalesced': 0, 'errors': 0}
+        return self._stats[name]
+
+    def _finish(self, key: Hashable, task: asyncio.Task) -> None:
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        if task.cancelled():
+            return
+        if task.exception() is not None:
+            self._stats_for(key)['errors'] += 1
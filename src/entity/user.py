@@ -20,7 +20,8 @@ class User:
         role_code: Optional[str] = None,
         dashboard_route: Optional[str] = None,
         is_active: bool = True,
-        last_login: Optional[datetime] = None
+        last_login: Optional[datetime] = None,
+        version: Optional[int] = None
     ):
         self.id = id
         self.username = username
@@ -32,6 +33,7 @@ class User:
         self.dashboard_route = dashboard_route
         self.is_active = is_active
         self.last_login = last_login
+        self.version = version
     
     def to_dict(self) -> Dict[str, Any]:
         """Convert user to dictionary"""
@@ -53,7 +55,8 @@ class User:
             'role_code': self.role_code,
             'dashboard_route': self.dashboard_route,
             'is_active': self.is_active,
-            'last_login': last_login_str
+            'last_login': last_login_str,
+            'version': self.version
         }
     
     @staticmethod
@@ -69,6 +72,7 @@ class User:
             role_code=data.get('role_code'),
             dashboard_route=data.get('dashboard_route'),
             is_active=data.get('is_active', True),
-            last_login=data.get('last_login')
+            last_login=data.get('last_login'),
+            version=data.get('version')
         )
 
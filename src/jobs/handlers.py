@@ -0,0 +1,302 @@
+"""
+Job Handlers
+Chunked implementations of the admin operations that are too large to run
+inside an HTTP request. Each call processes one chunk from job.checkpoint.
+"""
+
+import csv
+import io
+import os
+from typing import Any, Dict, Iterator, List, Optional
+
+from data.change_tracker import change_tracker
+from jobs.store import Job
+
+DELETE_ROLE = 'delete_role'
+BULK_SUSPEND = 'bulk_suspend'
+REASSIGN_ROLE = 'reassign_role'
+EXPORT_USERS = 'export_users'
+SWEEP_INACTIVE = 'sweep_inactive'
+
+# Roles never swept unless a sweep names its own exclusions (do not lock out every admin)
+SWEEP_EXCLUDED_ROLES = ['USER_ADMIN']
+
+EXPORT_COLUMNS = ['id', 'username', 'full_name', 'email', 'role_name', 'role_code', 'is_active', 'last_login',
+                  'created_at']
+
+
+# Output chunks read per query when a result is downloaded
+EXPORT_READ_PAGE = 20
+
+
+def _count(query: Any) -> int:
+    return query.limit(1).execute().count or 0
+
+
+def _positive_int(params: Dict[str, Any], key: str) -> Optional[int]:
+    value = params.get(key)
+    if value is None:
+        return None
+    if isinstance(value, bool) or not isinstance(value, int) or value <= 0:
+        raise ValueError(f"'{key}' must be a positive integer")
+    return value
+
+
+# ========================================
+# CASCADE ROLE DELETE
+# ========================================
+
+def validate_delete_role(params: Dict[str, Any]) -> None:
+    if _positive_int(params, 'role_id') is None:
+        raise ValueError("'role_id' is required")
+
+
+def delete_role(supabase: Any, job: Job, chunk_size: int) -> bool:
+    """
+    Delete the role's users one chunk at a time, then the role itself
+    (a single cascading DELETE on roles would lock every user row at once).
+    """
+    role_id = job.params['role_id']
+    if job.progress_total is None:
+        job.progress_total = _count(supabase.table('users').select('id', count='exact').eq('role_id', role_id))
+
+    rows = supabase.table('users').select('id').eq('role_id', role_id).order('id').limit(chunk_size).execute().data
+    if rows:
+        ids = [row['id'] for row in rows]
+        supabase.table('users').delete().eq('role_id', role_id).in_('id', ids).execute()
+        job.progress_done += len(ids)
+        # One record per id, so token revocation knows exactly which accounts went away
+        for user_id in ids:
+            change_tracker.record('users', 'deleted', user_id)
+        return False
+
+    result = supabase.table('roles').delete().eq('id', role_id).execute()
+    if result.data:
+        change_tracker.record('roles', 'deleted', role_id)
+    job.result = {'role_id': role_id, 'deleted_users': job.progress_done, 'role_deleted': bool(result.data)}
+    return True
+
+
+# ========================================
+# ROLE REASSIGNMENT
+# ========================================
+
+def validate_reassign_role(params: Dict[str, Any]) -> None:
+    from_role_id = _positive_int(params, 'from_role_id')
+    to_role_id = _positive_int(params, 'to_role_id')
+    if from_role_id is None or to_role_id is None:
+        raise ValueError("'from_role_id' and 'to_role_id' are required")
+    if from_role_id == to_role_id:
+        raise ValueError('Source and target role must be different')
+
+
+def reassign_role(supabase: Any, job: Job, chunk_size: int) -> bool:
+    """
+    Move one batch of users to the target role with a single UPDATE
+    (reassign_role_users()); with params['delete_role'], delete the emptied
+    source role at the end.
+    """
+    from_role_id, to_role_id = job.params['from_role_id'], job.params['to_role_id']
+    if job.progress_total is None:
+        job.progress_total = _count(supabase.table('users').select('id', count='exact').eq('role_id', from_role_id))
+
+    moved = int(supabase.rpc('reassign_role_users', {
+        'p_from_role_id': from_role_id, 'p_to_role_id': to_role_id, 'p_batch_size': chunk_size
+    }).execute().data or 0)
+    if moved:
+        job.progress_done += moved
+        change_tracker.record('users', 'updated')
+        return False
+
+    job.result = {'from_role_id': from_role_id, 'to_role_id': to_role_id, 'moved_users': job.progress_done}
+    if job.params.get('delete_role'):
+        result = supabase.table('roles').delete().eq('id', from_role_id).execute()
+        if result.data:
+            change_tracker.record('roles', 'deleted', from_role_id)
+        job.result['role_deleted'] = bool(result.data)
+    return True
+
+
+# ========================================
+# BULK SUSPEND
+# ========================================
+
+def validate_bulk_suspend(params: Dict[str, Any]) -> None:
+    user_ids = params.get('user_ids')
+    role_id = _positive_int(params, 'role_id')
+    if (user_ids is None) == (role_id is None):
+        raise ValueError("Provide exactly one of 'user_ids' or 'role_id'")
+    if user_ids is not None and (not isinstance(user_ids, list) or not user_ids
+                                 or not all(isinstance(i, int) and not isinstance(i, bool) for i in user_ids)):
+        raise ValueError("'user_ids' must be a non-empty list of integers")
+
+
+def bulk_suspend(supabase: Any, job: Job, chunk_size: int) -> bool:
+    """Suspend active users by id list or by role, walking ids in ascending order"""
+    def active_users(query: Any) -> Any:
+        query = query.eq('is_active', True)
+        if job.params.get('role_id') is not None:
+            return query.eq('role_id', job.params['role_id'])
+        return query.in_('id', job.params['user_ids'])
+
+    if job.progress_total is None:
+        job.progress_total = _count(active_users(supabase.table('users').select('id', count='exact')))
+
+    after = job.checkpoint.get('after', 0)
+    rows = active_users(supabase.table('users').select('id')).gt('id', after).order('id').limit(chunk_size).execute().data
+    if not rows:
+        job.result = {'suspended': job.progress_done}
+        return True
+
+    ids = [row['id'] for row in rows]
+    result = supabase.table('users').update({'is_active': False}).in_('id', ids).eq('is_active', True).execute()
+    suspended = [row['id'] for row in result.data] if result.data is not None else ids
+    job.progress_done += len(suspended)
+    job.checkpoint = {'after': ids[-1]}
+    _record_suspended(suspended)
+    return False
+
+
+def _record_suspended(user_ids: List[int]) -> None:
+    """Record each suspension so listeners can drop cached state and revoke the users' tokens"""
+    for user_id in user_ids:
+        change_tracker.record('users', 'suspended', user_id)
+
+
+# ========================================
+# INACTIVE-ACCOUNT SWEEP
+# ========================================
+
+def validate_sweep_inactive(params: Dict[str, Any]) -> None:
+    if _positive_int(params, 'inactive_days') is None:
+        raise ValueError("'inactive_days' is required")
+    excluded = params.get('exclude_role_codes')
+    if excluded is not None and (not isinstance(excluded, list) or not all(isinstance(c, str) for c in excluded)):
+        raise ValueError("'exclude_role_codes' must be a list of role codes")
+    if params.get('dry_run') is not None and not isinstance(params['dry_run'], bool):
+        raise ValueError("'dry_run' must be true or false")
+
+
+def sweep_inactive(supabase: Any, job: Job, chunk_size: int) -> bool:
+    """
+    Suspend one batch of accounts whose last login (or creation, if they
+    never logged in) is older than params['inactive_days'], with a single
+    UPDATE (suspend_inactive_users() in migrations/add_inactive_user_sweep.sql).
+    With params['dry_run'], only count them.
+    """
+    days = job.params['inactive_days']
+    excluded = job.params.get('exclude_role_codes', SWEEP_EXCLUDED_ROLES)
+    if job.progress_total is None:
+        job.progress_total = int(supabase.rpc('count_inactive_users', {
+            'p_inactive_days': days, 'p_exclude_role_codes': excluded
+        }).execute().data or 0)
+    if job.params.get('dry_run'):
+        job.result = {'inactive_days': days, 'would_suspend': job.progress_total, 'dry_run': True}
+        return True
+
+    rows = supabase.rpc('suspend_inactive_users', {
+        'p_inactive_days': days, 'p_batch_size': chunk_size, 'p_exclude_role_codes': excluded
+    }).execute().data or []
+    suspended = [row['id'] for row in rows]
+    job.progress_done += len(suspended)
+    _record_suspended(suspended)
+    # A short batch is not the end: rows locked by another transaction are skipped (SKIP LOCKED)
+    if suspended:
+        return False
+
+    job.result = {'inactive_days': days, 'suspended': job.progress_done}
+    print(f"Inactive-account sweep ({days} days): suspended {job.progress_done} account(s)")
+    return True
+
+
+# ========================================
+# USER EXPORT
+# ========================================
+
+def validate_export_users(params: Dict[str, Any]) -> None:
+    if params.get('role_code') is not None and not isinstance(params['role_code'], str):
+        raise ValueError("'role_code' must be a string")
+    if params.get('is_active') is not None and not isinstance(params['is_active'], bool):
+        raise ValueError("'is_active' must be true or false")
+
+
+def export_users(supabase: Any, job: Job, chunk_size: int) -> bool:
+    """
+    Render one page of user_details (keyset on id) as CSV and store it as
+    chunk number checkpoint['seq'] in the job_output table. The output lives
+    in the database rather than on the worker, so a job resumed elsewhere
+    continues it, and re-running a chunk upserts the same row.
+    """
+    def filtered(query: Any) -> Any:
+        if job.params.get('role_code') is not None:
+            query = query.eq('role_code', job.params['role_code'])
+        if job.params.get('is_active') is not None:
+            query = query.eq('is_active', job.params['is_active'])
+        return query
+
+    if job.progress_total is None:
+        job.progress_total = _count(filtered(supabase.table('user_details').select('id', count='exact')))
+
+    after = job.checkpoint.get('after', 0)
+    seq = job.checkpoint.get('seq', 0)
+    size = job.checkpoint.get('bytes', 0)
+    rows = (
+        filtered(supabase.table('user_details').select(','.join(EXPORT_COLUMNS)))
+        .gt('id', after).order('id').limit(chunk_size).execute().data
+    )
+
+    if rows or seq == 0:
+        buffer = io.StringIO(newline='')
+        writer = csv.DictWriter(buffer, fieldnames=EXPORT_COLUMNS, extrasaction='ignore')
+        if seq == 0:
+            writer.writeheader()
+        writer.writerows(rows or [])
+        data = buffer.getvalue()
+        supabase.table('job_output').upsert({'job_id': job.id, 'seq': seq, 'data': data}).execute()
+        seq += 1
+        size += len(data.encode('utf-8'))
+
+    if not rows:
+        job.result = {'rows': job.progress_done, 'chunks': seq, 'bytes': size}
+        return True
+    job.progress_done += len(rows)
+    job.checkpoint = {'after': rows[-1]['id'], 'seq': seq, 'bytes': size}
+    return False
+
+
+def export_output(supabase: Any, job_id: str) -> Iterator[str]:
+    """Yield a finished export's CSV, chunk by chunk, from the job_output table"""
+    after = -1
+    while True:
+        chunks = (
+            supabase.table('job_output').select('seq,data')
+            .eq('job_id', job_id).gt('seq', after).order('seq').limit(EXPORT_READ_PAGE).execute().data
+        )
+        if not chunks:
+            return
+        for chunk in chunks:
+            yield chunk['data']
+        after = chunks[-1]['seq']
+
+
+def register_handlers(runner: Any) -> None:
+    """
+    Register the standard job types on a JobRunner.
+
+    The sweep is throttled on its own: INACTIVE_SWEEP_BATCH (default 200)
+    accounts per statement, INACTIVE_SWEEP_PAUSE (default 1 s) between
+    statements. With INACTIVE_SWEEP_DAYS set, it is also scheduled every
+    INACTIVE_SWEEP_INTERVAL_HOURS (default 24).
+    """
+    runner.register(DELETE_ROLE, delete_role, validate_delete_role)
+    runner.register(REASSIGN_ROLE, reassign_role, validate_reassign_role)
+    runner.register(BULK_SUSPEND, bulk_suspend, validate_bulk_suspend)
+    runner.register(EXPORT_USERS, export_users, validate_export_users)
+    runner.register(SWEEP_INACTIVE, sweep_inactive, validate_sweep_inactive,
+                    chunk_size=int(os.getenv('INACTIVE_SWEEP_BATCH', '200')),
+                    chunk_pause=float(os.getenv('INACTIVE_SWEEP_PAUSE', '1.0')))
+
+    sweep_days = int(os.getenv('INACTIVE_SWEEP_DAYS', '0'))
+    if sweep_days > 0:
+        interval = float(os.getenv('INACTIVE_SWEEP_INTERVAL_HOURS', '24')) * 3600
+        runner.schedule_every(SWEEP_INACTIVE, interval, {'inactive_days': sweep_days})
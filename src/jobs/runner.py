@@ -0,0 +1,245 @@
+"""
+Background Job Runner
+Runs long admin operations (cascade role deletes, bulk suspends, exports) as
+in-process asyncio jobs instead of inside the HTTP request. Jobs run in chunks
+with a persisted checkpoint, so they report progress, can be cancelled between
+chunks, and resume where they stopped after a restart.
+"""
+
+import asyncio
+import contextvars
+import os
+import socket
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+
+from jobs.store import CANCELLED, FAILED, SUCCEEDED, Job, JobStore, utcnow
+
+# A handler processes one chunk of a job: it reads and advances job.checkpoint,
+# updates job.progress_done / progress_total / result, and returns True when the job is done.
+# Re-running a chunk from the same checkpoint must be safe (a crash can happen before it is saved).
+Handler = Callable[[Any, Job, int], bool]
+# Optional parameter check at submit time; raises ValueError with a user-facing message
+Validator = Callable[[Dict[str, Any]], None]
+
+
+class JobRunner:
+    """
+    In-process job runner with bounded concurrency.
+
+    At most max_concurrency jobs run at once, and each chunk runs in a worker
+    thread followed by a short pause, so long jobs leave the event loop and
+    the database to interactive traffic. Jobs are persisted in the store after
+    every chunk; on start() the runner claims queued jobs and jobs whose
+    worker stopped heartbeating, and resumes them from their checkpoint.
+
+    Job types can also be scheduled to run every N seconds (schedule_every);
+    each period gets a deterministic job id, so with several workers only
+    one of them creates that period's job.
+    """
+
+    def __init__(self, store: JobStore, supabase_client: Any, max_concurrency: int = 2, chunk_size: int = 500,
+                 chunk_pause: float = 0.05, stale_after: float = 60.0, worker_id: Optional[str] = None):
+        self.store = store
+        self.supabase = supabase_client
+        self.max_concurrency = max_concurrency
+        self.chunk_size = chunk_size
+        self.chunk_pause = chunk_pause
+        self.stale_after = stale_after
+        self.worker_id = worker_id or f'{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}'
+        self._handlers: Dict[str, Handler] = {}
+        self._validators: Dict[str, Validator] = {}
+        # Per-type (chunk_size, chunk_pause) overrides
+        self._chunking: Dict[str, Tuple[Optional[int], Optional[float]]] = {}
+        self._schedules: List[Tuple[str, Dict[str, Any], float]] = []
+        self._schedule_tasks: List[asyncio.Task] = []
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._tasks: Dict[str, asyncio.Task] = {}
+        self._cancelled: Set[str] = set()
+        self._stats = {'submitted': 0, 'scheduled': 0, 'resumed': 0, 'succeeded': 0, 'failed': 0, 'cancelled': 0,
+                       'chunks': 0}
+
+    def register(self, job_type: str, handler: Handler, validator: Optional[Validator] = None,
+                 chunk_size: Optional[int] = None, chunk_pause: Optional[float] = None) -> None:
+        """
+        Register a job type.
+
+        Args:
+            job_type: Name used in submissions
+            handler: Processes one chunk (see Handler)
+            validator: Checks parameters at submit time
+            chunk_size: Rows per chunk for this type (default: the runner's)
+            chunk_pause: Seconds between chunks for this type (default: the runner's);
+                together with chunk_size this caps the job's write rate
+        """
+        self._handlers[job_type] = handler
+        if validator is not None:
+            self._validators[job_type] = validator
+        self._chunking[job_type] = (chunk_size, chunk_pause)
+
+    def schedule_every(self, job_type: str, interval: float, params: Optional[Dict[str, Any]] = None) -> None:
+        """Submit a job of this type once per interval seconds (starts with start())"""
+        self._schedules.append((job_type, params or {}, interval))
+
+    @property
+    def job_types(self) -> List[str]:
+        return sorted(self._handlers)
+
+    async def start(self) -> None:
+        """Resume unfinished jobs and start the schedules (call once the event loop is running)"""
+        try:
+            jobs = await asyncio.to_thread(self.store.unfinished)
+        except Exception as e:
+            print(f"Job runner could not load unfinished jobs: {e}")
+            jobs = []
+        for job in jobs:
+            if job.id not in self._tasks:
+                self._stats['resumed'] += 1
+                self._schedule(job.id)
+        for job_type, params, interval in self._schedules:
+            task = contextvars.Context().run(asyncio.create_task, self._run_periodically(job_type, params, interval))
+            self._schedule_tasks.append(task)
+
+    async def stop(self) -> None:
+        """
+        Stop running jobs at shutdown. They stay 'running' in the store and
+        are resumed from their checkpoint once their heartbeat goes stale.
+        """
+        tasks = list(self._tasks.values()) + self._schedule_tasks
+        self._schedule_tasks = []
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def submit(self, job_type: str, params: Optional[Dict[str, Any]] = None,
+                     created_by: Optional[str] = None) -> Job:
+        """
+        Persist a new job and schedule it.
+
+        Raises:
+            ValueError: If the job type is unknown or its parameters are invalid
+        """
+        if job_type not in self._handlers:
+            raise ValueError(f"Unknown job type '{job_type}'. Expected one of: {', '.join(self.job_types)}")
+        params = params or {}
+        if job_type in self._validators:
+            self._validators[job_type](params)
+        job = await asyncio.to_thread(self.store.create, Job.new(job_type, params, created_by))
+        self._stats['submitted'] += 1
+        self._schedule(job.id)
+        return job
+
+    async def get(self, job_id: str) -> Optional[Job]:
+        return await asyncio.to_thread(self.store.get, job_id)
+
+    async def list_recent(self, limit: int = 50) -> List[Job]:
+        return await asyncio.to_thread(self.store.list_recent, limit)
+
+    async def cancel(self, job_id: str) -> Optional[Job]:
+        """
+        Request cancellation. A queued job is cancelled before it starts; a
+        running job stops after its current chunk (work already done stays done).
+        """
+        job = await asyncio.to_thread(self.store.request_cancel, job_id)
+        if job is not None and not job.finished:
+            self._cancelled.add(job_id)
+        return job
+
+    async def wait(self, job_id: str) -> None:
+        """Wait for a job scheduled by this runner to stop (tests and scripts)"""
+        task = self._tasks.get(job_id)
+        if task is not None:
+            await asyncio.gather(task, return_exceptions=True)
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {**self._stats, 'active': len(self._tasks), 'max_concurrency': self.max_concurrency,
+                'worker_id': self.worker_id, 'job_types': self.job_types}
+
+    def _schedule(self, job_id: str) -> None:
+        # Run in a fresh context: the submitting request's deadline and actor must not follow the job
+        task = contextvars.Context().run(asyncio.create_task, self._run(job_id))
+        self._tasks[job_id] = task
+        task.add_done_callback(lambda _: self._tasks.pop(job_id, None))
+
+    async def _run_periodically(self, job_type: str, params: Dict[str, Any], interval: float) -> None:
+        while True:
+            period = int(time.time() // interval)
+            job = Job.new(job_type, params, created_by='scheduler')
+            job.id = f'{job_type}-{period}'
+            try:
+                if await asyncio.to_thread(self.store.get, job.id) is None:
+                    await asyncio.to_thread(self.store.create, job)
+                    self._stats['scheduled'] += 1
+                    self._schedule(job.id)
+            except Exception as e:
+                # Typically another worker created this period's job first (duplicate id)
+                print(f"Scheduled {job_type} job {job.id} not created: {e}")
+            await asyncio.sleep(max(1.0, (period + 1) * interval - time.time()))
+
+    async def _cancel_requested(self, job: Job) -> bool:
+        if job.id in self._cancelled:
+            return True
+        # Cancellation may have been requested through another worker
+        stored = await asyncio.to_thread(self.store.get, job.id)
+        return stored is not None and stored.cancel_requested
+
+    async def _run(self, job_id: str) -> None:
+        async with self._semaphore:
+            stale_before = (datetime.now(timezone.utc) - timedelta(seconds=self.stale_after)).isoformat()
+            job = await asyncio.to_thread(self.store.claim, job_id, self.worker_id, stale_before)
+            if job is None:
+                return  # Finished, or running on a live worker
+            handler = self._handlers.get(job.job_type)
+            chunk_size, chunk_pause = self._chunking.get(job.job_type, (None, None))
+            chunk_size = chunk_size or self.chunk_size
+            chunk_pause = self.chunk_pause if chunk_pause is None else chunk_pause
+            job.started_at = job.started_at or utcnow()
+            try:
+                while True:
+                    if await self._cancel_requested(job):
+                        job.finish(CANCELLED)
+                        break
+                    if handler is None:
+                        job.finish(FAILED, f"No handler for job type '{job.job_type}'")
+                        break
+                    done = await asyncio.to_thread(handler, self.supabase, job, chunk_size)
+                    self._stats['chunks'] += 1
+                    job.heartbeat_at = utcnow()
+                    if done:
+                        job.finish(SUCCEEDED)
+                        break
+                    await asyncio.to_thread(self.store.save, job)
+                    await asyncio.sleep(chunk_pause)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"Job {job.id} ({job.job_type}) failed: {e}")
+                job.finish(FAILED, str(e))
+            finally:
+                self._cancelled.discard(job_id)
+            self._stats[job.status] += 1
+            await asyncio.to_thread(self.store.save, job)
+
+
+def create_job_runner(supabase_client: Any) -> JobRunner:
+    """
+    Build the job runner (with the standard handlers) from the environment.
+
+    JOB_CONCURRENCY (default 2) bounds concurrent jobs per worker,
+    JOB_CHUNK_SIZE (default 500) is the rows per chunk and JOB_CHUNK_PAUSE
+    (default 0.05 s) the pause between chunks.
+    """
+    from jobs.handlers import register_handlers
+    from jobs.store import create_job_store
+
+    runner = JobRunner(
+        create_job_store(supabase_client),
+        supabase_client,
+        max_concurrency=int(os.getenv('JOB_CONCURRENCY', '2')),
+        chunk_size=int(os.getenv('JOB_CHUNK_SIZE', '500')),
+        chunk_pause=float(os.getenv('JOB_CHUNK_PAUSE', '0.05'))
+    )
+    register_handlers(runner)
+    return runner
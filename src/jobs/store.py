@@ -0,0 +1,261 @@
+"""
+Job Store
+Persistence for background jobs: the jobs table (migrations/add_jobs_table.sql),
+or process memory for tests and single-worker development.
+"""
+
+import copy
+import os
+import threading
+import uuid
+from abc import ABC, abstractmethod
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+
+QUEUED = 'queued'
+RUNNING = 'running'
+SUCCEEDED = 'succeeded'
+FAILED = 'failed'
+CANCELLED = 'cancelled'
+FINISHED = (SUCCEEDED, FAILED, CANCELLED)
+
+
+def utcnow() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+class Job:
+    """A background job, its progress and its resume checkpoint"""
+
+    # Columns the runner writes back after every chunk (cancel_requested is only set by cancel)
+    MUTABLE_FIELDS = ('status', 'progress_done', 'progress_total', 'checkpoint', 'result', 'error',
+                      'worker_id', 'started_at', 'finished_at', 'heartbeat_at')
+
+    def __init__(
+        self,
+        id: str,
+        job_type: str,
+        params: Optional[Dict[str, Any]] = None,
+        status: str = QUEUED,
+        progress_done: int = 0,
+        progress_total: Optional[int] = None,
+        checkpoint: Optional[Dict[str, Any]] = None,
+        result: Optional[Dict[str, Any]] = None,
+        error: Optional[str] = None,
+        cancel_requested: bool = False,
+        created_by: Optional[str] = None,
+        worker_id: Optional[str] = None,
+        created_at: Optional[str] = None,
+        started_at: Optional[str] = None,
+        finished_at: Optional[str] = None,
+        heartbeat_at: Optional[str] = None
+    ):
+        self.id = id
+        self.job_type = job_type
+        self.params = params or {}
+        self.status = status
+        self.progress_done = progress_done
+        self.progress_total = progress_total
+        self.checkpoint = checkpoint or {}
+        self.result = result
+        self.error = error
+        self.cancel_requested = cancel_requested
+        self.created_by = created_by
+        self.worker_id = worker_id
+        self.created_at = created_at or utcnow()
+        self.started_at = started_at
+        self.finished_at = finished_at
+        self.heartbeat_at = heartbeat_at
+
+    @staticmethod
+    def new(job_type: str, params: Optional[Dict[str, Any]] = None, created_by: Optional[str] = None) -> 'Job':
+        return Job(id=uuid.uuid4().hex, job_type=job_type, params=params, created_by=created_by)
+
+    @property
+    def finished(self) -> bool:
+        return self.status in FINISHED
+
+    def finish(self, status: str, error: Optional[str] = None) -> None:
+        self.status = status
+        self.error = error
+        self.finished_at = utcnow()
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Convert job to dictionary (also the jobs table row)"""
+        return {
+            'id': self.id,
+            'job_type': self.job_type,
+            'params': self.params,
+            'status': self.status,
+            'progress_done': self.progress_done,
+            'progress_total': self.progress_total,
+            'checkpoint': self.checkpoint,
+            'result': self.result,
+            'error': self.error,
+            'cancel_requested': self.cancel_requested,
+            'created_by': self.created_by,
+            'worker_id': self.worker_id,
+            'created_at': self.created_at,
+            'started_at': self.started_at,
+            'finished_at': self.finished_at,
+            'heartbeat_at': self.heartbeat_at
+        }
+
+    @staticmethod
+    def from_db(data: Dict[str, Any]) -> 'Job':
+        """Create Job from a jobs table row"""
+        return Job(**{key: data.get(key) for key in (
+            'id', 'job_type', 'params', 'status', 'progress_done', 'progress_total', 'checkpoint', 'result',
+            'error', 'cancel_requested', 'created_by', 'worker_id', 'created_at', 'started_at', 'finished_at',
+            'heartbeat_at'
+        )})
+
+
+class JobStore(ABC):
+    """Storage interface used by the JobRunner (all methods are blocking)"""
+
+    @abstractmethod
+    def create(self, job: Job) -> Job:
+        """Insert a new job and return it as stored"""
+
+    @abstractmethod
+    def save(self, job: Job) -> None:
+        """Write back the runner-owned fields (status, progress, checkpoint, result...)"""
+
+    @abstractmethod
+    def get(self, job_id: str) -> Optional[Job]:
+        """Look up a job by ID; None if not found"""
+
+    @abstractmethod
+    def list_recent(self, limit: int = 50) -> List[Job]:
+        """Most recently created jobs, newest first"""
+
+    @abstractmethod
+    def unfinished(self) -> List[Job]:
+        """Queued and running jobs, oldest first (candidates to resume at startup)"""
+
+    @abstractmethod
+    def claim(self, job_id: str, worker_id: str, stale_before: str) -> Optional[Job]:
+        """
+        Take ownership of a job so only one worker runs it.
+
+        A queued job, or a running job whose heartbeat is older than
+        stale_before (its worker died), can be claimed.
+
+        Returns:
+            The claimed job (status running), or None if it is finished or owned by a live worker
+        """
+
+    @abstractmethod
+    def request_cancel(self, job_id: str) -> Optional[Job]:
+        """Flag an unfinished job for cancellation; returns the job, or None if not found"""
+
+
+class InMemoryJobStore(JobStore):
+    """Jobs in process memory (tests, single-worker development); lost on restart"""
+
+    def __init__(self):
+        self._jobs: Dict[str, Job] = {}
+        self._lock = threading.Lock()
+
+    def create(self, job: Job) -> Job:
+        with self._lock:
+            self._jobs[job.id] = copy.deepcopy(job)
+        return job
+
+    def save(self, job: Job) -> None:
+        with self._lock:
+            stored = self._jobs[job.id]
+            for field in Job.MUTABLE_FIELDS:
+                setattr(stored, field, copy.deepcopy(getattr(job, field)))
+
+    def get(self, job_id: str) -> Optional[Job]:
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return copy.deepcopy(job) if job is not None else None
+
+    def list_recent(self, limit: int = 50) -> List[Job]:
+        with self._lock:
+            jobs = sorted(self._jobs.values(), key=lambda job: job.created_at, reverse=True)[:limit]
+            return [copy.deepcopy(job) for job in jobs]
+
+    def unfinished(self) -> List[Job]:
+        with self._lock:
+            jobs = sorted((job for job in self._jobs.values() if not job.finished), key=lambda job: job.created_at)
+            return [copy.deepcopy(job) for job in jobs]
+
+    def claim(self, job_id: str, worker_id: str, stale_before: str) -> Optional[Job]:
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None or job.finished:
+                return None
+            if job.status == RUNNING and (job.heartbeat_at or '') >= stale_before:
+                return None
+            job.status = RUNNING
+            job.worker_id = worker_id
+            job.heartbeat_at = utcnow()
+            return copy.deepcopy(job)
+
+    def request_cancel(self, job_id: str) -> Optional[Job]:
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return None
+            if not job.finished:
+                job.cancel_requested = True
+            return copy.deepcopy(job)
+
+
+class SupabaseJobStore(JobStore):
+    """Jobs in the jobs table, shared by every worker"""
+
+    def __init__(self, supabase_client: Any):
+        self.supabase = supabase_client
+
+    def create(self, job: Job) -> Job:
+        self.supabase.table('jobs').insert(job.to_dict()).execute()
+        return job
+
+    def save(self, job: Job) -> None:
+        row = job.to_dict()
+        self.supabase.table('jobs').update({field: row[field] for field in Job.MUTABLE_FIELDS}).eq('id', job.id).execute()
+
+    def get(self, job_id: str) -> Optional[Job]:
+        result = self.supabase.table('jobs').select('*').eq('id', job_id).execute()
+        return Job.from_db(result.data[0]) if result.data else None
+
+    def list_recent(self, limit: int = 50) -> List[Job]:
+        result = self.supabase.table('jobs').select('*').order('created_at', desc=True).limit(limit).execute()
+        return [Job.from_db(row) for row in result.data or []]
+
+    def unfinished(self) -> List[Job]:
+        result = self.supabase.table('jobs').select('*').in_('status', [QUEUED, RUNNING]).order('created_at').execute()
+        return [Job.from_db(row) for row in result.data or []]
+
+    def claim(self, job_id: str, worker_id: str, stale_before: str) -> Optional[Job]:
+        # Conditional updates: only one worker's UPDATE matches, so only one worker gets the row back
+        claim = {'status': RUNNING, 'worker_id': worker_id, 'heartbeat_at': utcnow()}
+        result = self.supabase.table('jobs').update(claim).eq('id', job_id).eq('status', QUEUED).execute()
+        if not result.data:
+            result = (
+                self.supabase.table('jobs').update(claim)
+                .eq('id', job_id).eq('status', RUNNING).lt('heartbeat_at', stale_before)
+                .execute()
+            )
+        return Job.from_db(result.data[0]) if result.data else None
+
+    def request_cancel(self, job_id: str) -> Optional[Job]:
+        self.supabase.table('jobs').update({'cancel_requested': True}).eq('id', job_id).in_('status', [QUEUED, RUNNING]).execute()
+        return self.get(job_id)
+
+
+def create_job_store(supabase_client: Any) -> JobStore:
+    """
+    Build the job store from the environment.
+
+    JOB_STORE=database (default) uses the jobs table; JOB_STORE=memory keeps
+    jobs in this process only.
+    """
+    if os.getenv('JOB_STORE', 'database').lower() == 'memory':
+        return InMemoryJobStore()
+    return SupabaseJobStore(supabase_client)
@@ -3,49 +3,127 @@ FastAPI Backend Application
 Provides REST API endpoints for authentication
 """
 
-from fastapi import FastAPI, HTTPException, Depends
+from fastapi import FastAPI, HTTPException, Depends, Request, Response
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
 from pydantic import BaseModel
-from typing import Optional, List
-from security.jwt_utils import create_access_token, create_refresh_token, decode_token
+from typing import Any, Dict, Optional, List
+from security.jwt_utils import REFRESH_TOKEN_EXPIRE_DAYS, create_access_token, create_refresh_token, decode_token
+from security.token_revocation import TokenRevocations
+from security.rate_limiter import create_login_rate_limiter
 from controller.auth_controller import auth_controller
 from controller.user_account_controller import (
+    CHANGE_FEED_PAGE_SIZE,
     CreateUserAccountController,
     ViewUserAccountController,
     UpdateUserAccountController,
     SuspendUserAccountController
 )
 from controller.user_profile_controller import UserProfileController
-from supabase import create_client
+from controller.user_stats_controller import UserStatsController
+from data.single_flight import SingleFlight
+from data.change_tracker import change_tracker
+from data.event_hub import event_hub, format_sse
+from data.invalidation_bus import create_invalidation_bus
+from data.data_client import bind_actor, get_data_client, primary_reads
+from data.query_log import QUERY_SORT_FIELDS, create_query_log
+from jobs.runner import create_job_runner
+from jobs.handlers import DELETE_ROLE, EXPORT_USERS, REASSIGN_ROLE, export_output
+from middleware.admission import AdmissionMiddleware, create_admission_scheduler
+from middleware.deadlines import DeadlineMiddleware
+from middleware.profiling import ProfileStore, ProfilingMiddleware, create_profiling_options, observe_query
+from middleware.tracing import TracingMiddleware
+from tracing import create_tracing, instrument, observe_query as trace_query, shutdown_tracing
+import asyncio
 import os
+import re
 import sys
 from dotenv import load_dotenv
 from config import load_config
+from contextlib import asynccontextmanager
 
 # Load environment variables and configuration
 load_dotenv()
 config = load_config()
 
 # Initialize CRUD controllers
-supabase_client = create_client(os.getenv("SUPABASE_URL"), os.getenv("SUPABASE_KEY"))
+# Shared DataClient (also used by AuthController): read-replica routing, request deadlines,
+# the circuit breaker and read retries for every query
+supabase_client = get_data_client()
 create_user_controller = CreateUserAccountController(supabase_client)
 view_user_controller = ViewUserAccountController(supabase_client)
 update_user_controller = UpdateUserAccountController(supabase_client)
 suspend_user_controller = SuspendUserAccountController(supabase_client)
 user_profile_controller = UserProfileController(supabase_client)
+user_stats_controller = UserStatsController(supabase_client, ttl_seconds=float(os.getenv('USER_STATS_TTL_SECONDS', '10')))
+
+# Tracing (optional, TRACING_EXPORTER=otlp|console): spans for routes, controller methods,
+# Supabase queries and bcrypt; nothing is wrapped or installed while it is off
+tracing_enabled = create_tracing()
+if tracing_enabled:
+    for controller in (auth_controller, create_user_controller, view_user_controller, update_user_controller,
+                       suspend_user_controller, user_profile_controller, user_stats_controller):
+        instrument(controller)
+    supabase_client.add_observer(trace_query)
+
+# Concurrent identical reads (dashboard tabs loading together) share one query
+read_flight = SingleFlight()
+
+# Push every recorded change to connected dashboards
+change_tracker.add_listener(event_hub.publish)
+# Dashboard stats are cached briefly; any user or role change (local or remote) drops them
+change_tracker.add_listener(user_stats_controller.invalidate)
+# Tokens issued before a user was suspended or deleted stop working (on every worker)
+token_revocations = TokenRevocations(max_token_age=REFRESH_TOKEN_EXPIRE_DAYS * 24 * 3600)
+change_tracker.add_listener(token_revocations.on_change)
+SSE_HEARTBEAT_SECONDS = 15
+
+# Keep other workers' change counters (and therefore ETags and event streams) coherent
+invalidation_bus = create_invalidation_bus()
+invalidation_bus.subscribe(
+    lambda change: change_tracker.record(change['table'], change['action'], change['id'], remote=True)
+)
+change_tracker.add_listener(invalidation_bus.publish)
+
+# Reject login bursts per username and per client IP before any DB or bcrypt work
+login_rate_limiter = create_login_rate_limiter()
+
+# Long admin operations (cascade role deletes, bulk suspends, exports) run as chunked background jobs
+job_runner = create_job_runner(supabase_client)
+# Role deletes and reassignments touching more users than this run as a job instead of inline
+INLINE_CASCADE_LIMIT = int(os.getenv('INLINE_CASCADE_LIMIT', '500'))
+
 
-app = FastAPI(title="Auth API", version="1.0.0")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Start and stop background services with the application"""
+    await invalidation_bus.start()
+    lag_monitor = asyncio.create_task(supabase_client.monitor_replica_lag()) if supabase_client.replicas else None
+    await job_runner.start()
+    try:
+        yield
+    finally:
+        if lag_monitor is not None:
+            lag_monitor.cancel()
+        await job_runner.stop()
+        await invalidation_bus.stop()
+        shutdown_tracing()
+
+app = FastAPI(title="Auth API", version="1.0.0", lifespan=lifespan)
 security_scheme = HTTPBearer()
 
-def get_current_user_claims(credentials: HTTPAuthorizationCredentials = Depends(security_scheme)):
+async def get_current_user_claims(credentials: HTTPAuthorizationCredentials = Depends(security_scheme)):
     """Decode and validate bearer token; returns claims or raises 401"""
     token = credentials.credentials if credentials else None
     if not token:
         raise HTTPException(status_code=401, detail="Not authenticated")
     payload = decode_token(token)
-    if not payload:
+    # Refresh tokens and stream tickets carry a "type" and are not access tokens
+    if not payload or payload.get("type") is not None or token_revocations.is_revoked(payload):
         raise HTTPException(status_code=401, detail="Invalid or expired token")
+    # Async so the binding lives in the request's context: reads after this actor's writes stay on the primary
+    bind_actor(payload.get("sub"))
     return payload
 
 def require_role(required_role: str):
@@ -56,6 +134,99 @@ def require_role(required_role: str):
         return claims
     return _checker
 
+STREAM_TICKET_TYPE = "stream"
+STREAM_TICKET_MINUTES = 1
+
+def get_stream_claims(request: Request, ticket: Optional[str] = None):
+    """
+    Admin check for the event stream.
+    EventSource cannot send headers, so it may pass a short-lived stream ticket
+    (POST /api/events/ticket) as ?ticket= instead of the access token, which
+    would otherwise end up in access and proxy logs.
+    """
+    authorization = request.headers.get("authorization", "")
+    if authorization.lower().startswith("bearer "):
+        payload = decode_token(authorization[7:])
+        if payload and payload.get("type") is not None:
+            payload = None
+    elif ticket:
+        payload = decode_token(ticket)
+        if payload and payload.get("type") != STREAM_TICKET_TYPE:
+            payload = None
+    else:
+        raise HTTPException(status_code=401, detail="Not authenticated")
+    if not payload or token_revocations.is_revoked(payload):
+        raise HTTPException(status_code=401, detail="Invalid or expired token")
+    if payload.get("role") != "USER_ADMIN":
+        raise HTTPException(status_code=403, detail="Forbidden: insufficient role")
+    return payload
+
+# Single-resource ETags append the row version: '"<epoch>-users3-roles1.v7"'
+ROW_VERSION_SUFFIX = re.compile(r'\.v(\d+)"$')
+
+def etag_matches(request: Request, etag: str) -> bool:
+    """Check the request's If-None-Match header against the current ETag"""
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    # Row versions only change together with the table version, so compare the table part
+    candidates = [ROW_VERSION_SUFFIX.sub('"', candidate.strip()) for candidate in header.split(",")]
+    return "*" in candidates or etag in candidates or f"W/{etag}" in candidates
+
+def resource_etag(collection_etag: str, version: Optional[int]) -> str:
+    """ETag for a single row: the collection ETag plus the row's version"""
+    if version is None:
+        return collection_etag
+    return f'{collection_etag[:-1]}.v{version}"'
+
+def if_match_version(request: Request) -> Optional[int]:
+    """
+    Row version named by the If-Match header.
+    Returns None when the header is absent or '*' (unconditional update).
+    """
+    header = request.headers.get("if-match")
+    if not header or header.strip() == "*":
+        return None
+    match = ROW_VERSION_SUFFIX.search(header.split(",")[0].strip())
+    if not match:
+        raise HTTPException(status_code=412, detail="If-Match does not name a row version")
+    return int(match.group(1))
+
+def not_modified(etag: str) -> Response:
+    """304 response for a conditional GET whose data has not changed"""
+    return Response(status_code=304, headers={"ETag": etag, "Cache-Control": "private, no-cache"})
+
+def set_etag(response: Response, etag: str) -> None:
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = "private, no-cache"
+
+def is_admin_request(headers: dict) -> bool:
+    """True if raw ASGI headers carry a valid, unrevoked USER_ADMIN bearer token"""
+    authorization = headers.get(b"authorization", b"").decode("latin-1")
+    if not authorization.lower().startswith("bearer "):
+        return False
+    payload = decode_token(authorization[7:])
+    return (bool(payload) and payload.get("type") is None and payload.get("role") == "USER_ADMIN"
+            and not token_revocations.is_revoked(payload))
+
+# Profiling: X-Profile: 1 from an admin (or 1-in-N sampling) records a stack-sampled profile
+# plus the request's Supabase call timings; innermost, so queue time is not profiled
+profile_store = ProfileStore()
+supabase_client.add_observer(observe_query)
+
+# Query log: per-fingerprint latency histograms and recent slow queries for every Supabase call
+query_log = create_query_log()
+supabase_client.add_observer(query_log.observe)
+app.add_middleware(ProfilingMiddleware, store=profile_store, authorize=is_admin_request, **create_profiling_options())
+
+# Deadlines: per-route-class time budgets for data-layer calls, 503 when the database is unavailable
+app.add_middleware(DeadlineMiddleware)
+
+# Admission control: per-route-class concurrency limits, auth first, 503 when queues are too slow.
+# Added before CORS so CORS wraps it and shed responses still carry CORS headers.
+admission_scheduler = create_admission_scheduler()
+app.add_middleware(AdmissionMiddleware, scheduler=admission_scheduler)
+
 # CORS middleware
 app.add_middleware(
     CORSMiddleware,
@@ -63,8 +234,13 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag", "Retry-After", "X-Profile-Id"],
 )
 
+# Tracing: outermost, so the request span includes admission queueing and continues incoming traceparent headers
+if tracing_enabled:
+    app.add_middleware(TracingMiddleware)
+
 
 class LoginRequest(BaseModel):
     """Login request model"""
@@ -129,6 +305,17 @@ class UpdateRoleRequest(BaseModel):
     description: Optional[str] = None
 
 
+class ReassignRoleRequest(BaseModel):
+    """Move every user of a role to another role"""
+    target_role_id: int
+
+
+class JobRequest(BaseModel):
+    """Background job submission (job_type: delete_role, reassign_role, bulk_suspend, sweep_inactive or export_users)"""
+    job_type: str
+    params: Dict[str, Any] = {}
+
+
 @app.get("/")
 def read_root():
     """Root endpoint"""
@@ -150,7 +337,7 @@ def health_check():
 
 
 @app.post("/api/login", response_model=LoginResponse)
-async def login(request: LoginRequest):
+async def login(request: LoginRequest, http_request: Request):
     """
     Login endpoint
     
@@ -158,8 +345,17 @@ async def login(request: LoginRequest):
         request: Login credentials (username and password)
     
     Returns:
-        Authentication response with user data
+        Authentication response with user data (429 with Retry-After when rate limited)
     """
+    client_ip = http_request.client.host if http_request.client else None
+    retry_after = await login_rate_limiter.check(request.username, client_ip)
+    if retry_after is not None:
+        raise HTTPException(
+            status_code=429,
+            detail="Too many login attempts. Please try again later.",
+            headers={"Retry-After": str(retry_after)}
+        )
+
     try:
         # Use auth controller to handle login
         auth_response = await auth_controller.login(request.username, request.password, request.role_code)
@@ -175,6 +371,7 @@ async def login(request: LoginRequest):
         expires_in = None
 
         if auth_response.success and user_dict:
+            await login_rate_limiter.record_success(request.username)
             subject = str(user_dict['id'])
             access_token = create_access_token(subject, extra={"role": user_dict.get("role_code")})
             refresh_token = create_refresh_token(subject)
@@ -202,12 +399,23 @@ async def refresh_token(request: RefreshRequest):
     """Issue a new access token from a valid refresh token"""
     try:
         payload = decode_token(request.refresh_token)
-        if not payload or payload.get("type") != "refresh":
+        if not payload or payload.get("type") != "refresh" or token_revocations.is_revoked(payload):
             raise HTTPException(status_code=401, detail="Invalid refresh token")
         subject = payload.get("sub")
         if not subject:
             raise HTTPException(status_code=401, detail="Invalid token subject")
-        new_access = create_access_token(subject)
+        # Revocations are in memory only, so also refuse users suspended before a restart.
+        # A failed lookup is a 503, not a 401: a database blip must not log everyone out
+        user_id = int(subject)
+        try:
+            user = await view_user_controller.lookup_user(user_id)
+        except Exception as e:
+            print(f"Refresh lookup failed: {e}")
+            raise HTTPException(status_code=503, detail="Could not verify the account, please retry",
+                                headers={"Retry-After": "1"})
+        if user is None or not user.is_active:
+            raise HTTPException(status_code=401, detail="Account is no longer active")
+        new_access = create_access_token(subject, extra={"role": user.role_code})
         return RefreshResponse(access_token=new_access, expires_in=60*60)
     except HTTPException:
         raise
@@ -261,7 +469,7 @@ async def create_user(request: CreateUserRequest, _claims = Depends(require_role
         )
         
         if not result['success']:
-            # Use 409 Conflict for duplicate username, else 400 Bad Request
+            # Use 409 Conflict for duplicate username or email (unique constraint), else 400 Bad Request
             message = result.get('message', '')
             status_code = 409 if isinstance(message, str) and 'exists' in message.lower() else 400
             raise HTTPException(status_code=status_code, detail=message)
@@ -275,15 +483,27 @@ async def create_user(request: CreateUserRequest, _claims = Depends(require_role
 
 
 @app.get("/api/users")
-async def get_all_users(_claims = Depends(require_role("USER_ADMIN"))):
+async def get_all_users(request: Request, response: Response, _claims = Depends(require_role("USER_ADMIN"))):
     """
     Get all users
     
+    Supports conditional GET: a matching If-None-Match returns 304
+    without querying the database.
+    
     Returns:
         List of all users
     """
+    # user_details joins roles, so role changes also change this listing
+    etag = change_tracker.etag('users', 'roles')
+    if etag_matches(request, etag):
+        return not_modified(etag)
     try:
-        users = await view_user_controller.get_all_users()
+        # The ETag is part of the key: a request that arrives after a write must not join
+        # a flight that started before it (old rows under the new ETag would pin clients via 304s).
+        # For the same reason the read goes to the primary, not a replica that may still lag the write.
+        with primary_reads():
+            users = await read_flight.do(('users', etag), view_user_controller.get_all_users)
+        set_etag(response, etag)
         return {
             "success": True,
             "users": [user.to_dict() for user in users]
@@ -292,8 +512,57 @@ async def get_all_users(_claims = Depends(require_role("USER_ADMIN"))):
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@app.get("/api/users/changes")
+async def get_user_changes(since: Optional[str] = None, limit: int = CHANGE_FEED_PAGE_SIZE,
+                           _claims = Depends(require_role("USER_ADMIN"))):
+    """
+    Delta sync feed: users created, updated or deleted since a cursor
+    
+    Args:
+        since: Cursor from a previous response (omit for a full snapshot)
+        limit: Page size (100 to 5000); with has_more, call again with the cursor
+    
+    Returns:
+        Changed users, deleted user IDs, the cursor for the next call and has_more
+    """
+    try:
+        result = await view_user_controller.get_user_changes(since, limit)
+        if not result['success']:
+            raise HTTPException(status_code=400, detail=result['message'])
+        return {
+            "success": True,
+            "users": [user.to_dict() for user in result['users']],
+            "deleted": result['deleted'],
+            "cursor": result['cursor'],
+            "has_more": result['has_more']
+        }
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+# Declared before /api/users/{user_id} so "stats" is not parsed as a user ID
+@app.get("/api/users/stats")
+async def get_user_stats(_claims = Depends(require_role("USER_ADMIN"))):
+    """
+    Dashboard statistics from SQL aggregates
+    
+    Returns:
+        Total, active and suspended users, recent login counts and per-role counts
+    """
+    try:
+        stats = await read_flight.do_blocking(('user_stats',), user_stats_controller.get_stats)
+        return {
+            "success": True,
+            "stats": stats
+        }
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
 @app.get("/api/users/{user_id}")
-async def get_user_by_id(user_id: int, _claims = Depends(require_role("USER_ADMIN"))):
+async def get_user_by_id(user_id: int, request: Request, response: Response, _claims = Depends(require_role("USER_ADMIN"))):
     """
     Get user by ID
     
@@ -303,10 +572,15 @@ async def get_user_by_id(user_id: int, _claims = Depends(require_role("USER_ADMI
     Returns:
         User data
     """
+    etag = change_tracker.etag('users', 'roles')
+    if etag_matches(request, etag):
+        return not_modified(etag)
     try:
-        user = await view_user_controller.get_user(user_id)
+        with primary_reads():
+            user = await read_flight.do(('user', user_id, etag), view_user_controller.get_user, user_id)
         if not user:
             raise HTTPException(status_code=404, detail="User not found")
+        set_etag(response, resource_etag(etag, user.version))
         return {
             "success": True,
             "user": user.to_dict()
@@ -318,10 +592,13 @@ async def get_user_by_id(user_id: int, _claims = Depends(require_role("USER_ADMI
 
 
 @app.put("/api/users/{user_id}")
-async def update_user(user_id: int, request: UpdateUserRequest, _claims = Depends(require_role("USER_ADMIN"))):
+async def update_user(user_id: int, request: UpdateUserRequest, http_request: Request, response: Response, _claims = Depends(require_role("USER_ADMIN"))):
     """
     Update user information
     
+    Send the ETag from GET /api/users/{user_id} as If-Match to reject the
+    update (412) if another admin changed the user in the meantime.
+    
     Args:
         user_id: User ID to update
         request: Update data
@@ -330,17 +607,21 @@ async def update_user(user_id: int, request: UpdateUserRequest, _claims = Depend
         Update result
     """
     try:
+        expected_version = if_match_version(http_request)
         result = await update_user_controller.update_user(
             user_id=user_id,
             full_name=request.full_name,
             email=request.email,
             role_id=request.role_id,
-            is_active=request.is_active
+            is_active=request.is_active,
+            expected_version=expected_version
         )
         
         if not result['success']:
-            raise HTTPException(status_code=400, detail=result['message'])
+            status_code = 412 if result.get('conflict') else 400
+            raise HTTPException(status_code=status_code, detail=result['message'])
         
+        set_etag(response, resource_etag(change_tracker.etag('users', 'roles'), result['user'].get('version')))
         return result
         
     except HTTPException:
@@ -383,7 +664,7 @@ async def search_users(request: SearchRequest, _claims = Depends(require_role("U
         List of matching users
     """
     try:
-        users = await view_user_controller.search_users(request.query)
+        users = await read_flight.do(('search_users', request.query), view_user_controller.search_users, request.query)
         return {
             "success": True,
             "users": [user.to_dict() for user in users]
@@ -393,15 +674,20 @@ async def search_users(request: SearchRequest, _claims = Depends(require_role("U
 
 
 @app.get("/api/roles")
-async def get_all_roles(_claims = Depends(require_role("USER_ADMIN"))):
+async def get_all_roles(request: Request, response: Response, _claims = Depends(require_role("USER_ADMIN"))):
     """
     Get all available roles
     
     Returns:
         List of roles
     """
+    etag = change_tracker.etag('roles')
+    if etag_matches(request, etag):
+        return not_modified(etag)
     try:
-        roles = user_profile_controller.get_all_roles()
+        with primary_reads():
+            roles = await read_flight.do_blocking(('roles', etag), user_profile_controller.get_all_roles)
+        set_etag(response, etag)
         return {
             "success": True,
             "roles": roles
@@ -415,7 +701,7 @@ async def get_all_roles(_claims = Depends(require_role("USER_ADMIN"))):
 # ========================================
 
 @app.get("/api/roles/{role_id}")
-async def get_role_by_id(role_id: int, _claims = Depends(require_role("USER_ADMIN"))):
+async def get_role_by_id(role_id: int, request: Request, response: Response, _claims = Depends(require_role("USER_ADMIN"))):
     """
     Get role by ID
     
@@ -425,10 +711,15 @@ async def get_role_by_id(role_id: int, _claims = Depends(require_role("USER_ADMI
     Returns:
         Role data
     """
+    etag = change_tracker.etag('roles')
+    if etag_matches(request, etag):
+        return not_modified(etag)
     try:
-        role = user_profile_controller.get_role_by_id(role_id)
+        with primary_reads():
+            role = await read_flight.do_blocking(('role', role_id, etag), user_profile_controller.get_role_by_id, role_id)
         if not role:
             raise HTTPException(status_code=404, detail="Role not found")
+        set_etag(response, resource_etag(etag, role.get('version')))
         return {
             "success": True,
             "role": role
@@ -451,7 +742,8 @@ async def create_role(request: CreateRoleRequest, _claims = Depends(require_role
         Created role data
     """
     try:
-        result = user_profile_controller.create_role(
+        result = await asyncio.to_thread(
+            user_profile_controller.create_role,
             role_name=request.role_name,
             role_code=request.role_code,
             dashboard_route=request.dashboard_route,
@@ -469,10 +761,13 @@ async def create_role(request: CreateRoleRequest, _claims = Depends(require_role
 
 
 @app.put("/api/roles/{role_id}")
-async def update_role(role_id: int, request: UpdateRoleRequest, _claims = Depends(require_role("USER_ADMIN"))):
+async def update_role(role_id: int, request: UpdateRoleRequest, http_request: Request, response: Response, _claims = Depends(require_role("USER_ADMIN"))):
     """
     Update role information
     
+    Send the ETag from GET /api/roles/{role_id} as If-Match to reject the
+    update (412) if another admin changed the role in the meantime.
+    
     Args:
         role_id: Role ID to update
         request: Update data
@@ -481,17 +776,22 @@ async def update_role(role_id: int, request: UpdateRoleRequest, _claims = Depend
         Update result
     """
     try:
-        result = user_profile_controller.update_role(
+        expected_version = if_match_version(http_request)
+        result = await asyncio.to_thread(
+            user_profile_controller.update_role,
             role_id=role_id,
             role_name=request.role_name,
             role_code=request.role_code,
             dashboard_route=request.dashboard_route,
-            description=request.description
+            description=request.description,
+            expected_version=expected_version
         )
         
         if not result['success']:
-            raise HTTPException(status_code=400, detail=result['message'])
+            status_code = 412 if result.get('conflict') else 400
+            raise HTTPException(status_code=status_code, detail=result['message'])
         
+        set_etag(response, resource_etag(change_tracker.etag('roles'), result['role'].get('version')))
         return result
     except HTTPException:
         raise
@@ -511,7 +811,7 @@ async def toggle_role_status(role_id: int, _claims = Depends(require_role("USER_
         Toggle result
     """
     try:
-        result = user_profile_controller.toggle_role_status(role_id)
+        result = await asyncio.to_thread(user_profile_controller.toggle_role_status, role_id)
         
         if not result['success']:
             raise HTTPException(status_code=400, detail=result['message'])
@@ -524,19 +824,43 @@ async def toggle_role_status(role_id: int, _claims = Depends(require_role("USER_
 
 
 @app.delete("/api/roles/{role_id}")
-async def delete_role(role_id: int, _claims = Depends(require_role("USER_ADMIN"))):
+async def delete_role(role_id: int, reassign_to: Optional[int] = None, _claims = Depends(require_role("USER_ADMIN"))):
     """
     Delete a role (hard delete - use with caution)
-    WARNING: This will cascade delete all users with this role!
+    WARNING: Without reassign_to, this will cascade delete all users with this role!
     
     Args:
         role_id: Role ID to delete
+        reassign_to: Move the role's users to this role first instead of deleting them
     
     Returns:
-        Delete result with success status, message, and deleted_users count
+        Delete result with success status, message, deleted_users and reassigned_users counts
+        (202 with a background job when many users are affected)
     """
     try:
-        result = user_profile_controller.delete_role(role_id, cascade=True)
+        # Large cascades and reassignments would outlive the request: hand them to the job runner
+        affected = await asyncio.to_thread(user_profile_controller.count_users_with_role, role_id)
+        if affected > INLINE_CASCADE_LIMIT:
+            if reassign_to is not None:
+                error = await asyncio.to_thread(user_profile_controller.validate_reassignment, role_id, reassign_to)
+                if error:
+                    raise HTTPException(status_code=400, detail=error)
+                job = await job_runner.submit(REASSIGN_ROLE, {
+                    'from_role_id': role_id, 'to_role_id': reassign_to, 'delete_role': True
+                }, created_by=_claims.get("sub"))
+                message = f'Moving {affected} user(s) to the new role and deleting the role in the background.'
+            else:
+                job = await job_runner.submit(DELETE_ROLE, {'role_id': role_id}, created_by=_claims.get("sub"))
+                message = f'Deleting role and {affected} associated user(s) in the background.'
+            return JSONResponse(status_code=202, content={
+                'success': True,
+                'message': message,
+                'deleted_users': 0,
+                'reassigned_users': 0,
+                'job': job.to_dict()
+            })
+
+        result = await asyncio.to_thread(user_profile_controller.delete_role, role_id, cascade=True, reassign_to=reassign_to)
         
         if not result['success']:
             raise HTTPException(status_code=400, detail=result['message'])
@@ -544,7 +868,8 @@ async def delete_role(role_id: int, _claims = Depends(require_role("USER_ADMIN")
         return {
             'success': result['success'],
             'message': result['message'],
-            'deleted_users': result.get('deleted_users', 0)
+            'deleted_users': result.get('deleted_users', 0),
+            'reassigned_users': result.get('reassigned_users', 0)
         }
     except HTTPException:
         raise
@@ -552,6 +877,46 @@ async def delete_role(role_id: int, _claims = Depends(require_role("USER_ADMIN")
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@app.post("/api/roles/{role_id}/reassign")
+async def reassign_role_users(role_id: int, request: ReassignRoleRequest, _claims = Depends(require_role("USER_ADMIN"))):
+    """
+    Move every user holding a role to another role
+    
+    Args:
+        role_id: Role the users currently hold
+        request: Target role
+    
+    Returns:
+        moved_users and remaining_users counts
+        (202 with a background job when many users are affected)
+    """
+    try:
+        error = await asyncio.to_thread(user_profile_controller.validate_reassignment, role_id, request.target_role_id)
+        if error:
+            raise HTTPException(status_code=404 if error.endswith('not found.') else 400, detail=error)
+
+        affected = await asyncio.to_thread(user_profile_controller.count_users_with_role, role_id)
+        if affected > INLINE_CASCADE_LIMIT:
+            job = await job_runner.submit(REASSIGN_ROLE, {
+                'from_role_id': role_id, 'to_role_id': request.target_role_id
+            }, created_by=_claims.get("sub"))
+            return JSONResponse(status_code=202, content={
+                'success': True,
+                'message': f'Moving {affected} user(s) to the new role in the background.',
+                'moved_users': 0,
+                'job': job.to_dict()
+            })
+
+        result = await asyncio.to_thread(user_profile_controller.reassign_role_users, role_id, request.target_role_id)
+        if not result['success']:
+            raise HTTPException(status_code=400, detail=result['message'])
+        return result
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
 @app.post("/api/roles/search")
 async def search_roles(request: SearchRequest, _claims = Depends(require_role("USER_ADMIN"))):
     """
@@ -564,7 +929,7 @@ async def search_roles(request: SearchRequest, _claims = Depends(require_role("U
         List of matching roles
     """
     try:
-        roles = user_profile_controller.search_roles(request.query)
+        roles = await read_flight.do_blocking(('search_roles', request.query), user_profile_controller.search_roles, request.query)
         return {
             "success": True,
             "roles": roles
@@ -572,6 +937,344 @@ async def search_roles(request: SearchRequest, _claims = Depends(require_role("U
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+# ========================================
+# BACKGROUND JOBS
+# ========================================
+
+@app.post("/api/jobs", status_code=202)
+async def submit_job(request: JobRequest, _claims = Depends(require_role("USER_ADMIN"))):
+    """
+    Submit a background job
+    
+    Args:
+        request: Job type and parameters, e.g.
+            {"job_type": "bulk_suspend", "params": {"role_id": 3}}
+            {"job_type": "sweep_inactive", "params": {"inactive_days": 90, "dry_run": true}}
+            {"job_type": "export_users", "params": {"is_active": true}}
+    
+    Returns:
+        The queued job; poll GET /api/jobs/{job_id} for progress
+    """
+    try:
+        job = await job_runner.submit(request.job_type, request.params, created_by=_claims.get("sub"))
+        return {"success": True, "job": job.to_dict()}
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@app.get("/api/jobs")
+async def list_jobs(limit: int = 50, _claims = Depends(require_role("USER_ADMIN"))):
+    """
+    List recent background jobs, newest first
+    
+    Returns:
+        Jobs with status and progress
+    """
+    try:
+        jobs = await job_runner.list_recent(max(1, min(limit, 200)))
+        return {"success": True, "jobs": [job.to_dict() for job in jobs]}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@app.get("/api/jobs/{job_id}")
+async def get_job(job_id: str, _claims = Depends(require_role("USER_ADMIN"))):
+    """
+    Get a background job's status and progress
+    
+    Args:
+        job_id: Job ID
+    
+    Returns:
+        Job with status, progress_done / progress_total and result
+    """
+    job = await job_runner.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return {"success": True, "job": job.to_dict()}
+
+
+@app.post("/api/jobs/{job_id}/cancel")
+async def cancel_job(job_id: str, _claims = Depends(require_role("USER_ADMIN"))):
+    """
+    Cancel a background job. A running job stops after its current chunk.
+    
+    Args:
+        job_id: Job ID
+    
+    Returns:
+        The job (status becomes 'cancelled' once the runner stops it)
+    """
+    job = await job_runner.cancel(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    if job.finished:
+        raise HTTPException(status_code=409, detail=f"Job already {job.status}")
+    return {"success": True, "message": "Cancellation requested", "job": job.to_dict()}
+
+
+@app.get("/api/jobs/{job_id}/result")
+async def download_job_result(job_id: str, _claims = Depends(require_role("USER_ADMIN"))):
+    """
+    Download the CSV produced by a finished export job
+    
+    Args:
+        job_id: Job ID
+    
+    Returns:
+        CSV file
+    """
+    job = await job_runner.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    if job.job_type != EXPORT_USERS or job.status != 'succeeded':
+        raise HTTPException(status_code=409, detail="Job has no downloadable result")
+    # The CSV is stored in the job_output table, so any worker can serve it
+    return StreamingResponse(
+        export_output(supabase_client, job.id),
+        media_type="text/csv",
+        headers={"Content-Disposition": f'attachment; filename="users-{job.id}.csv"'}
+    )
+
+
+@app.get("/api/metrics/jobs")
+async def job_metrics(_claims = Depends(require_role("USER_ADMIN"))):
+    """
+    Background job runner metrics
+    
+    Returns:
+        Submitted, resumed and finished job counts, active jobs and the concurrency limit
+    """
+    return {
+        "success": True,
+        "metrics": job_runner.get_stats()
+    }
+
+# ========================================
+# CHANGE EVENT STREAM
+# ========================================
+
+@app.post("/api/events/ticket")
+async def create_stream_ticket(claims = Depends(require_role("USER_ADMIN"))):
+    """
+    Issue a ticket for opening the event stream with EventSource
+    
+    The ticket is only accepted by /api/events (as ?ticket=) and expires
+    after a minute, which covers EventSource's automatic reconnects; after
+    that the client asks for a new one.
+    
+    Returns:
+        Ticket and its lifetime in seconds
+    """
+    ticket = create_access_token(
+        claims["sub"],
+        extra={"role": claims.get("role"), "type": STREAM_TICKET_TYPE},
+        expires_minutes=STREAM_TICKET_MINUTES
+    )
+    return {
+        "success": True,
+        "ticket": ticket,
+        "expires_in": STREAM_TICKET_MINUTES * 60
+    }
+
+
+@app.get("/api/events")
+async def change_events(request: Request, _claims = Depends(get_stream_claims)):
+    """
+    Server-Sent Events stream of user and role changes
+    
+    Each event names the table ('users' or 'roles') and carries the action,
+    record ID and new table version. A 'resync' event means the client fell
+    behind and should refetch its lists. Reconnecting clients send
+    Last-Event-ID to replay what they missed.
+    
+    Returns:
+        text/event-stream response
+    """
+    subscription = event_hub.subscribe(request.headers.get("last-event-id") or None)
+    if subscription is None:
+        raise HTTPException(status_code=503, detail="Too many event stream subscribers", headers={"Retry-After": "30"})
+
+    async def stream():
+        try:
+            yield "retry: 3000\n\n"
+            while True:
+                try:
+                    event_id, event, data = await asyncio.wait_for(subscription.queue.get(), SSE_HEARTBEAT_SECONDS)
+                except asyncio.TimeoutError:
+                    # Comment line keeps proxies from closing idle connections
+                    yield ": keepalive\n\n"
+                    continue
+                yield format_sse(event_id, event, data)
+        finally:
+            event_hub.unsubscribe(subscription)
+
+    return StreamingResponse(
+        stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+# ========================================
+# METRICS ENDPOINTS
+# ========================================
+
+@app.get("/api/metrics/read-coalescing")
+async def read_coalescing_metrics(_claims = Depends(require_role("USER_ADMIN"))):
+    """
+    Single-flight metrics for the hot read paths
+    
+    Returns:
+        Per-query call counts and the number of DB calls saved by coalescing
+    """
+    return {
+        "success": True,
+        "metrics": read_flight.get_stats()
+    }
+
+
+@app.get("/api/metrics/admission")
+async def admission_metrics(_claims = Depends(require_role("USER_ADMIN"))):
+    """
+    Admission control metrics
+    
+    Returns:
+        Per-route-class limits, in-flight and queued requests, shed counts and queue wait percentiles
+    """
+    return {
+        "success": True,
+        "metrics": admission_scheduler.get_stats()
+    }
+
+
+@app.get("/api/metrics/data-layer")
+async def data_layer_metrics(_claims = Depends(require_role("USER_ADMIN"))):
+    """
+    Data layer metrics
+    
+    Returns:
+        Query, retry, deadline and replica routing counts plus per-endpoint lag and breaker state
+    """
+    return {
+        "success": True,
+        "metrics": supabase_client.get_stats()
+    }
+
+
+@app.get("/api/metrics/queries")
+async def query_metrics(sort: str = "total_ms", limit: int = 50, _claims = Depends(require_role("USER_ADMIN"))):
+    """
+    Per-query-shape metrics
+
+    Args:
+        sort: Ranking field (total_ms, p95_ms, max_ms, calls or errors)
+        limit: Number of query shapes to return
+
+    Returns:
+        Top query fingerprints with latency histograms, and the most recent slow queries
+    """
+    if sort not in QUERY_SORT_FIELDS:
+        raise HTTPException(status_code=400, detail=f"sort must be one of: {', '.join(QUERY_SORT_FIELDS)}")
+    return {
+        "success": True,
+        "metrics": query_log.get_stats(sort=sort, limit=max(1, min(limit, 500)))
+    }
+
+
+@app.delete("/api/metrics/queries")
+async def reset_query_metrics(_claims = Depends(require_role("USER_ADMIN"))):
+    """
+    Reset the query log, e.g. before measuring a change
+
+    Returns:
+        Dictionary with success status
+    """
+    query_log.reset()
+    return {
+        "success": True,
+        "message": "Query metrics reset"
+    }
+
+
+@app.get("/api/metrics/login-rate-limit")
+async def login_rate_limit_metrics(_claims = Depends(require_role("USER_ADMIN"))):
+    """
+    Login rate limiter metrics
+    
+    Returns:
+        Allowed and rejected attempt counts, tracked keys and configured limits
+    """
+    return {
+        "success": True,
+        "metrics": login_rate_limiter.get_stats()
+    }
+
+
+# ========================================
+# REQUEST PROFILES
+# ========================================
+
+@app.get("/api/profiles")
+async def list_profiles(_claims = Depends(require_role("USER_ADMIN"))):
+    """
+    List stored request profiles, newest first
+    
+    Returns:
+        Profile summaries (path, duration, sample count, Supabase call count and time)
+    """
+    return {
+        "success": True,
+        "profiles": profile_store.list()
+    }
+
+
+@app.get("/api/profiles/{profile_id}")
+async def get_profile(profile_id: str, _claims = Depends(require_role("USER_ADMIN"))):
+    """
+    Get one request profile with its Supabase call timings
+    
+    Args:
+        profile_id: ID from the X-Profile-Id response header
+    
+    Returns:
+        Profile summary, each Supabase call (label, endpoint, ms, rows, offset) and the hottest stacks
+    """
+    session = profile_store.get(profile_id)
+    if session is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return {
+        "success": True,
+        "profile": {
+            **session.summary(),
+            "db_calls_detail": session.db_calls,
+            "top_stacks": [{"stack": stack, "samples": count} for stack, count in session.stacks.most_common(20)]
+        }
+    }
+
+
+@app.get("/api/profiles/{profile_id}/collapsed")
+async def download_profile(profile_id: str, _claims = Depends(require_role("USER_ADMIN"))):
+    """
+    Download a profile as collapsed stacks (flamegraph.pl, speedscope)
+    
+    Args:
+        profile_id: ID from the X-Profile-Id response header
+    
+    Returns:
+        Text file with one "frame;frame;frame count" line per stack
+    """
+    session = profile_store.get(profile_id)
+    if session is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return PlainTextResponse(
+        session.collapsed(),
+        headers={"Content-Disposition": f'attachment; filename="profile-{session.id}.folded"'}
+    )
+
+
 # DEV-ONLY: Update user without authentication (for local testing)
 @app.put("/api/dev/update_user/{user_id}")
 async def dev_update_user(user_id: int, request: UpdateUserRequest):
@@ -597,7 +1300,6 @@ async def run_server():
 
 
 if __name__ == "__main__":
-    import asyncio
     # Ensure Windows selector event loop
     if sys.platform == 'win32':
         asyncio.set_event_loop_policy(asyncio.WindowsSelectorEventLoopPolicy())
@@ -0,0 +1,267 @@
+"""
+Admission Control Middleware
+Per-route-class concurrency limits with priorities and queue-time load shedding,
+so bulk admin work and large listings cannot starve login and token refresh.
+"""
+import asyncio
+import heapq
+import itertools
+import json
+import os
+import time
+from collections import deque
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
+
+# Route classes in priority order (lower number is admitted first)
+AUTH = 'auth'
+READ = 'read'
+ADMIN_WRITE = 'admin_write'
+EXPORT = 'export'
+PRIORITIES = {AUTH: 0, READ: 1, ADMIN_WRITE: 2, EXPORT: 3}
+
+AUTH_PATHS = ('/api/login', '/api/refresh')
+# Long-lived or trivial endpoints that must never queue
+EXEMPT_PATHS = ('/api/events', '/api/health')
+# POST endpoints that only read
+READ_POSTS = ('/api/users/search', '/api/roles/search')
+# Job result downloads stream a whole export; submitting and polling jobs are cheap
+JOB_DOWNLOAD_PREFIX = '/api/jobs/'
+JOB_DOWNLOAD_SUFFIX = '/result'
+
+
+def classify(method: str, path: str) -> Optional[str]:
+    """
+    Map a request to its route class.
+
+    Returns:
+        Route class name, or None if the request bypasses admission control
+    """
+    if method == 'OPTIONS' or not path.startswith('/api/') or path.startswith(EXEMPT_PATHS):
+        return None
+    if path in AUTH_PATHS:
+        return AUTH
+    if '/export' in path or (path.startswith(JOB_DOWNLOAD_PREFIX) and path.endswith(JOB_DOWNLOAD_SUFFIX)):
+        return EXPORT
+    if method in ('GET', 'HEAD') or path in READ_POSTS:
+        return READ
+    return ADMIN_WRITE
+
+
+class Overloaded(Exception):
+    """Raised when a request is shed instead of admitted"""
+
+    def __init__(self, route_class: str, reason: str, retry_after: int):
+        super().__init__(f'{route_class}: {reason}')
+        self.route_class = route_class
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class RouteClass:
+    """Limits and counters for one route class"""
+
+    def __init__(self, name: str, limit: int, max_wait: float, max_queue: int):
+        self.name = name
+        self.priority = PRIORITIES[name]
+        self.limit = limit
+        self.max_wait = max_wait
+        self.max_queue = max_queue
+        self.in_flight = 0
+        self.queued = 0
+        self.admitted = 0
+        self.shed = 0
+        self.waits: Deque[float] = deque(maxlen=1024)
+
+
+class AdmissionScheduler:
+    """
+    Shared pool of `capacity` slots, with a per-class cap on top.
+
+    A freed slot goes to the highest-priority waiter whose class is under its
+    cap. Waiters past their class's max_wait are shed with 503, and new
+    arrivals are shed immediately when the oldest waiter of their class has
+    already used half of that budget: the queue is draining too slowly for a
+    newcomer to make it, so the client is told early instead of timing out.
+    """
+
+    def __init__(self, capacity: int, classes: Dict[str, Tuple[int, float, int]]):
+        """
+        Args:
+            capacity: Requests admitted at once across all classes
+            classes: route class -> (concurrency limit, max queue wait seconds, max queue length)
+        """
+        self.capacity = capacity
+        self.in_flight = 0
+        self.classes = {name: RouteClass(name, *limits) for name, limits in classes.items()}
+        self._waiters: List[list] = []  # heap of [priority, seq, enqueued_at, route_class, future]
+        self._seq = itertools.count()
+
+    def _can_admit(self, route_class: RouteClass) -> bool:
+        return self.in_flight < self.capacity and route_class.in_flight < route_class.limit
+
+    def _admit(self, route_class: RouteClass, waited: float) -> None:
+        self.in_flight += 1
+        route_class.in_flight += 1
+        route_class.admitted += 1
+        route_class.waits.append(waited)
+
+    def _oldest_wait(self, route_class: RouteClass, now: float) -> float:
+        oldest = min((w[2] for w in self._waiters if w[3] is route_class and not w[4].done()), default=now)
+        return now - oldest
+
+    async def acquire(self, name: str) -> None:
+        """
+        Wait for a slot for the given route class.
+
+        Raises:
+            Overloaded: If the request is shed
+        """
+        route_class = self.classes[name]
+        if route_class.queued == 0 and self._can_admit(route_class):
+            self._admit(route_class, 0.0)
+            return
+
+        now = time.monotonic()
+        if route_class.queued >= route_class.max_queue:
+            route_class.shed += 1
+            raise Overloaded(name, 'queue full', max(1, round(route_class.max_wait)))
+        if route_class.queued and self._oldest_wait(route_class, now) >= route_class.max_wait / 2:
+            route_class.shed += 1
+            raise Overloaded(name, 'queue too slow', max(1, round(route_class.max_wait)))
+
+        future = asyncio.get_running_loop().create_future()
+        entry = [route_class.priority, next(self._seq), now, route_class, future]
+        heapq.heappush(self._waiters, entry)
+        route_class.queued += 1
+        try:
+            await asyncio.wait_for(asyncio.shield(future), route_class.max_wait)
+        except asyncio.TimeoutError:
+            if not future.done():
+                future.cancel()
+                route_class.queued -= 1
+                route_class.shed += 1
+                raise Overloaded(name, 'queue wait exceeded', max(1, round(route_class.max_wait)))
+        except asyncio.CancelledError:
+            # Client went away while queued; give back a slot granted in the meantime
+            if future.done() and not future.cancelled():
+                self.release(name)
+            elif not future.done():
+                future.cancel()
+                route_class.queued -= 1
+            raise
+
+    def release(self, name: str) -> None:
+        """Return a slot and hand it to the best eligible waiter"""
+        route_class = self.classes[name]
+        self.in_flight -= 1
+        route_class.in_flight -= 1
+        self._dispatch()
+
+    def _dispatch(self) -> None:
+        skipped = []
+        now = time.monotonic()
+        while self._waiters and self.in_flight < self.capacity:
+            entry = heapq.heappop(self._waiters)
+            _, _, enqueued_at, route_class, future = entry
+            if future.done():
+                continue
+            if route_class.in_flight >= route_class.limit:
+                skipped.append(entry)
+                continue
+            route_class.queued -= 1
+            self._admit(route_class, now - enqueued_at)
+            future.set_result(None)
+        for entry in skipped:
+            heapq.heappush(self._waiters, entry)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Per-class concurrency, queue and queue-wait metrics"""
+        classes = {}
+        for name, route_class in self.classes.items():
+            waits = sorted(route_class.waits)
+            classes[name] = {
+                'priority': route_class.priority,
+                'limit': route_class.limit,
+                'in_flight': route_class.in_flight,
+                'queued': route_class.queued,
+                'admitted': route_class.admitted,
+                'shed': route_class.shed,
+                'queue_wait_ms': {
+                    'p50': round(waits[len(waits) // 2] * 1000, 2) if waits else 0.0,
+                    'p95': round(waits[int(len(waits) * 0.95)] * 1000, 2) if waits else 0.0,
+                    'max': round(waits[-1] * 1000, 2) if waits else 0.0,
+                },
+            }
+        return {'capacity': self.capacity, 'in_flight': self.in_flight, 'classes': classes}
+
+
+def create_admission_scheduler() -> AdmissionScheduler:
+    """
+    Build the scheduler from the environment.
+
+    ADMISSION_CAPACITY (default 32) bounds all classes together;
+    ADMISSION_<CLASS>=limit/max_wait_seconds/max_queue overrides a class,
+    e.g. ADMISSION_EXPORT=2/1/10. Auth may use every slot, while the other
+    classes together leave a few free so login always gets through.
+
+    Returns:
+        Configured AdmissionScheduler
+    """
+    capacity = int(os.getenv('ADMISSION_CAPACITY', '32'))
+    defaults = {
+        AUTH: f'{capacity}/5/200',
+        READ: f'{max(1, capacity * 5 // 8)}/2/100',
+        ADMIN_WRITE: f'{max(1, capacity * 3 // 16)}/2/50',
+        EXPORT: '2/1/10',
+    }
+    classes = {}
+    for name, default in defaults.items():
+        limit, max_wait, max_queue = os.getenv(f'ADMISSION_{name.upper()}', default).split('/')
+        classes[name] = (int(limit), float(max_wait), int(max_queue))
+    return AdmissionScheduler(capacity, classes)
+
+
+class AdmissionMiddleware:
+    """
+    ASGI middleware that holds a scheduler slot for the whole request.
+    Shed requests get 503 with Retry-After before any route code runs.
+    """
+
+    def __init__(self, app: Callable, scheduler: AdmissionScheduler,
+                 classifier: Callable[[str, str], Optional[str]] = classify):
+        self.app = app
+        self.scheduler = scheduler
+        self.classifier = classifier
+
+    async def __call__(self, scope: Dict[str, Any], receive: Callable, send: Callable) -> None:
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+        route_class = self.classifier(scope['method'], scope['path'])
+        if route_class is None:
+            await self.app(scope, receive, send)
+            return
+
+        try:
+            await self.scheduler.acquire(route_class)
+        except Overloaded as e:
+            await self._reject(send, e)
+            return
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.scheduler.release(route_class)
+
+    @staticmethod
+    async def _reject(send: Callable, error: Overloaded) -> None:
+        body = json.dumps({'detail': 'Server is busy. Please retry shortly.', 'route_class': error.route_class}).encode()
+        await send({
+            'type': 'http.response.start',
+            'status': 503,
+            'headers': [
+                (b'content-type', b'application/json'),
+                (b'content-length', str(len(body)).encode()),
+                (b'retry-after', str(error.retry_after).encode()),
+            ],
+        })
+        await send({'type': 'http.response.body', 'body': body})
@@ -0,0 +1,81 @@
+"""
+Deadline Middleware
+Gives each API request a time budget by route class and turns data-layer
+unavailability into a fast 503, whether or not a controller caught it.
+"""
+import json
+import os
+from typing import Any, Callable, Dict, Optional
+
+from data.circuit_breaker import DataLayerUnavailable
+from data.deadlines import deadline_scope
+from middleware.admission import ADMIN_WRITE, AUTH, EXPORT, READ, classify
+
+# Seconds per route class; override with DEADLINE_<CLASS> (e.g. DEADLINE_READ=3)
+DEFAULT_BUDGETS = {AUTH: 3.0, READ: 5.0, ADMIN_WRITE: 8.0, EXPORT: 30.0}
+
+
+def load_budgets() -> Dict[str, float]:
+    return {name: float(os.getenv(f'DEADLINE_{name.upper()}', default)) for name, default in DEFAULT_BUDGETS.items()}
+
+
+class DeadlineMiddleware:
+    """
+    ASGI middleware that runs each classified request inside a deadline scope.
+
+    Controllers catch exceptions broadly and return error results, so the
+    data client also records failures on the request's Deadline. If one was
+    recorded by the time the response starts, the response is replaced by a
+    503 with Retry-After.
+    """
+
+    def __init__(self, app: Callable, budgets: Optional[Dict[str, float]] = None,
+                 classifier: Callable[[str, str], Optional[str]] = classify):
+        self.app = app
+        self.budgets = budgets or load_budgets()
+        self.classifier = classifier
+
+    async def __call__(self, scope: Dict[str, Any], receive: Callable, send: Callable) -> None:
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+        route_class = self.classifier(scope['method'], scope['path'])
+        if route_class is None:
+            await self.app(scope, receive, send)
+            return
+
+        with deadline_scope(self.budgets[route_class], route_class) as deadline:
+            state = {'started': False, 'replaced': False}
+
+            async def guarded_send(message: Dict[str, Any]) -> None:
+                if message['type'] == 'http.response.start':
+                    state['started'] = True
+                    if deadline.failure is not None:
+                        state['replaced'] = True
+                        await self._unavailable(send, deadline.failure)
+                        return
+                if state['replaced']:
+                    return
+                await send(message)
+
+            try:
+                await self.app(scope, receive, guarded_send)
+            except DataLayerUnavailable as error:
+                if state['started']:
+                    raise
+                await self._unavailable(send, error)
+
+    @staticmethod
+    async def _unavailable(send: Callable, error: Exception) -> None:
+        retry_after = getattr(error, 'retry_after', 1)
+        body = json.dumps({'detail': 'The database is temporarily unavailable. Please retry shortly.'}).encode()
+        await send({
+            'type': 'http.response.start',
+            'status': 503,
+            'headers': [
+                (b'content-type', b'application/json'),
+                (b'content-length', str(len(body)).encode()),
+                (b'retry-after', str(retry_after).encode()),
+            ],
+        })
+        await send({'type': 'http.response.body', 'body': body})
@@ -0,0 +1,263 @@
+"""
+Request Profiling Middleware
+Opt-in sampling profiler for single requests: an admin sends X-Profile: 1
+(or 1 in N requests is sampled), the Python stacks of busy threads are
+sampled while the request runs, and the profile is stored together with the
+request's Supabase call timings for download as flamegraph-compatible
+collapsed stacks.
+"""
+import asyncio
+import contextvars
+import itertools
+import os
+import random
+import sys
+import threading
+import time
+import uuid
+from collections import Counter, OrderedDict
+from typing import Any, Callable, Dict, List, Optional
+
+PROFILE_HEADER = b'x-profile'
+PROFILE_ID_HEADER = b'x-profile-id'
+
+# Never profiled: the profile endpoints themselves, and event streams, which stay open
+# for as long as the client is connected and would hold a sampler slot indefinitely
+UNPROFILED_PATHS = ('/api/profiles', '/api/events')
+
+# Innermost frames that mean "this thread is idle", not doing work for anyone
+IDLE_FRAMES = {
+    ('threading.py', 'wait'), ('selectors.py', 'select'), ('queue.py', 'get'),
+    ('thread.py', '_worker'), ('base_events.py', '_run_once'),
+}
+
+_current_session: contextvars.ContextVar[Optional['ProfileSession']] = contextvars.ContextVar(
+    'profile_session', default=None
+)
+
+
+def _frame_label(frame: Any) -> str:
+    code = frame.f_code
+    # ';' separates frames in the collapsed format
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})".replace(';', ':')
+
+
+def _is_idle(frame: Any) -> bool:
+    return (os.path.basename(frame.f_code.co_filename), frame.f_code.co_name) in IDLE_FRAMES
+
+
+class ProfileSession:
+    """
+    One profiled request: a sampler thread plus the Supabase calls it made.
+
+    Samples cover every busy thread in the process (the event loop and the
+    worker threads running controllers and queries), so requests running at
+    the same time appear in the profile too; the thread name is the root
+    frame of each stack. Sampling stops early (truncated) after max_duration
+    seconds or max_samples samples, whichever comes first.
+    """
+
+    def __init__(self, method: str, path: str, reason: str, interval: float, max_duration: float = 30.0,
+                 max_samples: int = 5000):
+        self.id = uuid.uuid4().hex[:12]
+        self.method = method
+        self.path = path
+        self.reason = reason
+        self.interval = interval
+        self.max_duration = max_duration
+        self.max_samples = max_samples
+        self.truncated = False
+        self.started_at = time.time()
+        self.duration: Optional[float] = None
+        self.status: Optional[int] = None
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self.db_calls: List[Dict[str, Any]] = []
+        self._started = time.perf_counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._sample, name=f'profiler-{self.id}', daemon=True)
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self, status: Optional[int]) -> None:
+        """Stop sampling and wait for the sampler thread (blocking: call it off the event loop)"""
+        self.duration = time.perf_counter() - self._started
+        self.status = status
+        self._stop.set()
+        self._thread.join()
+
+    def _sample(self) -> None:
+        own = threading.get_ident()
+        names = {}
+        while not self._stop.wait(self.interval):
+            if self.samples >= self.max_samples or time.perf_counter() - self._started >= self.max_duration:
+                self.truncated = True
+                return
+            for ident, frame in sys._current_frames().items():
+                if ident == own or _is_idle(frame):
+                    continue
+                if ident not in names:
+                    thread = next((t for t in threading.enumerate() if t.ident == ident), None)
+                    names[ident] = thread.name if thread is not None else f'thread-{ident}'
+                stack = []
+                while frame is not None:
+                    stack.append(_frame_label(frame))
+                    frame = frame.f_back
+                stack.append(names[ident])
+                self.stacks[';'.join(reversed(stack))] += 1
+            self.samples += 1
+
+    def record_db_call(self, event: Dict[str, Any]) -> None:
+        self.db_calls.append({
+            'label': event['label'],
+            'endpoint': event['endpoint'],
+            'ms': round(event['seconds'] * 1000, 2),
+            'ok': event['ok'],
+            'rows': event['rows'],
+            'at_ms': round((time.perf_counter() - self._started - event['seconds']) * 1000, 2)
+        })
+
+    def collapsed(self) -> str:
+        """Brendan Gregg's collapsed-stack format (flamegraph.pl, speedscope, inferno)"""
+        return '\n'.join(f'{stack} {count}' for stack, count in self.stacks.most_common()) + '\n'
+
+    def summary(self) -> Dict[str, Any]:
+        db_ms = sum(call['ms'] for call in self.db_calls)
+        return {
+            'id': self.id,
+            'method': self.method,
+            'path': self.path,
+            'reason': self.reason,
+            'status': self.status,
+            'started_at': self.started_at,
+            'duration_ms': round((self.duration or 0) * 1000, 2),
+            'samples': self.samples,
+            'interval_ms': round(self.interval * 1000, 2),
+            'truncated': self.truncated,
+            'db_calls': len(self.db_calls),
+            'db_ms': round(db_ms, 2)
+        }
+
+
+def observe_query(event: Dict[str, Any]) -> None:
+    """DataClient observer: attach the call to the profiled request running in this context"""
+    session = _current_session.get()
+    if session is not None:
+        session.record_db_call(event)
+
+
+class ProfileStore:
+    """The most recent profiles, kept in memory for download"""
+
+    def __init__(self, max_profiles: int = 50):
+        self.max_profiles = max_profiles
+        self._profiles: 'OrderedDict[str, ProfileSession]' = OrderedDict()
+        self._lock = threading.Lock()
+
+    def add(self, session: ProfileSession) -> None:
+        with self._lock:
+            self._profiles[session.id] = session
+            while len(self._profiles) > self.max_profiles:
+                self._profiles.popitem(last=False)
+
+    def get(self, profile_id: str) -> Optional[ProfileSession]:
+        with self._lock:
+            return self._profiles.get(profile_id)
+
+    def list(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            sessions = list(self._profiles.values())
+        return [session.summary() for session in reversed(sessions)]
+
+
+class ProfilingMiddleware:
+    """
+    ASGI middleware that profiles selected requests.
+
+    A request is profiled when it carries X-Profile: 1 and `authorize`
+    accepts its headers (admins only), or when it is picked by 1-in-N
+    sampling. At most max_concurrent requests are profiled at once, each for
+    at most max_duration seconds / max_samples samples, which bounds the
+    overhead; other requests pass through untouched. Profiled
+    responses carry X-Profile-Id, and the profile is added to the store.
+    """
+
+    def __init__(self, app: Callable, store: ProfileStore, authorize: Callable[[Dict[bytes, bytes]], bool],
+                 sample_every: int = 0, interval: float = 0.005, max_concurrent: int = 2,
+                 max_duration: float = 30.0, max_samples: int = 5000):
+        self.app = app
+        self.store = store
+        self.authorize = authorize
+        self.sample_every = sample_every
+        self.interval = interval
+        self.max_concurrent = max_concurrent
+        self.max_duration = max_duration
+        self.max_samples = max_samples
+        self._active = 0
+        self._counter = itertools.count(random.randrange(max(sample_every, 1)))
+        self._lock = threading.Lock()
+
+    def _reason(self, headers: Dict[bytes, bytes]) -> Optional[str]:
+        if headers.get(PROFILE_HEADER, b'').strip() in (b'1', b'true'):
+            return 'requested' if self.authorize(headers) else None
+        if self.sample_every > 0 and next(self._counter) % self.sample_every == 0:
+            return 'sampled'
+        return None
+
+    async def __call__(self, scope: Dict[str, Any], receive: Callable, send: Callable) -> None:
+        if scope['type'] != 'http' or not scope['path'].startswith('/api/') or scope['path'].startswith(UNPROFILED_PATHS):
+            await self.app(scope, receive, send)
+            return
+        reason = self._reason(dict(scope.get('headers') or []))
+        if reason is None:
+            await self.app(scope, receive, send)
+            return
+        with self._lock:
+            if self._active >= self.max_concurrent:
+                reason = None
+            else:
+                self._active += 1
+        if reason is None:
+            await self.app(scope, receive, send)
+            return
+
+        session = ProfileSession(scope['method'], scope['path'], reason, self.interval, self.max_duration,
+                                 self.max_samples)
+        state = {'status': None}
+
+        async def profiled_send(message: Dict[str, Any]) -> None:
+            if message['type'] == 'http.response.start':
+                state['status'] = message['status']
+                message = {**message, 'headers': list(message.get('headers', [])) + [
+                    (PROFILE_ID_HEADER, session.id.encode())
+                ]}
+            await send(message)
+
+        token = _current_session.set(session)
+        session.start()
+        try:
+            await self.app(scope, receive, profiled_send)
+        finally:
+            # Joining the sampler thread blocks for up to one interval; keep it off the event loop
+            await asyncio.to_thread(session.stop, state['status'])
+            _current_session.reset(token)
+            with self._lock:
+                self._active -= 1
+            self.store.add(session)
+
+
+def create_profiling_options() -> Dict[str, Any]:
+    """
+    Middleware options from the environment: PROFILE_SAMPLE_EVERY (profile
+    1 in N requests, default 0 = only on request), PROFILE_INTERVAL_MS
+    (sampling interval, default 5), PROFILE_MAX_CONCURRENT (default 2),
+    PROFILE_MAX_SECONDS (default 30) and PROFILE_MAX_SAMPLES (default 5000).
+    """
+    return {
+        'sample_every': int(os.getenv('PROFILE_SAMPLE_EVERY', '0')),
+        'interval': float(os.getenv('PROFILE_INTERVAL_MS', '5')) / 1000,
+        'max_concurrent': int(os.getenv('PROFILE_MAX_CONCURRENT', '2')),
+        'max_duration': float(os.getenv('PROFILE_MAX_SECONDS', '30')),
+        'max_samples': int(os.getenv('PROFILE_MAX_SAMPLES', '5000'))
+    }
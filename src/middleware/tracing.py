@@ -0,0 +1,60 @@
+"""
+Tracing Middleware
+Opens a SERVER span for every HTTP request, continuing the caller's trace
+when the request carries a W3C traceparent header. Controller, query and
+bcrypt spans (see tracing.py) become its children.
+"""
+from typing import Any, Callable, Dict
+
+from tracing import get_tracer
+
+try:
+    from opentelemetry import propagate
+    from opentelemetry.trace import SpanKind, Status, StatusCode
+except ImportError:  # optional dependency; the middleware is only installed when tracing is on
+    propagate = None
+
+
+class TracingMiddleware:
+    """
+    ASGI middleware that wraps each request in a span named after its route
+    template ('GET /api/users/{user_id}'), so spans group by endpoint rather
+    than by user id. Add it outermost so queueing in admission control counts
+    towards the request.
+    """
+
+    def __init__(self, app: Callable):
+        self.app = app
+
+    async def __call__(self, scope: Dict[str, Any], receive: Callable, send: Callable) -> None:
+        tracer = get_tracer()
+        if scope['type'] != 'http' or tracer is None:
+            await self.app(scope, receive, send)
+            return
+
+        carrier = {key.decode('latin-1'): value.decode('latin-1') for key, value in scope.get('headers') or []}
+        state = {'status': None}
+
+        async def traced_send(message: Dict[str, Any]) -> None:
+            if message['type'] == 'http.response.start':
+                state['status'] = message['status']
+            await send(message)
+
+        with tracer.start_as_current_span(
+            f"{scope['method']} {scope['path']}",
+            context=propagate.extract(carrier),
+            kind=SpanKind.SERVER,
+            attributes={'http.request.method': scope['method'], 'url.path': scope['path']}
+        ) as request_span:
+            try:
+                await self.app(scope, receive, traced_send)
+            finally:
+                # FastAPI puts the matched route in the scope while routing
+                route = getattr(scope.get('route'), 'path', None)
+                if route is not None:
+                    request_span.update_name(f"{scope['method']} {route}")
+                    request_span.set_attribute('http.route', route)
+                if state['status'] is not None:
+                    request_span.set_attribute('http.response.status_code', state['status'])
+                    if state['status'] >= 500:
+                        request_span.set_status(Status(StatusCode.ERROR))
@@ -0,0 +1,18 @@
+-- Migration: Make users.email unique case-insensitively
+-- Purpose: User creation inserts directly and relies on unique constraints instead of
+--          pre-check SELECTs; 'Bob@x.com' and 'bob@x.com' must count as the same email
+-- Date: 2026-10-19
+-- NOTE: Supersedes the case-sensitive users_email_key constraint (the removed
+--       add_unique_email_to_users.sql) and drops it where it was already applied.
+--       Fails if case-insensitive duplicates exist; resolve them first with the query below.
+
+-- Find existing duplicates (should return no rows before applying)
+SELECT lower(email), COUNT(*) FROM users WHERE email IS NOT NULL GROUP BY lower(email) HAVING COUNT(*) > 1;
+
+ALTER TABLE users
+DROP CONSTRAINT IF EXISTS users_email_key;
+
+CREATE UNIQUE INDEX IF NOT EXISTS users_email_lower_key ON users (lower(email));
+
+-- Verify the index was added
+SELECT indexname, indexdef FROM pg_indexes WHERE tablename = 'users' AND indexname = 'users_email_lower_key';
@@ -0,0 +1,14 @@
+-- Migration: Database clock for the user change feed
+-- Purpose: GET /api/users/changes holds its cursor back from the database's clock
+--          (not the newest row), so the cursor keeps advancing while no writes happen
+-- Date: 2026-10-19
+
+CREATE OR REPLACE FUNCTION change_feed_now()
+RETURNS TIMESTAMPTZ AS $$
+    SELECT clock_timestamp();
+$$ LANGUAGE sql VOLATILE;
+
+GRANT EXECUTE ON FUNCTION change_feed_now() TO anon, authenticated, service_role;
+
+-- Verify
+SELECT change_feed_now();
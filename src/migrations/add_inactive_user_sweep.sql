@@ -0,0 +1,58 @@
+-- Migration: Inactive-account sweep
+-- Purpose: Let the sweep_inactive background job suspend accounts that have not logged in
+--          for N days, one small batch per statement
+-- Date: 2026-10-19
+-- "Last seen" is last_login, or created_at for accounts that never logged in. Both columns
+-- are TIMESTAMP (no time zone) written with now(), so the cutoff uses LOCALTIMESTAMP.
+
+-- Active users ordered by last seen: each batch is an index range scan below the cutoff
+CREATE INDEX IF NOT EXISTS idx_users_active_last_seen
+    ON users ((COALESCE(last_login, created_at)))
+    WHERE is_active;
+
+-- How many accounts a sweep would suspend (progress total and dry runs)
+CREATE OR REPLACE FUNCTION count_inactive_users(
+    p_inactive_days INTEGER,
+    p_exclude_role_codes TEXT[] DEFAULT ARRAY['USER_ADMIN']
+)
+RETURNS INTEGER AS $$
+    SELECT COUNT(*)::INTEGER
+    FROM users u
+    JOIN roles r ON r.id = u.role_id
+    WHERE u.is_active
+      AND COALESCE(u.last_login, u.created_at) < LOCALTIMESTAMP - make_interval(days => p_inactive_days)
+      AND r.role_code <> ALL (p_exclude_role_codes);
+$$ LANGUAGE sql STABLE;
+
+-- Suspend one batch and return the suspended ids (so the API can revoke their tokens).
+-- SKIP LOCKED: rows an admin is editing right now are left for the next run instead of waited on.
+CREATE OR REPLACE FUNCTION suspend_inactive_users(
+    p_inactive_days INTEGER,
+    p_batch_size INTEGER DEFAULT 200,
+    p_exclude_role_codes TEXT[] DEFAULT ARRAY['USER_ADMIN']
+)
+RETURNS TABLE (id INTEGER) AS $$
+    WITH batch AS (
+        SELECT u.id
+        FROM users u
+        JOIN roles r ON r.id = u.role_id
+        WHERE u.is_active
+          AND COALESCE(u.last_login, u.created_at) < LOCALTIMESTAMP - make_interval(days => p_inactive_days)
+          AND r.role_code <> ALL (p_exclude_role_codes)
+        ORDER BY COALESCE(u.last_login, u.created_at)
+        LIMIT p_batch_size
+        FOR UPDATE OF u SKIP LOCKED
+    )
+    UPDATE users u
+    SET is_active = FALSE
+    FROM batch
+    WHERE u.id = batch.id
+    RETURNING u.id;
+$$ LANGUAGE sql VOLATILE;
+
+-- SECURITY INVOKER (the default): the caller's table privileges and RLS still apply
+GRANT EXECUTE ON FUNCTION count_inactive_users(INTEGER, TEXT[]) TO anon, authenticated, service_role;
+GRANT EXECUTE ON FUNCTION suspend_inactive_users(INTEGER, INTEGER, TEXT[]) TO anon, authenticated, service_role;
+
+-- Verify (counts accounts idle for over a year)
+SELECT count_inactive_users(365);
@@ -0,0 +1,35 @@
+-- Migration: Add jobs table for the background job runner
+-- Purpose: Persist background jobs (cascade role deletes, bulk suspends, exports) with
+--          progress and a resume checkpoint, so they survive restarts and any worker
+--          can report their status
+-- Date: 2026-10-19
+
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    job_type TEXT NOT NULL,
+    params JSONB NOT NULL DEFAULT '{}'::jsonb,
+    status TEXT NOT NULL DEFAULT 'queued'
+        CHECK (status IN ('queued', 'running', 'succeeded', 'failed', 'cancelled')),
+    progress_done BIGINT NOT NULL DEFAULT 0,
+    progress_total BIGINT,
+    -- Handler-specific position (e.g. last processed id); a resumed job continues from here
+    checkpoint JSONB NOT NULL DEFAULT '{}'::jsonb,
+    result JSONB,
+    error TEXT,
+    cancel_requested BOOLEAN NOT NULL DEFAULT FALSE,
+    created_by TEXT,
+    -- Worker currently running the job; heartbeat_at goes stale if that worker dies
+    worker_id TEXT,
+    created_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+    started_at TIMESTAMPTZ,
+    finished_at TIMESTAMPTZ,
+    heartbeat_at TIMESTAMPTZ
+);
+
+-- Startup scan for jobs to resume
+CREATE INDEX IF NOT EXISTS idx_jobs_unfinished ON jobs(created_at) WHERE status IN ('queued', 'running');
+-- GET /api/jobs (most recent first)
+CREATE INDEX IF NOT EXISTS idx_jobs_created_at ON jobs(created_at DESC);
+
+-- Verify
+SELECT status, COUNT(*) FROM jobs GROUP BY status;
@@ -0,0 +1,18 @@
+-- Migration: Add job_output table for export results
+-- Purpose: Export jobs store their CSV in the database, one row per chunk, so a job
+--          resumed on another worker continues the same output and any worker can
+--          serve GET /api/jobs/{id}/result
+-- Date: 2026-10-19
+-- REQUIRES: add_jobs_table.sql (sorts before this file): job_output.job_id
+--           references jobs(id).
+
+CREATE TABLE IF NOT EXISTS job_output (
+    job_id TEXT NOT NULL REFERENCES jobs(id) ON DELETE CASCADE,
+    -- Chunk number; a re-run chunk upserts the same row, so resuming never duplicates or truncates output
+    seq INTEGER NOT NULL,
+    data TEXT NOT NULL,
+    PRIMARY KEY (job_id, seq)
+);
+
+-- Verify
+SELECT COUNT(*) FROM job_output;
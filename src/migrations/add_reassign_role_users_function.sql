@@ -0,0 +1,34 @@
+-- Migration: Set-based role reassignment
+-- Purpose: Move users from one role to another one batch per statement, so a role can be
+--          retired without deleting its users (DELETE /api/roles/{id}?reassign_to=<id>,
+--          POST /api/roles/{id}/reassign)
+-- Date: 2026-10-19
+-- Uses idx_users_role_id_id (add_user_details_indexes.sql) for the batch scan.
+
+CREATE OR REPLACE FUNCTION reassign_role_users(
+    p_from_role_id INTEGER,
+    p_to_role_id INTEGER,
+    p_batch_size INTEGER DEFAULT 1000
+)
+RETURNS INTEGER AS $$
+    WITH batch AS (
+        SELECT id FROM users
+        WHERE role_id = p_from_role_id
+        ORDER BY id
+        LIMIT p_batch_size
+        FOR UPDATE
+    ), moved AS (
+        UPDATE users u
+        SET role_id = p_to_role_id
+        FROM batch
+        WHERE u.id = batch.id
+        RETURNING 1
+    )
+    SELECT COUNT(*)::INTEGER FROM moved;
+$$ LANGUAGE sql VOLATILE;
+
+-- SECURITY INVOKER (the default): the caller's table privileges and RLS still apply
+GRANT EXECUTE ON FUNCTION reassign_role_users(INTEGER, INTEGER, INTEGER) TO anon, authenticated, service_role;
+
+-- Verify (moves nothing: no users have role 0)
+SELECT reassign_role_users(0, 0, 1);
@@ -0,0 +1,23 @@
+-- Migration: Replication lag probe for read-replica routing
+-- Purpose: The data layer polls replication_lag_seconds() on every read replica
+--          and stops routing reads to a replica whose lag exceeds
+--          maxReplicaLagSeconds in config.json
+-- Date: 2026-10-19
+-- Run on the primary; the function replicates to the read replicas.
+
+CREATE OR REPLACE FUNCTION replication_lag_seconds()
+RETURNS DOUBLE PRECISION AS $$
+    SELECT CASE
+        -- Primary: no lag
+        WHEN NOT pg_is_in_recovery() THEN 0
+        -- Replica that has replayed everything it received: caught up, even if
+        -- the primary has been idle (replay timestamp alone would look stale)
+        WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+        ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)
+    END::DOUBLE PRECISION;
+$$ LANGUAGE sql STABLE;
+
+GRANT EXECUTE ON FUNCTION replication_lag_seconds() TO anon, authenticated, service_role;
+
+-- Verify (0 on the primary)
+SELECT replication_lag_seconds();
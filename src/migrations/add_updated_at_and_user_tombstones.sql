@@ -0,0 +1,99 @@
+-- Migration: Add updated_at tracking and user tombstones for delta sync
+-- Purpose: Back GET /api/users/changes?since=<cursor> so clients can sync only the
+--          users created, updated or deleted since their last cursor
+-- Date: 2026-10-19
+-- NOTE: Apply before add_user_row_versions.sql, which extends the user_details view defined
+--       here with version. Re-running this file after it fails (a view cannot drop columns).
+
+-- ========================================
+-- updated_at COLUMNS
+-- ========================================
+ALTER TABLE users ADD COLUMN IF NOT EXISTS updated_at TIMESTAMPTZ NOT NULL DEFAULT clock_timestamp();
+ALTER TABLE roles ADD COLUMN IF NOT EXISTS updated_at TIMESTAMPTZ NOT NULL DEFAULT clock_timestamp();
+
+CREATE INDEX IF NOT EXISTS idx_users_updated_at ON users(updated_at);
+
+-- clock_timestamp() (not now()) so rows touched in one transaction still get distinct values
+CREATE OR REPLACE FUNCTION set_updated_at()
+RETURNS TRIGGER AS $$
+BEGIN
+    NEW.updated_at = clock_timestamp();
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_users_updated_at ON users;
+CREATE TRIGGER trg_users_updated_at
+BEFORE UPDATE ON users
+FOR EACH ROW EXECUTE FUNCTION set_updated_at();
+
+DROP TRIGGER IF EXISTS trg_roles_updated_at ON roles;
+CREATE TRIGGER trg_roles_updated_at
+BEFORE UPDATE ON roles
+FOR EACH ROW EXECUTE FUNCTION set_updated_at();
+
+-- user_details shows role columns, so a renamed role must resurface its users in the feed
+CREATE OR REPLACE FUNCTION touch_users_of_role()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF NEW.role_name IS DISTINCT FROM OLD.role_name
+       OR NEW.role_code IS DISTINCT FROM OLD.role_code
+       OR NEW.dashboard_route IS DISTINCT FROM OLD.dashboard_route THEN
+        UPDATE users SET updated_at = clock_timestamp() WHERE role_id = NEW.id;
+    END IF;
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_roles_touch_users ON roles;
+CREATE TRIGGER trg_roles_touch_users
+AFTER UPDATE ON roles
+FOR EACH ROW EXECUTE FUNCTION touch_users_of_role();
+
+-- ========================================
+-- USER TOMBSTONES
+-- ========================================
+-- One row per hard-deleted user (including cascade deletes from roles)
+CREATE TABLE IF NOT EXISTS user_tombstones (
+    user_id INTEGER PRIMARY KEY,
+    deleted_at TIMESTAMPTZ NOT NULL DEFAULT clock_timestamp()
+);
+
+CREATE INDEX IF NOT EXISTS idx_user_tombstones_deleted_at ON user_tombstones(deleted_at);
+
+CREATE OR REPLACE FUNCTION record_user_tombstone()
+RETURNS TRIGGER AS $$
+BEGIN
+    INSERT INTO user_tombstones (user_id, deleted_at)
+    VALUES (OLD.id, clock_timestamp())
+    ON CONFLICT (user_id) DO UPDATE SET deleted_at = EXCLUDED.deleted_at;
+    RETURN OLD;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_users_tombstone ON users;
+CREATE TRIGGER trg_users_tombstone
+AFTER DELETE ON users
+FOR EACH ROW EXECUTE FUNCTION record_user_tombstone();
+
+-- ========================================
+-- USER_DETAILS VIEW (expose updated_at)
+-- ========================================
+CREATE OR REPLACE VIEW user_details AS
+SELECT
+    u.id,
+    u.username,
+    u.email,
+    u.full_name,
+    u.is_active,
+    u.last_login,
+    r.role_name,
+    r.role_code,
+    r.dashboard_route,
+    u.created_at,
+    u.updated_at
+FROM users u
+JOIN roles r ON u.role_id = r.id;
+
+-- Verify
+SELECT id, username, updated_at FROM user_details ORDER BY updated_at DESC LIMIT 5;
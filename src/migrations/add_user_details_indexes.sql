@@ -0,0 +1,47 @@
+-- Migration: Indexes for the user_details query patterns used by the controllers
+-- Purpose: Support the filters and searches the controllers run through user_details:
+--          eq('email'), eq('is_active'), eq('role_code'), eq('id'), order('id'),
+--          and ilike('%q%') on username / full_name / email
+-- Date: 2026-10-19
+-- Benchmark: benchmarks/explain_user_details.py compares plans before and after at 1M rows
+
+-- Trigram support for ilike '%q%' (leading wildcard cannot use a btree)
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
+-- ========================================
+-- EQUALITY / FILTER INDEXES
+-- ========================================
+-- Exact-match lookups on email (lower(email) is already covered by users_email_lower_key)
+CREATE INDEX IF NOT EXISTS idx_users_email ON users(email);
+
+-- get_active_users / get_suspended_users filter on is_active and order by id
+CREATE INDEX IF NOT EXISTS idx_users_is_active_id ON users(is_active, id);
+
+-- get_users_by_role filters on role_code through the join; users(role_id, id)
+-- lets the join feed an ordered scan per role
+CREATE INDEX IF NOT EXISTS idx_users_role_id_id ON users(role_id, id);
+-- Superseded by the composite index above
+DROP INDEX IF EXISTS idx_users_role_id;
+
+-- roles.role_code is UNIQUE, so it is already indexed (roles_role_code_key)
+
+-- ========================================
+-- TRIGRAM SEARCH INDEXES
+-- ========================================
+CREATE INDEX IF NOT EXISTS idx_users_username_trgm ON users USING gin (username gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS idx_users_full_name_trgm ON users USING gin (full_name gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS idx_users_email_trgm ON users USING gin (email gin_trgm_ops);
+
+-- ========================================
+-- PLANNER STATISTICS
+-- ========================================
+ANALYZE users;
+ANALYZE roles;
+
+-- NOTE: user_details stays a plain view. It is a single-row-per-user join against a
+-- tiny roles table, so with the indexes above every filter is pushed down to users;
+-- a materialized view would add refresh lag that the ETag, delta-sync and SSE
+-- features would have to work around.
+
+-- Verify
+SELECT indexname FROM pg_indexes WHERE tablename = 'users' ORDER BY indexname;
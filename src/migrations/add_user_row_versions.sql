@@ -0,0 +1,68 @@
+-- Migration: Add row versions to users and roles for optimistic concurrency
+-- Purpose: PUT /api/users/{id} and PUT /api/roles/{id} accept If-Match and apply
+--          UPDATE ... WHERE id = ? AND version = ?, so concurrent admin edits
+--          are rejected instead of silently overwriting each other
+-- Date: 2026-10-19
+-- REQUIRES: add_updated_at_and_user_tombstones.sql (sorts before this file): the
+--           user_details view below selects u.updated_at.
+
+ALTER TABLE users ADD COLUMN IF NOT EXISTS version INTEGER NOT NULL DEFAULT 1;
+ALTER TABLE roles ADD COLUMN IF NOT EXISTS version INTEGER NOT NULL DEFAULT 1;
+
+-- Only the columns shown in the admin edit form bump the user version, so a
+-- login (last_login), a background password rehash or a role rename touching
+-- updated_at does not invalidate an open edit form
+CREATE OR REPLACE FUNCTION bump_user_version()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF ROW(NEW.username, NEW.email, NEW.full_name, NEW.role_id, NEW.is_active)
+       IS DISTINCT FROM
+       ROW(OLD.username, OLD.email, OLD.full_name, OLD.role_id, OLD.is_active) THEN
+        NEW.version = OLD.version + 1;
+    ELSE
+        NEW.version = OLD.version;
+    END IF;
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_users_version ON users;
+CREATE TRIGGER trg_users_version
+BEFORE UPDATE ON users
+FOR EACH ROW EXECUTE FUNCTION bump_user_version();
+
+CREATE OR REPLACE FUNCTION bump_row_version()
+RETURNS TRIGGER AS $$
+BEGIN
+    NEW.version = OLD.version + 1;
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_roles_version ON roles;
+CREATE TRIGGER trg_roles_version
+BEFORE UPDATE ON roles
+FOR EACH ROW EXECUTE FUNCTION bump_row_version();
+
+-- ========================================
+-- USER_DETAILS VIEW (expose version)
+-- ========================================
+CREATE OR REPLACE VIEW user_details AS
+SELECT
+    u.id,
+    u.username,
+    u.email,
+    u.full_name,
+    u.is_active,
+    u.last_login,
+    r.role_name,
+    r.role_code,
+    r.dashboard_route,
+    u.created_at,
+    u.updated_at,
+    u.version
+FROM users u
+JOIN roles r ON u.role_id = r.id;
+
+-- Verify
+SELECT id, username, version FROM user_details ORDER BY id LIMIT 5;
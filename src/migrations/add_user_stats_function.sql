@@ -0,0 +1,51 @@
+-- Migration: Aggregate user statistics for the admin dashboard
+-- Purpose: Back GET /api/users/stats with one aggregate query instead of shipping
+--          the full user list to the browser to count it there
+-- Date: 2026-10-19
+-- One pass over users (joined to roles) with FILTER aggregates; the API caches the
+-- result for a few seconds and drops it on any user or role change.
+
+CREATE OR REPLACE FUNCTION get_user_stats()
+RETURNS JSON AS $$
+    WITH per_role AS (
+        SELECT
+            r.id,
+            r.role_name,
+            r.role_code,
+            COUNT(u.id) AS total_users,
+            COUNT(u.id) FILTER (WHERE u.is_active) AS active_users,
+            COUNT(u.id) FILTER (WHERE u.last_login >= now() - INTERVAL '24 hours') AS logins_24h,
+            COUNT(u.id) FILTER (WHERE u.last_login >= now() - INTERVAL '7 days') AS logins_7d,
+            COUNT(u.id) FILTER (WHERE u.last_login >= now() - INTERVAL '30 days') AS logins_30d,
+            COUNT(u.id) FILTER (WHERE u.id IS NOT NULL AND u.last_login IS NULL) AS never_logged_in
+        FROM roles r
+        LEFT JOIN users u ON u.role_id = r.id
+        GROUP BY r.id, r.role_name, r.role_code
+    )
+    SELECT json_build_object(
+        'total_users', COALESCE(SUM(total_users), 0),
+        'active_users', COALESCE(SUM(active_users), 0),
+        'suspended_users', COALESCE(SUM(total_users - active_users), 0),
+        'recent_logins', json_build_object(
+            'last_24h', COALESCE(SUM(logins_24h), 0),
+            'last_7d', COALESCE(SUM(logins_7d), 0),
+            'last_30d', COALESCE(SUM(logins_30d), 0),
+            'never', COALESCE(SUM(never_logged_in), 0)
+        ),
+        'roles', COALESCE(json_agg(json_build_object(
+            'role_id', id,
+            'role_name', role_name,
+            'role_code', role_code,
+            'total_users', total_users,
+            'active_users', active_users,
+            'suspended_users', total_users - active_users
+        ) ORDER BY id), '[]'::json),
+        'generated_at', now()
+    )
+    FROM per_role;
+$$ LANGUAGE sql STABLE;
+
+GRANT EXECUTE ON FUNCTION get_user_stats() TO anon, authenticated, service_role;
+
+-- Verify
+SELECT get_user_stats();
@@ -0,0 +1,46 @@
+"""
+bcrypt Cost Calibration
+Measures hash latency on this machine and recommends the highest BCRYPT_ROUNDS
+that stays within a target. Run it on the deployment hardware, then set the
+result in the backend environment; existing hashes are upgraded (or downgraded)
+transparently on each user's next login.
+
+Usage:
+    python scripts/calibrate_bcrypt.py --target-ms 250
+"""
+
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from security.password_hashing import BCRYPT_ROUNDS, MAX_BCRYPT_ROUNDS, MIN_BCRYPT_ROUNDS, calibrate
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--target-ms', type=float, default=250.0, help='latency budget per hash (default: 250)')
+    parser.add_argument('--min-rounds', type=int, default=MIN_BCRYPT_ROUNDS,
+                        help=f'security floor (default: {MIN_BCRYPT_ROUNDS})')
+    parser.add_argument('--max-rounds', type=int, default=MAX_BCRYPT_ROUNDS,
+                        help=f'highest cost to try (default: {MAX_BCRYPT_ROUNDS})')
+    parser.add_argument('--samples', type=int, default=3, help='hashes per cost factor (default: 3)')
+    args = parser.parse_args()
+
+    print(f'Calibrating bcrypt for a {args.target_ms:.0f} ms target (current BCRYPT_ROUNDS={BCRYPT_ROUNDS})...')
+    chosen, measurements = calibrate(args.target_ms, args.min_rounds, args.max_rounds, args.samples)
+
+    print(f"\n{'rounds':>6} {'ms/hash':>9} {'logins/s/core':>14}")
+    for m in measurements:
+        marker = '  <- chosen' if m['rounds'] == chosen else ''
+        print(f"{m['rounds']:>6} {m['ms']:>9.1f} {1000 / m['ms']:>14.1f}{marker}")
+
+    if measurements[0]['ms'] > args.target_ms:
+        print(f'\nEven the floor ({args.min_rounds}) exceeds the target on this machine.')
+    print(f'\nRecommended setting:\n    BCRYPT_ROUNDS={chosen}')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
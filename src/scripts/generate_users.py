@@ -0,0 +1,242 @@
+"""
+Synthetic User Generator
+Produces large numbers of realistic users across the roles in `roles` for
+scale testing, and bulk-loads them into Postgres with COPY or writes a CSV.
+
+Passwords are bcrypt-hashed in parallel (one process per CPU). Hashing every
+row at production cost would take days for millions of users, so a pool of
+--distinct-passwords plaintexts is hashed once and assigned round-robin: the
+user whose username ends in N logs in with "<--password-prefix><N % --distinct-passwords>".
+
+Usage:
+    DATABASE_URL=postgresql://... python scripts/generate_users.py --count 1000000
+    python scripts/generate_users.py --count 100000 --csv users.csv --cost 4
+
+Load a CSV later with:
+    \\copy users (username, password, email, full_name, role_id, is_active, last_login, created_at)
+        FROM 'users.csv' WITH (FORMAT csv, HEADER true)
+"""
+
+import argparse
+import csv
+import os
+import random
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import bcrypt
+
+COLUMNS = ('username', 'password', 'email', 'full_name', 'role_id', 'is_active', 'last_login', 'created_at')
+
+# Role ids as seeded by database_setup.sql; used when writing a CSV without a database
+DEFAULT_ROLE_IDS = {'USER_ADMIN': 1, 'PIN': 2, 'CSR_REP': 3, 'PLATFORM_MGMT': 4}
+DEFAULT_ROLE_WEIGHTS = 'CSR_REP=60,PIN=25,PLATFORM_MGMT=10,USER_ADMIN=5'
+
+FIRST_NAMES = [
+    'James', 'Mary', 'Wei', 'Aisha', 'Carlos', 'Priya', 'Liam', 'Sofia', 'Kenji', 'Fatima',
+    'Noah', 'Olga', 'Mateo', 'Chloe', 'Ahmed', 'Yuki', 'Ethan', 'Amara', 'Lucas', 'Ines',
+    'Daniel', 'Grace', 'Arjun', 'Hana', 'Omar', 'Elena', 'Samuel', 'Mei', 'David', 'Zara',
+    'Jonas', 'Leila', 'Ryan', 'Nadia', 'Felix', 'Sara', 'Ivan', 'Aiko', 'Marcus', 'Lucia',
+]
+LAST_NAMES = [
+    'Smith', 'Tan', 'Garcia', 'Khan', 'Nguyen', 'Muller', 'Rossi', 'Kim', 'Silva', 'Cohen',
+    'Lee', 'Okafor', 'Novak', 'Dubois', 'Sato', 'Patel', 'Jensen', 'Lopez', 'Ali', 'Brown',
+    'Wong', 'Schmidt', 'Costa', 'Ivanova', 'Yamamoto', 'Haddad', 'Larsen', 'Moreau', 'Chen', 'Walker',
+    'Kowalski', 'Mensah', 'Fischer', 'Romero', 'Singh', 'Berg', 'Horvat', 'Ortiz', 'Lim', 'Evans',
+]
+
+
+def hash_one(job: Tuple[str, int]) -> str:
+    """Hash a single plaintext (runs in a worker process)"""
+    password, cost = job
+    return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt(rounds=cost)).decode('utf-8')
+
+
+def hash_passwords(passwords: List[str], cost: int, workers: int) -> List[str]:
+    """
+    Hash passwords in parallel across worker processes.
+
+    Args:
+        passwords: Plaintext passwords
+        cost: bcrypt cost factor (log2 rounds, 4-31)
+        workers: Number of worker processes
+
+    Returns:
+        List of bcrypt hashes in the same order as passwords
+    """
+    jobs = [(password, cost) for password in passwords]
+    if workers <= 1:
+        return [hash_one(job) for job in jobs]
+    chunksize = max(1, len(jobs) // (workers * 4))
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(hash_one, jobs, chunksize=chunksize))
+
+
+def parse_role_weights(spec: str, role_ids: Dict[str, int]) -> Tuple[List[int], List[float]]:
+    """
+    Parse 'CODE=weight,...' into role ids and weights.
+
+    Args:
+        spec: Comma-separated role_code=weight pairs
+        role_ids: Mapping of role_code to role id
+
+    Returns:
+        Tuple of (role ids, weights)
+
+    Raises:
+        ValueError: If a role code is unknown or a weight is invalid
+    """
+    ids, weights = [], []
+    for part in spec.split(','):
+        code, _, weight = part.strip().partition('=')
+        if code not in role_ids:
+            raise ValueError(f"Unknown role code '{code}' (known: {', '.join(sorted(role_ids))})")
+        ids.append(role_ids[code])
+        weights.append(float(weight or 1))
+    if not any(weights):
+        raise ValueError('At least one role weight must be positive')
+    return ids, weights
+
+
+def generate_rows(count: int, start: int, hashes: List[str], role_ids: List[int], weights: List[float],
+                  suspended_ratio: float, domain: str, seed: Optional[int],
+                  now: Optional[datetime] = None) -> Iterator[tuple]:
+    """
+    Yield synthetic user rows in COLUMNS order.
+
+    Usernames and emails carry a numeric suffix (start + i), so they stay
+    unique across repeated runs when start is past the current max id.
+    Timestamps are relative to now (default: the current time).
+    """
+    rng = random.Random(seed)
+    now = now or datetime.now()
+    roles = rng.choices(role_ids, weights=weights, k=min(count, 65536))
+    for i in range(count):
+        n = start + i
+        first = FIRST_NAMES[rng.randrange(len(FIRST_NAMES))]
+        last = LAST_NAMES[rng.randrange(len(LAST_NAMES))]
+        created_at = now - timedelta(seconds=rng.randrange(3 * 365 * 86400))
+        last_login = None
+        if rng.random() < 0.8:
+            last_login = created_at + (now - created_at) * rng.random()
+        yield (
+            f'{first.lower()}_{last.lower()}{n}',
+            hashes[n % len(hashes)],
+            f'{first.lower()}.{last.lower()}{n}@{domain}',
+            f'{first} {last}',
+            roles[i % len(roles)],
+            rng.random() >= suspended_ratio,
+            last_login,
+            created_at,
+        )
+
+
+def copy_to_postgres(conn, rows: Iterator[tuple], count: int, batch_size: int) -> None:
+    """COPY rows into users, committing every batch_size rows"""
+    copy_sql = f"COPY users ({', '.join(COLUMNS)}) FROM STDIN"
+    loaded = 0
+    started = time.perf_counter()
+    while loaded < count:
+        batch = min(batch_size, count - loaded)
+        with conn.cursor() as cursor, cursor.copy(copy_sql) as copy:
+            for _ in range(batch):
+                copy.write_row(next(rows))
+        conn.commit()
+        loaded += batch
+        rate = loaded / (time.perf_counter() - started)
+        print(f'  loaded {loaded:,}/{count:,} users ({rate:,.0f} rows/s)')
+
+
+def write_csv(path: str, rows: Iterator[tuple], count: int) -> None:
+    """Write rows to a CSV file with a header row"""
+    with open(path, 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(COLUMNS)
+        for row in rows:
+            writer.writerow(['' if value is None else value for value in row])
+    print(f'  wrote {count:,} users to {path}')
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--count', type=int, default=100_000, help='users to generate (default: 100,000)')
+    parser.add_argument('--cost', type=int, default=12, help='bcrypt cost factor (default: 12, as used by the app)')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help='hashing processes (default: CPU count)')
+    parser.add_argument('--distinct-passwords', type=int, default=500, help='distinct plaintexts to hash (default: 500)')
+    parser.add_argument('--password-prefix', default='ScaleTest#', help="plaintext prefix (default: 'ScaleTest#')")
+    parser.add_argument('--roles', default=DEFAULT_ROLE_WEIGHTS, help=f"role_code=weight list (default: '{DEFAULT_ROLE_WEIGHTS}')")
+    parser.add_argument('--suspended-ratio', type=float, default=0.05, help='fraction of suspended users (default: 0.05)')
+    parser.add_argument('--domain', default='example.com', help='email domain (default: example.com)')
+    parser.add_argument('--batch-size', type=int, default=50_000, help='rows per COPY transaction (default: 50,000)')
+    parser.add_argument('--start', type=int, help='first numeric suffix (default: max(users.id) + 1, or 1 for CSV)')
+    parser.add_argument('--seed', type=int, help='random seed for reproducible data')
+    parser.add_argument('--csv', dest='csv_path', help='write a CSV instead of loading into DATABASE_URL')
+    args = parser.parse_args()
+
+    if not 4 <= args.cost <= 31:
+        print('--cost must be between 4 and 31')
+        return 2
+    if args.count < 1 or args.distinct_passwords < 1:
+        print('--count and --distinct-passwords must be positive')
+        return 2
+
+    conn = None
+    role_ids = DEFAULT_ROLE_IDS
+    start = args.start or 1
+    if not args.csv_path:
+        dsn = os.getenv('DATABASE_URL')
+        if not dsn:
+            print('Set DATABASE_URL to load into Postgres, or pass --csv PATH')
+            return 2
+        try:
+            import psycopg
+        except ImportError:
+            print("Loading into Postgres requires the 'psycopg' package (pip install psycopg), or pass --csv PATH")
+            return 2
+        conn = psycopg.connect(dsn)
+        with conn.cursor() as cursor:
+            cursor.execute('SELECT role_code, id FROM roles')
+            role_ids = dict(cursor.fetchall())
+            if args.start is None:
+                cursor.execute('SELECT COALESCE(MAX(id), 0) + 1 FROM users')
+                start = cursor.fetchone()[0]
+        conn.commit()
+
+    try:
+        try:
+            ids, weights = parse_role_weights(args.roles, role_ids)
+        except ValueError as e:
+            print(f'Invalid --roles: {e}')
+            return 2
+
+        distinct = min(args.distinct_passwords, args.count)
+        print(f'Hashing {distinct:,} passwords at cost {args.cost} with {args.workers} worker(s)...')
+        started = time.perf_counter()
+        plaintexts = [f'{args.password_prefix}{k}' for k in range(distinct)]
+        hashes = hash_passwords(plaintexts, args.cost, args.workers)
+        elapsed = time.perf_counter() - started
+        print(f'  {elapsed:.1f}s ({elapsed / distinct * 1000:.1f} ms per hash)')
+
+        print(f'Generating {args.count:,} users starting at suffix {start:,}...')
+        started = time.perf_counter()
+        rows = generate_rows(args.count, start, hashes, ids, weights, args.suspended_ratio, args.domain, args.seed)
+        if conn is not None:
+            copy_to_postgres(conn, rows, args.count, args.batch_size)
+            with conn.cursor() as cursor:
+                cursor.execute('ANALYZE users')
+            conn.commit()
+        else:
+            write_csv(args.csv_path, rows, args.count)
+        print(f'Done in {time.perf_counter() - started:.1f}s. '
+              f"User '<name>N' logs in with password '{args.password_prefix}<N % {distinct}>'.")
+    finally:
+        if conn is not None:
+            conn.close()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -5,7 +5,12 @@ Run this ONCE after deploying the password hashing feature.
 """
 
 import asyncio
-from controllers.auth_controller import auth_controller
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from controller.auth_controller import auth_controller
 
 
 async def migrate_passwords():
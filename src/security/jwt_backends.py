@@ -0,0 +1,179 @@
+"""
+JWT Signer/Verifier Backends
+Interchangeable implementations behind jwt_utils. All backends produce
+standard compact JWS tokens, so a token signed by one verifies with any other.
+
+Select with JWT_BACKEND=jose|pyjwt|hmac (default: jose). 'pyjwt' needs the
+optional PyJWT package; 'hmac' is a dependency-free HS256/384/512
+implementation built for throughput (benchmarks/jwt_throughput.py).
+"""
+import base64
+import hashlib
+import hmac
+import json
+import os
+import time
+from abc import ABC, abstractmethod
+from typing import Any, Dict, List, Optional, Tuple
+
+try:
+    import jwt as pyjwt
+except ImportError:  # optional dependency
+    pyjwt = None
+
+
+class TokenError(Exception):
+    """Raised by a backend when a token is malformed, forged or expired"""
+
+
+class JWTBackend(ABC):
+    """Signer/verifier interface used by jwt_utils"""
+
+    name = 'base'
+
+    @abstractmethod
+    def encode(self, claims: Dict[str, Any], secret: str, algorithm: str) -> str:
+        """Sign claims and return a compact JWS token"""
+
+    @abstractmethod
+    def decode(self, token: str, secret: str, algorithms: List[str]) -> Dict[str, Any]:
+        """Verify a token and return its claims; raise TokenError if invalid"""
+
+
+class JoseBackend(JWTBackend):
+    """python-jose (the original implementation)"""
+
+    name = 'jose'
+
+    def __init__(self):
+        from jose import jwt, JWTError
+        self._jwt = jwt
+        self._error = JWTError
+
+    def encode(self, claims: Dict[str, Any], secret: str, algorithm: str) -> str:
+        return self._jwt.encode(claims, secret, algorithm=algorithm)
+
+    def decode(self, token: str, secret: str, algorithms: List[str]) -> Dict[str, Any]:
+        try:
+            return self._jwt.decode(token, secret, algorithms=algorithms)
+        except self._error as e:
+            raise TokenError(str(e)) from e
+
+
+class PyJWTBackend(JWTBackend):
+    """PyJWT (optional dependency)"""
+
+    name = 'pyjwt'
+
+    def __init__(self):
+        if pyjwt is None:
+            raise ImportError("JWT_BACKEND=pyjwt requires the 'PyJWT' package (pip install PyJWT)")
+
+    def encode(self, claims: Dict[str, Any], secret: str, algorithm: str) -> str:
+        return pyjwt.encode(claims, secret, algorithm=algorithm)
+
+    def decode(self, token: str, secret: str, algorithms: List[str]) -> Dict[str, Any]:
+        try:
+            return pyjwt.decode(token, secret, algorithms=algorithms, options={'verify_aud': False})
+        except pyjwt.PyJWTError as e:
+            raise TokenError(str(e)) from e
+
+
+def _b64encode(data: bytes) -> bytes:
+    return base64.urlsafe_b64encode(data).rstrip(b'=')
+
+
+def _b64decode(segment: str) -> bytes:
+    return base64.urlsafe_b64decode(segment + '=' * (-len(segment) % 4))
+
+
+class HMACBackend(JWTBackend):
+    """
+    Lean HS256/HS384/HS512 implementation on the standard library.
+
+    Caches the encoded header per algorithm and a keyed HMAC per secret, and
+    validates only what jwt_utils issues: signature, alg, exp and nbf.
+    """
+
+    name = 'hmac'
+    DIGESTS = {'HS256': hashlib.sha256, 'HS384': hashlib.sha384, 'HS512': hashlib.sha512}
+
+    def __init__(self):
+        self._headers: Dict[str, bytes] = {}
+        self._macs: Dict[Tuple[str, str], Any] = {}
+
+    def _header(self, algorithm: str) -> bytes:
+        header = self._headers.get(algorithm)
+        if header is None:
+            header = _b64encode(json.dumps({'alg': algorithm, 'typ': 'JWT'}, separators=(',', ':')).encode())
+            self._headers[algorithm] = header
+        return header
+
+    def _mac(self, secret: str, algorithm: str):
+        key = (secret, algorithm)
+        mac = self._macs.get(key)
+        if mac is None:
+            if algorithm not in self.DIGESTS:
+                raise TokenError(f'Unsupported algorithm: {algorithm}')
+            mac = hmac.new(secret.encode('utf-8'), digestmod=self.DIGESTS[algorithm])
+            self._macs[key] = mac
+        return mac.copy()
+
+    def encode(self, claims: Dict[str, Any], secret: str, algorithm: str) -> str:
+        payload = _b64encode(json.dumps(claims, separators=(',', ':')).encode())
+        signing_input = self._header(algorithm) + b'.' + payload
+        mac = self._mac(secret, algorithm)
+        mac.update(signing_input)
+        return (signing_input + b'.' + _b64encode(mac.digest())).decode('ascii')
+
+    def decode(self, token: str, secret: str, algorithms: List[str]) -> Dict[str, Any]:
+        try:
+            header_segment, payload_segment, signature_segment = token.split('.')
+            header = json.loads(_b64decode(header_segment))
+            algorithm = header.get('alg')
+            if algorithm not in algorithms:
+                raise TokenError('The specified alg value is not allowed')
+            mac = self._mac(secret, algorithm)
+            mac.update(f'{header_segment}.{payload_segment}'.encode('ascii'))
+            if not hmac.compare_digest(mac.digest(), _b64decode(signature_segment)):
+                raise TokenError('Signature verification failed')
+            claims = json.loads(_b64decode(payload_segment))
+            if not isinstance(claims, dict):
+                raise TokenError('Invalid payload')
+            now = time.time()
+            if 'exp' in claims and not now <= float(claims['exp']):
+                raise TokenError('Signature has expired')
+            if 'nbf' in claims and float(claims['nbf']) > now:
+                raise TokenError('The token is not yet valid (nbf)')
+        except TokenError:
+            raise
+        except (ValueError, TypeError, AttributeError, UnicodeError) as e:
+            raise TokenError('Malformed token') from e
+        return claims
+
+
+BACKENDS = {
+    JoseBackend.name: JoseBackend,
+    PyJWTBackend.name: PyJWTBackend,
+    HMACBackend.name: HMACBackend,
+}
+
+
+def get_backend(name: Optional[str] = None) -> JWTBackend:
+    """
+    Create a backend by name.
+
+    Args:
+        name: 'jose', 'pyjwt' or 'hmac' (defaults to the JWT_BACKEND env var, then 'jose')
+
+    Returns:
+        JWTBackend instance
+
+    Raises:
+        ValueError: If the name is unknown
+        ImportError: If the backend's optional package is missing
+    """
+    name = (name or os.getenv('JWT_BACKEND', 'jose')).lower()
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown JWT_BACKEND '{name}' (expected one of: {', '.join(BACKENDS)})")
+    return BACKENDS[name]()
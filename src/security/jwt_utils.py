@@ -4,7 +4,7 @@ JWT Utilities for Access and Refresh Tokens
 import os
 from datetime import datetime, timedelta, timezone
 from typing import Optional, Dict, Any
-from jose import jwt, JWTError
+from security.jwt_backends import JWTBackend, TokenError, get_backend
 
 # Settings (fallbacks provided, prefer .env variables)
 JWT_SECRET = os.getenv("JWT_SECRET", "change-this-secret")
@@ -12,33 +12,44 @@ JWT_ALGORITHM = os.getenv("JWT_ALGORITHM", "HS256")
 ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", "60"))
 REFRESH_TOKEN_EXPIRE_DAYS = int(os.getenv("REFRESH_TOKEN_EXPIRE_DAYS", "7"))
 
+# Signer/verifier selected by JWT_BACKEND (jose, pyjwt or hmac)
+_backend: JWTBackend = get_backend()
+
+
+def set_backend(backend: JWTBackend) -> None:
+    """Swap the signer/verifier (used by benchmarks and tests)"""
+    global _backend
+    _backend = backend
+
 
 def _utcnow() -> datetime:
     return datetime.now(timezone.utc)
 
 
 def create_access_token(subject: str, extra: Optional[Dict[str, Any]] = None, expires_minutes: Optional[int] = None) -> str:
-    to_encode = {"sub": subject, "iat": int(_utcnow().timestamp())}
+    now = _utcnow()
+    to_encode = {"sub": subject, "iat": int(now.timestamp())}
     if extra:
         to_encode.update(extra)
-    expire = _utcnow() + timedelta(minutes=expires_minutes or ACCESS_TOKEN_EXPIRE_MINUTES)
+    expire = now + timedelta(minutes=expires_minutes or ACCESS_TOKEN_EXPIRE_MINUTES)
     to_encode.update({"exp": int(expire.timestamp())})
-    return jwt.encode(to_encode, JWT_SECRET, algorithm=JWT_ALGORITHM)
+    return _backend.encode(to_encode, JWT_SECRET, JWT_ALGORITHM)
 
 
 def create_refresh_token(subject: str, extra: Optional[Dict[str, Any]] = None, expires_days: Optional[int] = None) -> str:
-    to_encode = {"sub": subject, "type": "refresh", "iat": int(_utcnow().timestamp())}
+    now = _utcnow()
+    to_encode = {"sub": subject, "type": "refresh", "iat": int(now.timestamp())}
     if extra:
         to_encode.update(extra)
-    expire = _utcnow() + timedelta(days=expires_days or REFRESH_TOKEN_EXPIRE_DAYS)
+    expire = now + timedelta(days=expires_days or REFRESH_TOKEN_EXPIRE_DAYS)
     to_encode.update({"exp": int(expire.timestamp())})
-    return jwt.encode(to_encode, JWT_SECRET, algorithm=JWT_ALGORITHM)
+    return _backend.encode(to_encode, JWT_SECRET, JWT_ALGORITHM)
 
 
 def decode_token(token: str) -> Optional[Dict[str, Any]]:
     try:
-        return jwt.decode(token, JWT_SECRET, algorithms=[JWT_ALGORITHM])
-    except JWTError:
+        return _backend.decode(token, JWT_SECRET, [JWT_ALGORITHM])
+    except TokenError:
         return None
 
 
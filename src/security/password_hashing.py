@@ -0,0 +1,121 @@
+"""
+Password Hashing Utilities
+Central bcrypt policy: configurable cost factor, legacy plaintext support,
+rehash detection and cost calibration for the deployment hardware.
+"""
+import hmac
+import os
+import re
+import statistics
+import time
+from typing import Dict, List, Optional, Tuple
+
+import bcrypt
+
+from tracing import span
+
+# Cost factor (log2 rounds) for new hashes; pick it with scripts/calibrate_bcrypt.py
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+
+# Never calibrate below this, whatever the hardware
+MIN_BCRYPT_ROUNDS = 10
+MAX_BCRYPT_ROUNDS = 16
+
+BCRYPT_PREFIXES = ('$2b$', '$2a$', '$2y$')
+_COST = re.compile(r'^\$2[aby]\$(\d{2})\$')
+
+
+def is_bcrypt_hash(stored: Optional[str]) -> bool:
+    """Return True if a stored password is a bcrypt hash (not legacy plaintext)"""
+    return bool(stored) and stored.startswith(BCRYPT_PREFIXES)
+
+
+def hash_cost(stored: Optional[str]) -> Optional[int]:
+    """Return the cost factor encoded in a bcrypt hash, or None for plaintext"""
+    match = _COST.match(stored or '')
+    return int(match.group(1)) if match else None
+
+
+def hash_password(password: str, rounds: Optional[int] = None) -> str:
+    """
+    Hash a password with bcrypt at the configured cost.
+
+    Args:
+        password: Plain text password
+        rounds: Cost factor override (defaults to BCRYPT_ROUNDS)
+
+    Returns:
+        Hashed password string
+    """
+    rounds = rounds or BCRYPT_ROUNDS
+    with span('bcrypt.hash', {'bcrypt.cost': rounds}):
+        return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt(rounds=rounds)).decode('utf-8')
+
+
+def verify_password(plain_password: str, stored: Optional[str]) -> bool:
+    """
+    Verify a password against a stored bcrypt hash or legacy plaintext value.
+
+    Plaintext values only come from the seed data in database_setup.sql and are
+    replaced by a hash on the first successful login (see needs_rehash).
+
+    Args:
+        plain_password: Password supplied by the user
+        stored: Value of users.password
+
+    Returns:
+        True if the password matches
+    """
+    if not stored:
+        return False
+    if not is_bcrypt_hash(stored):
+        return hmac.compare_digest(plain_password.encode('utf-8'), stored.encode('utf-8'))
+    try:
+        with span('bcrypt.verify', {'bcrypt.cost': hash_cost(stored) or 0}):
+            return bcrypt.checkpw(plain_password.encode('utf-8'), stored.encode('utf-8'))
+    except Exception as e:
+        print(f"Password verification error: {e}")
+        return False
+
+
+def needs_rehash(stored: Optional[str], rounds: Optional[int] = None) -> bool:
+    """Return True if a stored password is plaintext or hashed at a different cost"""
+    return hash_cost(stored) != (rounds or BCRYPT_ROUNDS)
+
+
+def measure_cost(rounds: int, samples: int = 3) -> float:
+    """Return the median time in milliseconds to hash one password at a cost factor"""
+    timings = []
+    for _ in range(samples):
+        started = time.perf_counter()
+        bcrypt.hashpw(b'calibration-password', bcrypt.gensalt(rounds=rounds))
+        timings.append((time.perf_counter() - started) * 1000)
+    return statistics.median(timings)
+
+
+def calibrate(target_ms: float, min_rounds: int = MIN_BCRYPT_ROUNDS, max_rounds: int = MAX_BCRYPT_ROUNDS,
+              samples: int = 3) -> Tuple[int, List[Dict[str, float]]]:
+    """
+    Pick the highest cost factor whose hash latency stays within a target.
+
+    Each extra round doubles the work, so measuring stops at the first cost
+    over the target.
+
+    Args:
+        target_ms: Latency budget for one hash on this machine
+        min_rounds: Security floor; returned even if it exceeds the target
+        max_rounds: Highest cost to consider
+        samples: Hashes per cost factor (median is used)
+
+    Returns:
+        Tuple of (chosen cost factor, list of {'rounds', 'ms'} measurements)
+    """
+    chosen = min_rounds
+    measurements = []
+    for rounds in range(min_rounds, max_rounds + 1):
+        ms = measure_cost(rounds, samples)
+        measurements.append({'rounds': rounds, 'ms': round(ms, 1)})
+        if ms > target_ms:
+            break
+        chosen = rounds
+    return chosen, measurements
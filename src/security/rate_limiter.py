@@ -0,0 +1,304 @@
+"""
+Login Rate Limiting
+Sliding-window counters keyed by username and client IP, checked before any
+database or bcrypt work so bursts of login attempts cannot saturate the CPU.
+"""
+import math
+import os
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+
+def parse_rate(spec: str) -> Tuple[int, int]:
+    """Parse 'limit/seconds' (e.g. '10/300') into (limit, window_seconds)"""
+    limit, _, window = spec.partition('/')
+    return int(limit), int(window or 60)
+
+
+def sliding_window(prev_count: int, curr_count: int, elapsed: float, window: int, limit: int) -> Tuple[bool, int]:
+    """
+    Sliding-window decision from two fixed-window counters.
+
+    The previous window's count is weighted by how much of it still overlaps
+    the sliding window, which approximates a true sliding log in O(1) space.
+
+    Args:
+        prev_count: Attempts in the previous fixed window
+        curr_count: Attempts so far in the current fixed window
+        elapsed: Seconds since the current fixed window started
+        window: Window length in seconds
+        limit: Attempts allowed per window
+
+    Returns:
+        Tuple of (allowed, retry_after_seconds)
+    """
+    weight = 1 - elapsed / window
+    if prev_count * weight + curr_count < limit:
+        return True, 0
+    if curr_count < limit:
+        # Wait until enough of the previous window has slid out
+        wait = window * (1 - (limit - curr_count) / prev_count) - elapsed
+    else:
+        # Wait for the next window, then for enough of this one to slide out
+        wait = (window - elapsed) + window * (1 - (limit - 1) / curr_count)
+    return False, max(1, math.ceil(wait))
+
+
+# One limit to check: (key, limit, window_seconds)
+RateCheck = Tuple[str, int, int]
+
+
+class RateLimitBackend(ABC):
+    """Storage for sliding-window counters"""
+
+    @abstractmethod
+    async def hit(self, checks: List[RateCheck]) -> List[Tuple[bool, int]]:
+        """
+        Count an attempt against every key, but only if all of them are under
+        their limits, so a request rejected by one limit does not use up another.
+
+        Args:
+            checks: (key, limit, window_seconds) for each limit the attempt counts against
+
+        Returns:
+            (allowed, retry_after_seconds) per check; rejected attempts are not counted
+        """
+
+    @abstractmethod
+    async def reset(self, key: str, window: int) -> None:
+        """Forget all attempts for key"""
+
+    def size(self) -> int:
+        """Number of keys currently tracked (-1 if unknown)"""
+        return -1
+
+
+class InMemoryRateLimitBackend(RateLimitBackend):
+    """
+    Per-process counters. State per key is [window_index, prev_count, curr_count,
+    window, limit], kept in least-recently-used order.
+
+    Once the table reaches max_keys, the least recently used keys are evicted
+    in batches. Keys that are currently over their limit are kept, so flooding
+    the table with new keys cannot reset a locked account's counter; the table
+    only grows past max_keys (up to twice) while it is full of locked keys.
+    """
+
+    def __init__(self, max_keys: int = 100_000):
+        self.max_keys = max_keys
+        self.evict_batch = max(1, max_keys // 100)
+        self._counters: OrderedDict[str, List[int]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    async def hit(self, checks: List[RateCheck]) -> List[Tuple[bool, int]]:
+        now = time.time()
+        with self._lock:
+            results = []
+            counters = []
+            for key, limit, window in checks:
+                index = int(now // window)
+                counter = self._counters.get(key)
+                if counter is None:
+                    if len(self._counters) >= self.max_keys:
+                        self._evict(now)
+                    counter = self._counters[key] = [index, 0, 0, window, limit]
+                else:
+                    self._counters.move_to_end(key)
+                    self._roll(counter, index)
+                counter[4] = limit
+                results.append(sliding_window(counter[1], counter[2], now - index * window, window, limit))
+                counters.append(counter)
+            if all(allowed for allowed, _ in results):
+                for counter in counters:
+                    counter[2] += 1
+            return results
+
+    async def reset(self, key: str, window: int) -> None:
+        with self._lock:
+            self._counters.pop(key, None)
+
+    def size(self) -> int:
+        return len(self._counters)
+
+    @staticmethod
+    def _roll(counter: List[int], index: int) -> None:
+        if counter[0] != index:
+            counter[1] = counter[2] if counter[0] == index - 1 else 0
+            counter[0], counter[2] = index, 0
+
+    def _locked(self, counter: List[int], now: float) -> bool:
+        index, window = int(now // counter[3]), counter[3]
+        self._roll(counter, index)
+        return not sliding_window(counter[1], counter[2], now - index * window, window, counter[4])[0]
+
+    def _evict(self, now: float) -> None:
+        """Free a batch of least recently used keys, skipping (and refreshing) locked ones"""
+        freed = 0
+        for _ in range(min(len(self._counters), self.evict_batch * 4)):
+            key, counter = next(iter(self._counters.items()))
+            if self._locked(counter, now):
+                self._counters.move_to_end(key)
+                continue
+            del self._counters[key]
+            freed += 1
+            if freed >= self.evict_batch:
+                return
+        # Full of locked keys: let the table grow, but not without bound
+        while len(self._counters) >= self.max_keys * 2:
+            self._counters.popitem(last=False)
+
+
+class RedisRateLimitBackend(RateLimitBackend):
+    """
+    Counters shared by every worker through Redis. Each fixed window is one
+    key that expires after two windows, updated atomically by a Lua script
+    that checks every limit before incrementing any of them.
+
+    Requires the optional ``redis`` package.
+    """
+
+    # KEYS: current and previous window key per check; ARGV: limit, window, elapsed per check
+    SCRIPT = """
+    local allowed = 1
+    local counts = {}
+    for i = 1, #KEYS / 2 do
+        local curr = tonumber(redis.call('GET', KEYS[2 * i - 1]) or '0')
+        local prev = tonumber(redis.call('GET', KEYS[2 * i]) or '0')
+        local limit = tonumber(ARGV[3 * i - 2])
+        local window = tonumber(ARGV[3 * i - 1])
+        local elapsed = tonumber(ARGV[3 * i])
+        if prev * (1 - elapsed / window) + curr >= limit then
+            allowed = 0
+        end
+        counts[2 * i - 1] = curr
+        counts[2 * i] = prev
+    end
+    if allowed == 1 then
+        for i = 1, #KEYS / 2 do
+            redis.call('INCR', KEYS[2 * i - 1])
+            redis.call('EXPIRE', KEYS[2 * i - 1], tonumber(ARGV[3 * i - 1]) * 2)
+        end
+    end
+    table.insert(counts, 1, allowed)
+    return counts
+    """
+
+    def __init__(self, url: str, prefix: str = 'csr:ratelimit:'):
+        try:
+            import redis.asyncio as redis
+        except ImportError:
+            raise ImportError("RedisRateLimitBackend requires the 'redis' package (pip install redis)")
+        self.prefix = prefix
+        self._redis = redis.from_url(url)
+        self._script = self._redis.register_script(self.SCRIPT)
+
+    def _window_keys(self, key: str, index: int) -> List[str]:
+        return [f'{self.prefix}{key}:{index}', f'{self.prefix}{key}:{index - 1}']
+
+    async def hit(self, checks: List[RateCheck]) -> List[Tuple[bool, int]]:
+        now = time.time()
+        keys, args, elapsed = [], [], []
+        for key, limit, window in checks:
+            index = int(now // window)
+            elapsed.append(now - index * window)
+            keys.extend(self._window_keys(key, index))
+            args.extend([limit, window, elapsed[-1]])
+        allowed, *counts = await self._script(keys=keys, args=args)
+        if allowed:
+            return [(True, 0)] * len(checks)
+        return [sliding_window(int(counts[2 * i + 1]), int(counts[2 * i]), elapsed[i], window, limit)
+                for i, (_, limit, window) in enumerate(checks)]
+
+    async def reset(self, key: str, window: int) -> None:
+        # Only the current and previous windows are ever read; older keys expire on their own
+        await self._redis.delete(*self._window_keys(key, int(time.time() // window)))
+
+
+class LoginRateLimiter:
+    """
+    Limits login attempts per username and per client IP.
+
+    The username limit stops guessing against one account; the IP limit stops
+    one client spraying many accounts. Both are checked before any DB work.
+    """
+
+    def __init__(self, backend: RateLimitBackend, username_rate: Tuple[int, int] = (10, 300),
+                 ip_rate: Tuple[int, int] = (30, 60)):
+        self.backend = backend
+        self.username_rate = username_rate
+        self.ip_rate = ip_rate
+        self._allowed = 0
+        self._rejected = {'username': 0, 'ip': 0}
+
+    @staticmethod
+    def _username_key(username: str) -> str:
+        return f'u:{username.strip().lower()}'
+
+    async def check(self, username: str, client_ip: Optional[str]) -> Optional[int]:
+        """
+        Count a login attempt.
+
+        Args:
+            username: Username from the login request
+            client_ip: Client address (None if unknown)
+
+        Returns:
+            None if the attempt may proceed, otherwise seconds until it may be retried
+        """
+        checks = [('username', self._username_key(username), self.username_rate)]
+        if client_ip:
+            checks.append(('ip', f'ip:{client_ip}', self.ip_rate))
+
+        results = await self.backend.hit([(key, limit, window) for _, key, (limit, window) in checks])
+        retry_after = None
+        for (kind, _, _), (allowed, wait) in zip(checks, results):
+            if not allowed:
+                self._rejected[kind] += 1
+                retry_after = max(retry_after or 0, wait)
+        if retry_after is None:
+            self._allowed += 1
+        return retry_after
+
+    async def record_success(self, username: str) -> None:
+        """Clear the username's failures so a typo earlier does not count against the real owner"""
+        await self.backend.reset(self._username_key(username), self.username_rate[1])
+
+    def get_stats(self) -> Dict[str, object]:
+        """Allowed/rejected counts and configured limits"""
+        return {
+            'allowed': self._allowed,
+            'rejected': dict(self._rejected),
+            'tracked_keys': self.backend.size(),
+            'limits': {
+                'username': f'{self.username_rate[0]}/{self.username_rate[1]}s',
+                'ip': f'{self.ip_rate[0]}/{self.ip_rate[1]}s'
+            }
+        }
+
+
+def create_login_rate_limiter() -> LoginRateLimiter:
+    """
+    Build the login limiter from the environment.
+
+    RATE_LIMIT_BACKEND is 'memory' (default, per worker) or 'redis' (shared,
+    uses REDIS_URL). LOGIN_RATE_LIMIT_USERNAME and LOGIN_RATE_LIMIT_IP take
+    'limit/seconds' (defaults 10/300 and 30/60).
+
+    Returns:
+        Configured LoginRateLimiter
+    """
+    kind = os.getenv('RATE_LIMIT_BACKEND', 'memory').lower()
+    if kind == 'redis':
+        backend = RedisRateLimitBackend(os.getenv('REDIS_URL', 'redis://localhost:6379/0'))
+    elif kind == 'memory':
+        backend = InMemoryRateLimitBackend()
+    else:
+        raise ValueError(f"Unknown RATE_LIMIT_BACKEND '{kind}' (expected memory or redis)")
+    return LoginRateLimiter(
+        backend,
+        username_rate=parse_rate(os.getenv('LOGIN_RATE_LIMIT_USERNAME', '10/300')),
+        ip_rate=parse_rate(os.getenv('LOGIN_RATE_LIMIT_IP', '30/60'))
+    )
@@ -0,0 +1,54 @@
+"""
+Token Revocation
+Stops accepting tokens of users who were suspended or deleted after the
+token was issued. JWTs are stateless, so without this a suspended user keeps
+working until their access token expires and can refresh indefinitely.
+"""
+
+import threading
+import time
+from typing import Any, Dict, Optional
+
+# Change-tracker actions that end a user's sessions
+REVOKING_ACTIONS = ('suspended', 'deleted')
+
+
+class TokenRevocations:
+    """
+    Per-subject "not before" times, fed by the change tracker.
+
+    A token whose iat is at or before its subject's revocation time is
+    rejected; a re-activated user simply logs in again and gets a newer
+    token. Entries are kept for max_token_age seconds (the longest token
+    lifetime), after which every token they could reject has expired anyway.
+
+    Revocations arrive from other workers over the invalidation bus like
+    any other change. They live in memory, so /api/refresh also re-checks
+    that the user is still active.
+    """
+
+    def __init__(self, max_token_age: float):
+        self.max_token_age = max_token_age
+        self._revoked_at: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def revoke(self, subject: str, at: Optional[float] = None) -> None:
+        at = time.time() if at is None else at
+        with self._lock:
+            if len(self._revoked_at) > 10_000:
+                horizon = time.time() - self.max_token_age
+                self._revoked_at = {s: t for s, t in self._revoked_at.items() if t > horizon}
+            self._revoked_at[subject] = max(at, self._revoked_at.get(subject, 0.0))
+
+    def is_revoked(self, payload: Dict[str, Any]) -> bool:
+        """True if the token was issued before its subject was suspended or deleted"""
+        subject = payload.get('sub')
+        with self._lock:
+            revoked_at = self._revoked_at.get(str(subject)) if subject is not None else None
+        return revoked_at is not None and payload.get('iat', 0) <= revoked_at
+
+    def on_change(self, change: Dict[str, Any]) -> None:
+        """Change tracker listener: revoke on user suspension or deletion"""
+        if change.get('table') == 'users' and change.get('action') in REVOKING_ACTIONS and change.get('id') is not None:
+            self.revoke(str(change['id']))
+
@@ -0,0 +1,89 @@
+"""
+Tests for route-class admission control
+"""
+import asyncio
+import sys
+from pathlib import Path
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+SRC_ROOT = Path(__file__).resolve().parents[1]
+if str(SRC_ROOT) not in sys.path:
+    sys.path.insert(0, str(SRC_ROOT))
+
+from middleware.admission import AdmissionMiddleware, AdmissionScheduler, Overloaded, classify
+
+
+def _scheduler(capacity=1, max_wait=1.0, max_queue=10):
+    classes = {name: (capacity, max_wait, max_queue) for name in ('auth', 'read', 'admin_write', 'export')}
+    return AdmissionScheduler(capacity, classes)
+
+
+def test_classify_routes():
+    assert classify('POST', '/api/login') == 'auth'
+    assert classify('GET', '/api/users') == 'read'
+    assert classify('POST', '/api/users/search') == 'read'
+    assert classify('DELETE', '/api/roles/3') == 'admin_write'
+    assert classify('GET', '/api/jobs/42/result') == 'export'
+    assert classify('GET', '/api/jobs/42') == 'read'
+    assert classify('POST', '/api/jobs') == 'admin_write'
+    assert classify('GET', '/api/events') is None
+    assert classify('OPTIONS', '/api/users') is None
+
+
+def test_freed_slot_goes_to_highest_priority_waiter():
+    async def scenario():
+        scheduler = _scheduler()
+        await scheduler.acquire('read')
+        order = []
+
+        async def request(name):
+            await scheduler.acquire(name)
+            order.append(name)
+            scheduler.release(name)
+
+        waiters = [asyncio.create_task(request(name)) for name in ('export', 'admin_write', 'auth')]
+        await asyncio.sleep(0.01)
+        scheduler.release('read')
+        await asyncio.gather(*waiters)
+        return order, scheduler.get_stats()
+
+    order, stats = asyncio.run(scenario())
+    assert order == ['auth', 'admin_write', 'export']
+    assert stats['in_flight'] == 0
+    assert stats['classes']['export']['queue_wait_ms']['max'] > 0
+
+
+def test_slow_queue_is_shed_with_503():
+    async def scenario():
+        scheduler = _scheduler(max_wait=0.2)
+        await scheduler.acquire('read')
+        queued = asyncio.create_task(scheduler.acquire('read'))
+        await asyncio.sleep(0.12)
+        # The queued request has used over half the budget: newcomers are rejected at once
+        with pytest.raises(Overloaded) as early:
+            await scheduler.acquire('read')
+        with pytest.raises(Overloaded):
+            await queued
+        return early.value, scheduler.get_stats()['classes']['read']
+
+    early, stats = asyncio.run(scenario())
+    assert early.reason == 'queue too slow'
+    assert stats['shed'] == 2 and stats['queued'] == 0
+
+
+def test_middleware_returns_503_with_retry_after():
+    app = FastAPI()
+
+    @app.get('/api/users')
+    def users():
+        return []
+
+    scheduler = _scheduler(capacity=0, max_queue=0)
+    client = TestClient(AdmissionMiddleware(app, scheduler))
+    response = client.get('/api/users')
+    assert response.status_code == 503
+    assert response.headers['retry-after'] == '1'
+    assert client.get('/api/health').status_code == 404  # exempt: reaches the app
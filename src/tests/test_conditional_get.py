@@ -0,0 +1,144 @@
+"""
+Tests for ETag / conditional GET on the user and role listings
+"""
+import asyncio
+import importlib
+import sys
+from pathlib import Path
+
+import httpx
+from fastapi.testclient import TestClient
+
+SRC_ROOT = Path(__file__).resolve().parents[1]
+if str(SRC_ROOT) not in sys.path:
+    sys.path.insert(0, str(SRC_ROOT))
+
+main = importlib.import_module('main')
+from data.change_tracker import ChangeTracker, change_tracker
+from entity.user import User
+
+client = TestClient(main.app)
+
+
+def _as_admin():
+    main.app.dependency_overrides[main.get_current_user_claims] = lambda: {'sub': '1', 'role': 'USER_ADMIN'}
+
+
+def test_etag_changes_only_for_recorded_tables():
+    tracker = ChangeTracker()
+    users_tag = tracker.etag('users', 'roles')
+    roles_tag = tracker.etag('roles')
+
+    tracker.record('users', 'updated', 5)
+    assert tracker.etag('roles') == roles_tag
+    assert tracker.etag('users', 'roles') != users_tag
+    assert tracker.version('users') == 1
+
+
+def test_logins_do_not_change_listing_etags():
+    tracker = ChangeTracker()
+    changes = []
+    tracker.add_listener(changes.append)
+    users_tag = tracker.etag('users', 'roles')
+
+    tracker.record('users', 'login', 5)
+    tracker.record('users', 'rehashed', 5)
+    assert tracker.etag('users', 'roles') == users_tag
+    assert [change['action'] for change in changes] == ['login', 'rehashed']
+
+
+def test_unchanged_listing_returns_304_without_query(monkeypatch):
+    _as_admin()
+    calls = []
+
+    async def mock_get_all_users():
+        calls.append(1)
+        return [User(id=1, username='admin', full_name='System Administrator')]
+
+    monkeypatch.setattr(main.view_user_controller, 'get_all_users', mock_get_all_users)
+    try:
+        first = client.get('/api/users')
+        assert first.status_code == 200
+        etag = first.headers['etag']
+
+        second = client.get('/api/users', headers={'If-None-Match': etag})
+        assert second.status_code == 304
+        assert second.headers['etag'] == etag
+        assert len(calls) == 1
+
+        change_tracker.record('users', 'updated', 1)
+        third = client.get('/api/users', headers={'If-None-Match': etag})
+        assert third.status_code == 200
+        assert third.headers['etag'] != etag
+        assert len(calls) == 2
+    finally:
+        main.app.dependency_overrides.clear()
+
+
+def test_if_match_sends_row_version_and_maps_conflict_to_412(monkeypatch):
+    _as_admin()
+    seen = []
+
+    async def mock_get_user(user_id):
+        return User(id=user_id, username='csr_rep', full_name='Jane Support', version=4)
+
+    async def mock_update_user(**kwargs):
+        seen.append(kwargs['expected_version'])
+        if kwargs['expected_version'] not in (4, None):
+            return {'success': False, 'conflict': True, 'message': 'User was modified by another admin. Reload and try again.'}
+        return {'success': True, 'message': 'User updated successfully', 'user': {'id': 3, 'version': 5}}
+
+    monkeypatch.setattr(main.view_user_controller, 'get_user', mock_get_user)
+    monkeypatch.setattr(main.update_user_controller, 'update_user', mock_update_user)
+    try:
+        etag = client.get('/api/users/3').headers['etag']
+        assert etag.endswith('.v4"')
+
+        ok = client.put('/api/users/3', json={'full_name': 'Jane S'}, headers={'If-Match': etag})
+        assert ok.status_code == 200
+        assert ok.headers['etag'].endswith('.v5"')
+
+        stale = client.put('/api/users/3', json={'full_name': 'Jane T'}, headers={'If-Match': etag.replace('.v4', '.v3')})
+        assert stale.status_code == 412
+
+        unconditional = client.put('/api/users/3', json={'full_name': 'Jane U'})
+        assert unconditional.status_code == 200
+        assert seen == [4, 3, None]
+    finally:
+        main.app.dependency_overrides.clear()
+
+
+def test_request_after_a_write_does_not_join_an_older_flight(monkeypatch):
+    _as_admin()
+    calls = []
+
+    async def mock_get_all_users():
+        calls.append(1)
+        if len(calls) == 1:
+            await release.wait()
+            return [User(id=1, username='before', full_name='Before Write')]
+        return [User(id=1, username='after', full_name='After Write')]
+
+    async def scenario():
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url='http://test') as http:
+            early = asyncio.create_task(http.get('/api/users'))
+            while not calls:
+                await asyncio.sleep(0.001)
+            change_tracker.record('users', 'updated', 1)
+            try:
+                # Joining the older flight would wait for it; give up quickly instead of hanging
+                late = await asyncio.wait_for(http.get('/api/users'), timeout=2)
+            finally:
+                release.set()
+            return await early, late
+
+    monkeypatch.setattr(main.view_user_controller, 'get_all_users', mock_get_all_users)
+    release = asyncio.Event()
+    try:
+        early, late = asyncio.run(scenario())
+        assert len(calls) == 2
+        assert late.json()['users'][0]['username'] == 'after'
+        assert early.headers['etag'] != late.headers['etag']
+    finally:
+        main.app.dependency_overrides.clear()
@@ -0,0 +1,74 @@
+"""
+Tests for the create-user path that trusts unique constraints
+"""
+import asyncio
+import sys
+from pathlib import Path
+
+from postgrest.exceptions import APIError
+
+SRC_ROOT = Path(__file__).resolve().parents[1]
+if str(SRC_ROOT) not in sys.path:
+    sys.path.insert(0, str(SRC_ROOT))
+
+from controller import user_account_controller
+from controller.create_user_account_controller import CreateUserAccountController
+
+
+class FakeClient:
+    def __init__(self, outcome):
+        self.outcome = outcome
+        self.operations = []
+
+    def table(self, name):
+        return self
+
+    def select(self, *columns):
+        self.operations.append('select')
+        return self
+
+    def insert(self, data):
+        self.operations.append('insert')
+        return self
+
+    def eq(self, column, value):
+        return self
+
+    def execute(self):
+        if isinstance(self.outcome, Exception):
+            raise self.outcome
+        return type('Response', (), {'data': self.outcome})()
+
+
+def _duplicate_email():
+    return APIError({
+        'code': '23505',
+        'message': 'duplicate key value violates unique constraint "users_email_lower_key"',
+        'details': 'Key (lower((email)::text))=(jane@company.com) already exists.'
+    })
+
+
+def _create(controller):
+    return controller.create_user('jane_doe', 'password123', 'Jane Doe', 'Jane@company.com', 3)
+
+
+def test_create_inserts_without_pre_checks(monkeypatch):
+    monkeypatch.setattr(CreateUserAccountController, 'hash_password', lambda self, password: 'hashed')
+    client = FakeClient([{'id': 10, 'username': 'jane_doe'}])
+    result = _create(CreateUserAccountController(client))
+    assert result['success'] is True
+    assert client.operations == ['insert']
+
+
+def test_unique_violation_maps_to_conflict_message(monkeypatch):
+    monkeypatch.setattr(CreateUserAccountController, 'hash_password', lambda self, password: 'hashed')
+    result = _create(CreateUserAccountController(FakeClient(_duplicate_email())))
+    assert result == {'success': False, 'message': 'Email already exists. Please use a different email address.'}
+
+
+def test_async_create_maps_conflict_to_message_main_turns_into_409(monkeypatch):
+    controller = user_account_controller.CreateUserAccountController(FakeClient(_duplicate_email()))
+    monkeypatch.setattr(controller, 'hash_password', lambda password: 'hashed')
+    result = asyncio.run(_create(controller))
+    assert result['success'] is False
+    assert 'exists' in result['message'].lower()
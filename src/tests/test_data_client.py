@@ -0,0 +1,167 @@
+"""
+Tests for deadlines, the circuit breaker, read retries, replica routing and hedging in the data client
+"""
+import asyncio
+import sys
+import time
+from pathlib import Path
+
+import httpx
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+SRC_ROOT = Path(__file__).resolve().parents[1]
+if str(SRC_ROOT) not in sys.path:
+    sys.path.insert(0, str(SRC_ROOT))
+
+from data.circuit_breaker import CircuitBreaker, CircuitOpenError, DataLayerUnavailable, DeadlineExceeded
+from data.data_client import DataClient, bind_actor, primary_reads
+from data.deadlines import deadline_scope
+from data.hedging import HedgePolicy, hedged_reads
+from middleware.deadlines import DeadlineMiddleware
+
+
+class FakeBuilder:
+    def __init__(self, client, table):
+        self.client = client
+        self.table = table
+
+    def __getattr__(self, name):
+        return lambda *args, **kwargs: self
+
+    def execute(self):
+        self.client.sent += 1
+        outcome = self.client.outcomes.pop(0) if self.client.outcomes else [{'id': 1}]
+        if isinstance(outcome, float):
+            time.sleep(outcome)
+            outcome = [{'id': 1}]
+        if isinstance(outcome, Exception):
+            raise outcome
+        return type('Response', (), {'data': outcome})()
+
+
+class FakeRawClient:
+    def __init__(self, *outcomes):
+        self.outcomes = list(outcomes)
+        self.sent = 0
+
+    def table(self, name):
+        return FakeBuilder(self, name)
+
+
+def _client(*outcomes, threshold=5):
+    raw = FakeRawClient(*outcomes)
+    return DataClient(raw, breaker=CircuitBreaker('test', failure_threshold=threshold, reset_timeout=60)), raw
+
+
+def test_reads_retry_transport_errors_but_writes_do_not():
+    client, raw = _client(httpx.ConnectError('down'), httpx.ConnectError('down'))
+    assert client.from_('users').select('*').eq('id', 1).execute().data == [{'id': 1}]
+    assert raw.sent == 3
+
+    client, raw = _client(httpx.ConnectError('down'))
+    with pytest.raises(DataLayerUnavailable):
+        client.table('users').update({'full_name': 'x'}).eq('id', 1).execute()
+    assert raw.sent == 1
+
+
+def test_unknown_query_entry_points_are_rejected():
+    client, _ = _client()
+    with pytest.raises(AttributeError):
+        client.schema('public')
+    with pytest.raises(AttributeError):
+        client.postgrest
+
+
+def test_breaker_opens_and_fails_fast():
+    client, raw = _client(*[httpx.ConnectError('down')] * 3, threshold=3)
+    with pytest.raises(DataLayerUnavailable):
+        client.table('users').select('*').execute()
+    assert client.breaker.state == 'open'
+
+    with pytest.raises(CircuitOpenError):
+        client.table('users').select('*').execute()
+    assert raw.sent == 3
+
+
+def test_expired_deadline_skips_the_query():
+    client, raw = _client()
+    with deadline_scope(0) as deadline:
+        with pytest.raises(DeadlineExceeded):
+            client.table('users').select('*').execute()
+    assert raw.sent == 0
+    assert isinstance(deadline.failure, DeadlineExceeded)
+
+
+def test_swallowed_failure_still_becomes_503():
+    client, _ = _client(*[httpx.ConnectError('down')] * 3)
+    app = FastAPI()
+
+    @app.get('/api/users')
+    def users():
+        # Controllers catch broadly and return an error result
+        try:
+            client.table('users').select('*').execute()
+        except Exception:
+            return {'success': False}
+
+    response = TestClient(DeadlineMiddleware(app)).get('/api/users')
+    assert response.status_code == 503
+    assert 'retry-after' in response.headers
+
+
+def test_reads_use_fresh_replicas_until_the_actor_writes():
+    primary, replica = FakeRawClient(), FakeRawClient()
+    client = DataClient(primary, breaker=CircuitBreaker('p', reset_timeout=60), replicas=[('r', replica)],
+                        sticky_seconds=60)
+    client.replicas[0].breaker = CircuitBreaker('r', reset_timeout=60)
+
+    client.table('users').select('*').execute()
+    assert (primary.sent, replica.sent) == (1, 0)  # lag not measured yet
+
+    client.replicas[0].lag = 0.2
+    client.table('users').select('*').execute()
+    assert (primary.sent, replica.sent) == (1, 1)
+
+    async def as_actor():
+        bind_actor('7')
+        client.table('users').update({'full_name': 'x'}).eq('id', 7).execute()
+        client.table('users').select('*').execute()
+
+    asyncio.run(as_actor())
+    assert (primary.sent, replica.sent) == (3, 1)  # read-your-writes stays on the primary
+
+    replica.outcomes = [httpx.ConnectError('down')] * 3
+    assert client.table('users').select('*').execute().data == [{'id': 1}]
+    assert client.get_stats()['replica_fallbacks'] == 1
+
+    # Reads behind an ETag skip fresh replicas too
+    sent = (primary.sent, replica.sent)
+    with primary_reads():
+        client.table('users').select('*').execute()
+    assert (primary.sent, replica.sent) == (sent[0] + 1, sent[1])
+    assert client.get_stats()['primary_reads'] == 1
+
+
+def test_slow_hedged_read_is_answered_by_the_hedge():
+    policy = HedgePolicy(default_delay=0.02, budget=0.5, burst=1)
+    client, raw = _client()
+    client.hedge_policy = policy
+
+    raw.outcomes = [1.0]  # first connection stalls; the hedge gets a fresh one
+    started = time.monotonic()
+    with hedged_reads():
+        assert client.table('user_details').select('*').eq('id', 1).execute().data == [{'id': 1}]
+    assert time.monotonic() - started < 0.5
+    assert policy.get_stats()['hedge_wins'] == 1
+
+    # Budget spent: the next slow read waits it out instead of hedging
+    raw.outcomes = [0.1]
+    with hedged_reads():
+        client.table('user_details').select('*').eq('id', 1).execute()
+    assert policy.get_stats()['budget_denied'] == 1
+
+    # Outside hedged_reads() and for writes, nothing is hedged
+    client.table('users').update({'full_name': 'x'}).eq('id', 1).execute()
+    assert policy.get_stats()['eligible'] == 2
@@ -0,0 +1,102 @@
+"""
+Unit tests for the change event hub behind the SSE endpoint
+"""
+import asyncio
+import importlib
+import sys
+import threading
+from pathlib import Path
+
+import pytest
+from fastapi import HTTPException
+from fastapi.security import HTTPAuthorizationCredentials
+
+SRC_ROOT = Path(__file__).resolve().parents[1]
+if str(SRC_ROOT) not in sys.path:
+    sys.path.insert(0, str(SRC_ROOT))
+
+from data.event_hub import ChangeEventHub, format_sse
+from security.jwt_utils import create_access_token
+
+
+def test_published_changes_reach_every_subscriber():
+    async def run():
+        hub = ChangeEventHub()
+        first, second = hub.subscribe(), hub.subscribe()
+        hub.publish({'table': 'users', 'action': 'updated', 'id': 7, 'version': 3})
+        return await first.queue.get(), await second.queue.get()
+
+    first, second = asyncio.run(run())
+    assert first == second
+    assert first[1] == 'users'
+    assert first[2]['id'] == 7
+
+
+def test_publish_from_worker_thread():
+    async def run():
+        hub = ChangeEventHub()
+        subscription = hub.subscribe()
+        worker = threading.Thread(target=hub.publish, args=({'table': 'roles', 'action': 'deleted', 'id': 2},))
+        worker.start()
+        worker.join()
+        return await asyncio.wait_for(subscription.queue.get(), 1)
+
+    assert asyncio.run(run())[1] == 'roles'
+
+
+def test_slow_client_buffer_is_bounded_and_asked_to_resync():
+    async def run():
+        hub = ChangeEventHub(buffer_size=3)
+        subscription = hub.subscribe()
+        for i in range(10):
+            hub.publish({'table': 'users', 'action': 'updated', 'id': i})
+        return subscription.queue
+
+    queue = asyncio.run(run())
+    assert queue.qsize() <= 3
+    events = [queue.get_nowait()[1] for _ in range(queue.qsize())]
+    assert 'resync' in events
+
+
+def test_reconnect_replays_missed_events_or_requests_resync():
+    async def run():
+        hub = ChangeEventHub(replay_size=4)
+        for i in range(6):
+            hub.publish({'table': 'users', 'action': 'updated', 'id': i})
+        recent = hub.subscribe(last_event_id=hub.event_id(4))
+        stale = hub.subscribe(last_event_id=hub.event_id(0))
+        return hub, recent.queue.get_nowait(), stale.queue.get_nowait()
+
+    hub, recent, stale = asyncio.run(run())
+    assert recent[0] == hub.event_id(5) and recent[1] == 'users'
+    assert stale[1] == 'resync' and stale[0] == hub.event_id(6)
+
+
+def test_ids_from_another_process_or_ahead_of_this_one_resync():
+    async def run():
+        hub = ChangeEventHub()
+        for i in range(3):
+            hub.publish({'table': 'users', 'action': 'updated', 'id': i})
+        # A restarted or different worker has its own epoch, so '500' or 'other-2' are unknown here
+        return [hub.subscribe(last_event_id=event_id).queue.get_nowait()[1]
+                for event_id in ('500', 'deadbeef-2', hub.event_id(500))]
+
+    assert asyncio.run(run()) == ['resync', 'resync', 'resync']
+
+
+def test_stream_ticket_only_opens_the_event_stream():
+    main = importlib.import_module('main')
+    admin = {'sub': '1', 'role': 'USER_ADMIN'}
+    ticket = asyncio.run(main.create_stream_ticket(admin))['ticket']
+    access = create_access_token('1', extra={'role': 'USER_ADMIN'})
+    request = type('Request', (), {'headers': {}})()
+
+    assert main.get_stream_claims(request, ticket=ticket)['sub'] == '1'
+    with pytest.raises(HTTPException):
+        main.get_stream_claims(request, ticket=access)
+    with pytest.raises(HTTPException):
+        asyncio.run(main.get_current_user_claims(HTTPAuthorizationCredentials(scheme='Bearer', credentials=ticket)))
+
+
+def test_format_sse():
+    assert format_sse('ab12-3', 'users', {'id': 1}) == 'id: ab12-3\nevent: users\ndata: {"id":1}\n\n'
@@ -0,0 +1,99 @@
+"""
+Tests for the inactive-account sweep job and token revocation on suspension
+"""
+import asyncio
+import sys
+import time
+from pathlib import Path
+
+SRC_ROOT = Path(__file__).resolve().parents[1]
+if str(SRC_ROOT) not in sys.path:
+    sys.path.insert(0, str(SRC_ROOT))
+
+from data.change_tracker import change_tracker
+from jobs.handlers import SWEEP_INACTIVE, sweep_inactive
+from jobs.runner import JobRunner
+from jobs.store import InMemoryJobStore, Job
+from security.token_revocation import TokenRevocations
+
+
+class FakeClient:
+    """Ids 1..n are inactive; suspend_inactive_users pops one batch per call"""
+
+    def __init__(self, inactive, locked=0):
+        self.inactive = list(range(1, inactive + 1))
+        # Rows the first batch skips as if another transaction held them (SKIP LOCKED)
+        self.locked = locked
+        self.calls = []
+        self._call = None
+
+    def rpc(self, fn, params):
+        self._call = (fn, params)
+        return self
+
+    def execute(self):
+        fn, params = self._call
+        self.calls.append(fn)
+        if fn == 'count_inactive_users':
+            data = len(self.inactive)
+        else:
+            size = params['p_batch_size'] - self.locked
+            self.locked = 0
+            batch, self.inactive = self.inactive[:size], self.inactive[size:]
+            data = [{'id': user_id} for user_id in batch]
+        return type('Response', (), {'data': data})()
+
+
+def test_sweep_suspends_in_batches_and_revokes_tokens():
+    revocations = TokenRevocations(max_token_age=3600)
+    change_tracker.add_listener(revocations.on_change)
+    issued = {'sub': '3', 'iat': int(time.time()) - 10}
+
+    client = FakeClient(5)
+    job = Job.new(SWEEP_INACTIVE, {'inactive_days': 90})
+    while not sweep_inactive(client, job, 2):
+        pass
+
+    assert job.result == {'inactive_days': 90, 'suspended': 5}
+    assert (job.progress_done, job.progress_total) == (5, 5)
+    assert client.calls.count('suspend_inactive_users') == 4  # 2 + 2 + 1, then an empty batch
+    assert revocations.is_revoked(issued)
+    assert not revocations.is_revoked({'sub': '3', 'iat': int(time.time()) + 1})  # logged in again later
+    assert not revocations.is_revoked({'sub': '9', 'iat': issued['iat']})
+
+
+def test_short_batch_does_not_end_the_sweep():
+    client = FakeClient(5, locked=1)
+    job = Job.new(SWEEP_INACTIVE, {'inactive_days': 90})
+    while not sweep_inactive(client, job, 3):
+        pass
+
+    assert job.result == {'inactive_days': 90, 'suspended': 5}
+    assert client.inactive == []
+
+
+def test_dry_run_only_counts():
+    client = FakeClient(4)
+    job = Job.new(SWEEP_INACTIVE, {'inactive_days': 30, 'dry_run': True})
+    assert sweep_inactive(client, job, 2)
+    assert job.result['would_suspend'] == 4
+    assert client.calls == ['count_inactive_users']
+
+
+def test_scheduled_job_is_created_once_per_period():
+    store = InMemoryJobStore()
+
+    async def scenario():
+        runners = [JobRunner(store, FakeClient(0), chunk_pause=0) for _ in range(2)]
+        for runner in runners:
+            runner.register(SWEEP_INACTIVE, sweep_inactive)
+            runner.schedule_every(SWEEP_INACTIVE, 3600, {'inactive_days': 90})
+            await runner.start()
+        await asyncio.sleep(0.05)
+        for runner in runners:
+            await runner.stop()
+
+    asyncio.run(scenario())
+    jobs = store.list_recent()
+    assert len(jobs) == 1
+    assert jobs[0].status == 'succeeded' and jobs[0].created_by == 'scheduler'
@@ -0,0 +1,105 @@
+"""
+Unit tests for the cross-worker invalidation bus
+"""
+import asyncio
+import json
+import sys
+import threading
+import types
+from pathlib import Path
+
+SRC_ROOT = Path(__file__).resolve().parents[1]
+if str(SRC_ROOT) not in sys.path:
+    sys.path.insert(0, str(SRC_ROOT))
+
+from data.change_tracker import ChangeTracker
+from data import invalidation_bus
+from data.invalidation_bus import InMemoryInvalidationBus, LocalSocketInvalidationBus, PostgresInvalidationBus
+
+
+def _wire(tracker, bus):
+    bus.subscribe(lambda change: tracker.record(change['table'], change['action'], change['id'], remote=True))
+    tracker.add_listener(bus.publish)
+
+
+def test_change_on_one_worker_bumps_the_others_without_echo():
+    network = []
+    worker_a, worker_b = ChangeTracker(), ChangeTracker()
+    _wire(worker_a, InMemoryInvalidationBus(network))
+    _wire(worker_b, InMemoryInvalidationBus(network))
+
+    worker_a.record('roles', 'suspended', 3)
+
+    assert worker_a.version('roles') == 1
+    assert worker_b.version('roles') == 1
+
+
+def test_local_socket_bus_delivers_between_workers(tmp_path):
+    async def run():
+        sender = LocalSocketInvalidationBus(str(tmp_path))
+        receiver = LocalSocketInvalidationBus(str(tmp_path))
+        received = asyncio.Queue()
+        receiver.subscribe(received.put_nowait)
+        await sender.start()
+        await receiver.start()
+        try:
+            sender.publish({'table': 'roles', 'action': 'updated', 'id': 9})
+            return await asyncio.wait_for(received.get(), 1)
+        finally:
+            await sender.stop()
+            await receiver.stop()
+
+    assert asyncio.run(run()) == {'table': 'roles', 'action': 'updated', 'id': 9}
+
+
+class FakeConnection:
+    """psycopg connection stand-in: the first LISTEN session drops, later ones block until closed"""
+
+    def __init__(self, server):
+        self.server = server
+        self.closed = threading.Event()
+        self.dropped = not server.listeners_dropped
+        server.listeners_dropped = True
+
+    def execute(self, sql, params=None):
+        if sql.startswith('SELECT pg_notify'):
+            self.server.notified.append(json.loads(params[1]))
+
+    def notifies(self):
+        if self.dropped:
+            raise OSError('server closed the connection unexpectedly')
+        self.closed.wait()
+        raise OSError('connection closed')
+        yield
+
+    def close(self):
+        self.closed.set()
+
+
+def test_postgres_bus_publishes_off_loop_and_resyncs_after_reconnect(monkeypatch):
+    server = types.SimpleNamespace(listeners_dropped=False, notified=[])
+    monkeypatch.setitem(sys.modules, 'psycopg', types.SimpleNamespace(connect=lambda dsn, **kwargs: FakeConnection(server)))
+    monkeypatch.setattr(invalidation_bus, 'RECONNECT_MIN_DELAY', 0.01)
+
+    async def run():
+        bus = PostgresInvalidationBus('postgresql://test')
+        received = asyncio.Queue()
+        bus.subscribe(received.put_nowait)
+        await bus.start()
+        try:
+            # The first listener connection drops; the reconnect drops every cached table
+            resynced = [await asyncio.wait_for(received.get(), 2) for _ in invalidation_bus.RESYNC_TABLES]
+            bus.publish({'table': 'users', 'action': 'suspended', 'id': 7})
+            for _ in range(200):
+                if server.notified:
+                    break
+                await asyncio.sleep(0.01)
+        finally:
+            await bus.stop()
+        return resynced
+
+    resynced = asyncio.run(run())
+
+    assert [(change['table'], change['action'], change['id']) for change in resynced] == \
+        [(table, 'resync', None) for table in invalidation_bus.RESYNC_TABLES]
+    assert server.notified == [{'o': server.notified[0]['o'], 't': 'users', 'a': 'suspended', 'i': 7}]
@@ -0,0 +1,54 @@
+"""
+Tests for the interchangeable JWT backends
+"""
+import sys
+import time
+from pathlib import Path
+
+import pytest
+
+SRC_ROOT = Path(__file__).resolve().parents[1]
+if str(SRC_ROOT) not in sys.path:
+    sys.path.insert(0, str(SRC_ROOT))
+
+from security import jwt_utils
+from security.jwt_backends import HMACBackend, JoseBackend, TokenError
+
+SECRET = 'test-secret'
+
+
+def test_hmac_and_jose_tokens_are_interchangeable():
+    claims = {'sub': '42', 'role': 'PIN', 'iat': 1700000000, 'exp': int(time.time()) + 60}
+    jose, lean = JoseBackend(), HMACBackend()
+
+    token = lean.encode(claims, SECRET, 'HS256')
+    assert token == jose.encode(claims, SECRET, 'HS256')
+    assert jose.decode(token, SECRET, ['HS256']) == claims
+    assert lean.decode(jose.encode(claims, SECRET, 'HS512'), SECRET, ['HS512']) == claims
+
+
+def test_hmac_rejects_forged_expired_and_disallowed_tokens():
+    lean = HMACBackend()
+    token = lean.encode({'sub': '42', 'exp': int(time.time()) + 60}, SECRET, 'HS256')
+
+    with pytest.raises(TokenError):
+        lean.decode(token, 'other-secret', ['HS256'])
+    with pytest.raises(TokenError):
+        lean.decode(token, SECRET, ['HS512'])
+    with pytest.raises(TokenError):
+        lean.decode(lean.encode({'sub': '42', 'exp': int(time.time()) - 1}, SECRET, 'HS256'), SECRET, ['HS256'])
+    with pytest.raises(TokenError):
+        lean.decode('not.a-token', SECRET, ['HS256'])
+
+
+def test_jwt_utils_round_trip_under_each_backend():
+    original = jwt_utils._backend
+    try:
+        for backend in (JoseBackend(), HMACBackend()):
+            jwt_utils.set_backend(backend)
+            payload = jwt_utils.decode_token(jwt_utils.create_refresh_token('7'))
+            assert payload['sub'] == '7' and payload['type'] == 'refresh'
+            assert payload['exp'] - payload['iat'] == jwt_utils.REFRESH_TOKEN_EXPIRE_DAYS * 86400
+            assert jwt_utils.decode_token('garbage') is None
+    finally:
+        jwt_utils.set_backend(original)
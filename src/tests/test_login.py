@@ -85,3 +85,15 @@ def test_refresh_requires_valid_token(monkeypatch):
     resp = client.post('/api/refresh', json={'refresh_token': 'invalid'})
     assert resp.status_code == 401
 
+
+
+def test_refresh_returns_503_when_the_account_lookup_fails(monkeypatch):
+    async def failing_lookup(user_id):
+        raise ConnectionError('database unreachable')
+
+    monkeypatch.setattr(main.view_user_controller, 'lookup_user', failing_lookup)
+    token = main.create_refresh_token('7')
+    resp = client.post('/api/refresh', json={'refresh_token': token})
+    # A database blip must not read as "account gone" and log the user out
+    assert resp.status_code == 503
+    assert resp.headers['retry-after'] == '1'
@@ -0,0 +1,38 @@
+"""
+Memory regression check for the full user listing (see benchmarks/memory_profile.py)
+"""
+import sys
+from pathlib import Path
+
+import pytest
+
+SRC_ROOT = Path(__file__).resolve().parents[1]
+if str(SRC_ROOT) not in sys.path:
+    sys.path.insert(0, str(SRC_ROOT))
+
+from benchmarks.memory_profile import (
+    SyntheticClient, SyntheticTable, compare, load_baselines, measure, python_version, scenarios
+)
+from data.circuit_breaker import CircuitBreaker
+from data.data_client import DataClient
+
+SIZE = 10_000
+
+
+def test_list_users_memory_within_baseline():
+    baseline = load_baselines().get(python_version())
+    if not baseline or str(SIZE) not in baseline:
+        pytest.skip(f'no memory baseline for Python {python_version()}')
+
+    data_client = DataClient(SyntheticClient(SyntheticTable(SIZE)), breaker=CircuitBreaker('memory-test'))
+    stats = measure(scenarios(data_client)['list_users'])
+
+    assert stats['response_bytes'] == baseline[str(SIZE)]['list_users']['response_bytes']
+    assert compare({str(SIZE): {'list_users': stats}}, baseline, tolerance=0.10) == []
+
+
+def test_compare_flags_growth():
+    baseline = {'10': {'list_users': {'peak_bytes': 10_000_000, 'retained_bytes': 0, 'response_bytes': 1}}}
+    grown = {'10': {'list_users': {'peak_bytes': 12_000_000, 'retained_bytes': 0, 'response_bytes': 1}}}
+    assert len(compare(grown, baseline, tolerance=0.10)) == 1
+    assert compare(baseline, baseline, tolerance=0.10) == []
@@ -0,0 +1,96 @@
+"""
+Tests for bcrypt cost policy and transparent rehash on login
+"""
+import asyncio
+import sys
+from pathlib import Path
+
+SRC_ROOT = Path(__file__).resolve().parents[1]
+if str(SRC_ROOT) not in sys.path:
+    sys.path.insert(0, str(SRC_ROOT))
+
+from controller.auth_controller import auth_controller
+from security import password_hashing
+
+
+class FakeQuery:
+    def __init__(self, client, table):
+        self.client = client
+        self.table = table
+        self.update_data = None
+        self.filters = []
+
+    def select(self, *columns):
+        return self
+
+    def update(self, data):
+        self.update_data = data
+        return self
+
+    def eq(self, column, value):
+        self.filters.append((column, value))
+        return self
+
+    def execute(self):
+        if self.update_data is not None:
+            self.client.updates.append((self.table, self.update_data, self.filters))
+            return type('Response', (), {'data': [{'id': 7}]})()
+        if self.table == 'users':
+            return type('Response', (), {'data': [{'password': self.client.stored}]})()
+        return type('Response', (), {'data': [{'id': 7, 'username': 'csr_rep', 'full_name': 'Jane Support',
+                                               'role_code': 'CSR_REP', 'is_active': True}]})()
+
+
+class FakeClient:
+    def __init__(self, stored):
+        self.stored = stored
+        self.updates = []
+
+    def table(self, name):
+        return FakeQuery(self, name)
+
+
+def _login(monkeypatch, stored, password):
+    client = FakeClient(stored)
+    monkeypatch.setattr(auth_controller, 'supabase', client)
+
+    async def run():
+        response = await auth_controller.login('csr_rep', password)
+        await asyncio.gather(*auth_controller._rehash_tasks)
+        return response
+
+    return asyncio.run(run()), client
+
+
+def _password_updates(client):
+    return [update for update in client.updates if 'password' in update[1]]
+
+
+def test_needs_rehash_detects_plaintext_and_cost_mismatch():
+    assert password_hashing.needs_rehash('csr123', rounds=4)
+    assert password_hashing.hash_cost(password_hashing.hash_password('x', rounds=5)) == 5
+    assert password_hashing.needs_rehash(password_hashing.hash_password('x', rounds=5), rounds=4)
+    assert not password_hashing.needs_rehash(password_hashing.hash_password('x', rounds=4), rounds=4)
+
+
+def test_plaintext_login_is_rehashed_conditionally(monkeypatch):
+    monkeypatch.setattr(password_hashing, 'BCRYPT_ROUNDS', 4)
+    response, client = _login(monkeypatch, 'csr123', 'csr123')
+    assert response.success is True
+
+    [(table, data, filters)] = _password_updates(client)
+    assert password_hashing.hash_cost(data['password']) == 4
+    assert password_hashing.verify_password('csr123', data['password'])
+    assert ('password', 'csr123') in filters
+
+
+def test_current_cost_and_failed_logins_are_not_rehashed(monkeypatch):
+    monkeypatch.setattr(password_hashing, 'BCRYPT_ROUNDS', 4)
+    current = password_hashing.hash_password('csr123', rounds=4)
+    response, client = _login(monkeypatch, current, 'csr123')
+    assert response.success is True
+    assert _password_updates(client) == []
+
+    response, client = _login(monkeypatch, 'csr123', 'wrong')
+    assert response.success is False
+    assert _password_updates(client) == []
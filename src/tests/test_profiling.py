@@ -0,0 +1,93 @@
+"""
+Tests for the request profiling middleware
+"""
+import sys
+import time
+from pathlib import Path
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+SRC_ROOT = Path(__file__).resolve().parents[1]
+if str(SRC_ROOT) not in sys.path:
+    sys.path.insert(0, str(SRC_ROOT))
+
+from data.circuit_breaker import CircuitBreaker
+from data.data_client import DataClient
+from middleware.profiling import ProfileStore, ProfilingMiddleware, observe_query
+
+
+class FakeRawClient:
+    def table(self, name):
+        return self
+
+    def __getattr__(self, name):
+        return lambda *args, **kwargs: self
+
+    def execute(self):
+        time.sleep(0.02)
+        return type('Response', (), {'data': [{'id': 1}, {'id': 2}]})()
+
+
+def busy_controller_work():
+    deadline = time.perf_counter() + 0.05
+    while time.perf_counter() < deadline:
+        pass
+
+
+def _client(sample_every=0, **options):
+    data_client = DataClient(FakeRawClient(), breaker=CircuitBreaker('profiling-test'))
+    data_client.add_observer(observe_query)
+    app = FastAPI()
+
+    @app.get('/api/users')
+    def users():
+        busy_controller_work()
+        return {'rows': len(data_client.table('users').select('*').execute().data)}
+
+    @app.get('/api/events')
+    def events():
+        return {'stream': True}
+
+    store = ProfileStore()
+    authorize = lambda headers: headers.get(b'authorization') == b'Bearer admin'
+    return TestClient(ProfilingMiddleware(app, store, authorize, sample_every=sample_every, interval=0.002,
+                                          **options)), store
+
+
+def test_admin_request_is_profiled_with_db_timings():
+    client, store = _client()
+    response = client.get('/api/users', headers={'X-Profile': '1', 'Authorization': 'Bearer admin'})
+    profile = store.get(response.headers['x-profile-id'])
+
+    assert profile.summary()['db_calls'] == 1
+    assert profile.db_calls[0]['label'] == 'users.select' and profile.db_calls[0]['rows'] == 2
+    assert profile.db_calls[0]['ms'] >= 20
+    assert 'busy_controller_work' in profile.collapsed()
+
+
+def test_profile_header_from_non_admin_is_ignored():
+    client, store = _client()
+    response = client.get('/api/users', headers={'X-Profile': '1', 'Authorization': 'Bearer someone'})
+    assert 'x-profile-id' not in response.headers
+    assert store.list() == []
+
+
+def test_one_in_n_sampling():
+    client, store = _client(sample_every=3)
+    profiled = sum('x-profile-id' in client.get('/api/users').headers for _ in range(6))
+    assert profiled == 2
+    assert {p['reason'] for p in store.list()} == {'sampled'}
+
+
+def test_event_streams_are_never_sampled():
+    client, store = _client(sample_every=1)
+    assert not any('x-profile-id' in client.get('/api/events').headers for _ in range(3))
+    assert store.list() == []
+
+
+def test_sampling_stops_at_the_sample_cap():
+    client, store = _client(max_samples=3)
+    response = client.get('/api/users', headers={'X-Profile': '1', 'Authorization': 'Bearer admin'})
+    summary = store.get(response.headers['x-profile-id']).summary()
+    assert summary['samples'] == 3 and summary['truncated']
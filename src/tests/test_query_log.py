@@ -0,0 +1,78 @@
+"""
+Tests for query fingerprinting and the slow-query log
+"""
+import sys
+from pathlib import Path
+
+SRC_ROOT = Path(__file__).resolve().parents[1]
+if str(SRC_ROOT) not in sys.path:
+    sys.path.insert(0, str(SRC_ROOT))
+
+from data.circuit_breaker import CircuitBreaker
+from data.data_client import DataClient, quote_logic_value
+from data.query_log import OTHER_FINGERPRINT, QueryLog
+
+
+class FakeRawClient:
+    def table(self, name):
+        return self
+
+    def __getattr__(self, name):
+        return lambda *args, **kwargs: self
+
+    def execute(self):
+        return type('Response', (), {'data': [{'id': 1}]})()
+
+
+def _event(query, ms, ok=True):
+    return {'query': query, 'label': query.label, 'endpoint': 'primary', 'seconds': ms / 1000,
+            'ok': ok, 'error': None if ok else 'boom', 'rows': 1}
+
+
+def test_fingerprint_drops_values():
+    client = DataClient(FakeRawClient(), breaker=CircuitBreaker('query-log-test'))
+    first = client.table('users').select('*').eq('username', 'alice').ilike('email', '%@corp%').limit(10)
+    second = client.table('users').select('*').eq('username', 'bob').ilike('email', '%x%').limit(99)
+    assert first.fingerprint == second.fingerprint
+    assert 'alice' not in first.fingerprint and 'corp' not in first.fingerprint
+    assert first.fingerprint != client.table('users').select('*').eq('id', 1).fingerprint
+
+
+def test_or_fingerprint_keeps_search_text_out():
+    client = DataClient(FakeRawClient(), breaker=CircuitBreaker('query-log-test'))
+    pattern = quote_logic_value('%a,b.c%')
+    quoted = client.table('roles').select('*').or_(f'role_name.ilike.{pattern},role_code.ilike.{pattern}')
+    assert quoted.fingerprint == 'roles select(*) or:role_name.ilike|role_code.ilike'
+    # Unquoted text that splits into extra terms only contributes '?'
+    unquoted = client.table('roles').select('*').or_('role_name.ilike.%secret,x.y%')
+    assert 'secret' not in unquoted.fingerprint and unquoted.fingerprint.endswith('or:role_name.ilike|?')
+
+
+def test_observer_records_histogram_and_slow_queries():
+    client = DataClient(FakeRawClient(), breaker=CircuitBreaker('query-log-test'))
+    log = QueryLog(slow_ms=100, slow_log_size=2)
+    client.add_observer(log.observe)
+    client.table('users').select('*').eq('id', 1).execute()
+
+    query = client.table('roles').select('*').eq('role_code', 'x')
+    for ms in [3] * 18 + [300, 400, 500]:
+        log.observe(_event(query, ms, ok=ms != 500))
+
+    stats = log.get_stats(sort='total_ms')
+    top = stats['fingerprints'][0]
+    assert top['fingerprint'] == query.fingerprint
+    assert (top['calls'], top['errors']) == (21, 1)
+    assert top['p50_ms'] == 5 and top['p95_ms'] == 500
+    assert stats['fingerprints_tracked'] == 2
+    assert [slow['ms'] for slow in stats['slow_queries']] == [500, 400]
+
+
+def test_fingerprint_cap_folds_into_other():
+    client = DataClient(FakeRawClient(), breaker=CircuitBreaker('query-log-test'))
+    log = QueryLog(max_fingerprints=3)
+    for table in ['a', 'b', 'c', 'd', 'e']:
+        log.observe(_event(client.table(table).select('*'), 1))
+    fingerprints = {stats['fingerprint']: stats['calls'] for stats in log.get_stats(sort='calls')['fingerprints']}
+    assert len(fingerprints) == 4 and fingerprints[OTHER_FINGERPRINT] == 2
+    log.reset()
+    assert log.get_stats()['fingerprints'] == []
@@ -0,0 +1,90 @@
+"""
+Tests for login rate limiting
+"""
+import asyncio
+import importlib
+import sys
+from pathlib import Path
+
+from fastapi.testclient import TestClient
+
+SRC_ROOT = Path(__file__).resolve().parents[1]
+if str(SRC_ROOT) not in sys.path:
+    sys.path.insert(0, str(SRC_ROOT))
+
+main = importlib.import_module('main')
+from entity.auth_response import AuthResponse
+from security.rate_limiter import InMemoryRateLimitBackend, LoginRateLimiter, sliding_window
+
+client = TestClient(main.app)
+
+
+def test_sliding_window_weights_previous_window():
+    # Halfway through: 10 * 0.5 + 4 = 9 < 10 allowed; one more would reach the limit
+    assert sliding_window(10, 4, 30, 60, 10) == (True, 0)
+    allowed, retry_after = sliding_window(10, 5, 30, 60, 10)
+    assert not allowed and retry_after == 1
+    allowed, retry_after = sliding_window(0, 10, 0, 60, 10)
+    assert not allowed and retry_after > 60
+
+
+def test_memory_backend_counts_only_allowed_attempts():
+    limiter = LoginRateLimiter(InMemoryRateLimitBackend(), username_rate=(3, 60), ip_rate=(100, 60))
+
+    async def attempts():
+        return [await limiter.check('Admin', '10.0.0.1') for _ in range(5)]
+
+    results = asyncio.run(attempts())
+    assert results[:3] == [None, None, None]
+    assert all(wait and wait > 0 for wait in results[3:])
+    assert limiter.get_stats()['rejected'] == {'username': 2, 'ip': 0}
+
+    asyncio.run(limiter.record_success('admin'))
+    assert asyncio.run(limiter.check('ADMIN ', '10.0.0.1')) is None
+
+
+def test_attempt_rejected_by_one_limit_does_not_count_against_the_other():
+    limiter = LoginRateLimiter(InMemoryRateLimitBackend(), username_rate=(3, 60), ip_rate=(1, 60))
+
+    async def attempts():
+        # The IP limit rejects the second attempt; the victim's username budget is untouched
+        return [await limiter.check('victim', '10.0.0.1') for _ in range(3)]
+
+    results = asyncio.run(attempts())
+    assert results[0] is None and all(wait and wait > 0 for wait in results[1:])
+    assert asyncio.run(limiter.check('victim', '10.0.0.2')) is None
+    assert asyncio.run(limiter.check('victim', '10.0.0.3')) is None
+
+
+def test_eviction_keeps_locked_keys_and_uses_recency():
+    backend = InMemoryRateLimitBackend(max_keys=100)
+
+    async def hit(key, limit=2):
+        return (await backend.hit([(key, limit, 60)]))[0][0]
+
+    async def flood():
+        assert await hit('u:victim') and await hit('u:victim') and not await hit('u:victim')
+        for i in range(500):
+            await hit(f'u:attacker{i}')
+        return await hit('u:victim')
+
+    # The locked counter survives 500 new keys, so the victim is still locked
+    assert asyncio.run(flood()) is False
+    assert backend.size() <= 100
+
+
+def test_login_returns_429_before_touching_the_database(monkeypatch):
+    calls = []
+
+    async def mock_login(username, password, role_code=None):
+        calls.append(username)
+        return AuthResponse(success=False, message="Invalid username or password")
+
+    monkeypatch.setattr(main.auth_controller, 'login', mock_login)
+    monkeypatch.setattr(main, 'login_rate_limiter',
+                        LoginRateLimiter(InMemoryRateLimitBackend(), username_rate=(100, 60), ip_rate=(2, 60)))
+
+    statuses = [client.post('/api/login', json={'username': f'user{i}', 'password': 'x'}) for i in range(3)]
+    assert [r.status_code for r in statuses] == [200, 200, 429]
+    assert int(statuses[2].headers['retry-after']) > 0
+    assert calls == ['user0', 'user1']
@@ -0,0 +1,119 @@
+"""
+Tests for set-based role reassignment and the reassign-then-delete path
+"""
+import sys
+from pathlib import Path
+
+SRC_ROOT = Path(__file__).resolve().parents[1]
+if str(SRC_ROOT) not in sys.path:
+    sys.path.insert(0, str(SRC_ROOT))
+
+from controller import user_profile_controller as module
+from controller.user_profile_controller import UserProfileController
+from data.change_tracker import change_tracker
+
+
+class FakeClient:
+    """Users live in a dict of id -> role_id; reassign_role_users moves one batch per call"""
+
+    def __init__(self, users):
+        self.users = dict(users)
+        self.roles = {1: {'id': 1, 'role_name': 'Old'}, 2: {'id': 2, 'role_name': 'New'}}
+        self.statements = []
+        self._query = None
+
+    def table(self, name):
+        self._query = {'table': name, 'op': 'select', 'filters': {}, 'count': None, 'ids': None, 'limit': None}
+        return self
+
+    def select(self, *columns, count=None):
+        self._query['count'] = count
+        return self
+
+    def delete(self, **kwargs):
+        self._query['op'] = 'delete'
+        return self
+
+    def eq(self, column, value):
+        self._query['filters'][column] = value
+        return self
+
+    def in_(self, column, values):
+        self._query['ids'] = set(values)
+        return self
+
+    def order(self, column):
+        return self
+
+    def limit(self, n):
+        self._query['limit'] = n
+        return self
+
+    def rpc(self, fn, params):
+        self._query = {'table': None, 'op': fn, 'params': params}
+        return self
+
+    def execute(self):
+        query = self._query
+        self.statements.append(query['op'])
+        if query['op'] == 'reassign_role_users':
+            params = query['params']
+            batch = sorted(i for i, role in self.users.items() if role == params['p_from_role_id'])[:params['p_batch_size']]
+            for user_id in batch:
+                self.users[user_id] = params['p_to_role_id']
+            return type('Response', (), {'data': len(batch), 'count': None})()
+        if query['table'] == 'roles':
+            role = self.roles.get(query['filters'].get('id'))
+            if query['op'] == 'delete' and role:
+                del self.roles[role['id']]
+            return type('Response', (), {'data': [role] if role else [], 'count': None})()
+        matching = sorted(i for i, role in self.users.items() if role == query['filters'].get('role_id')
+                          and (query['ids'] is None or i in query['ids']))
+        if query['op'] == 'delete':
+            for user_id in matching:
+                del self.users[user_id]
+        if query['count'] or query['op'] == 'delete':
+            return type('Response', (), {'data': [], 'count': len(matching)})()
+        return type('Response', (), {'data': [{'id': i} for i in matching[:query['limit']]], 'count': None})()
+
+
+def test_reassign_moves_users_in_batches_without_fetching_them(monkeypatch):
+    monkeypatch.setattr(module, 'REASSIGN_BATCH_SIZE', 2)
+    client = FakeClient({1: 1, 2: 1, 3: 1, 4: 2})
+    result = UserProfileController(client).reassign_role_users(1, 2)
+
+    assert result['success'] and result['moved_users'] == 3 and result['remaining_users'] == 0
+    assert set(client.users.values()) == {2}
+    assert client.statements.count('reassign_role_users') == 2  # 2 + 1 (short batch ends the loop)
+
+
+def test_delete_role_with_reassign_keeps_the_users():
+    client = FakeClient({1: 1, 2: 1})
+    result = UserProfileController(client).delete_role(1, reassign_to=2)
+
+    assert result['success']
+    assert (result['reassigned_users'], result['deleted_users']) == (2, 0)
+    assert client.users == {1: 2, 2: 2}
+    assert 1 not in client.roles
+
+
+def test_reassign_rejects_same_or_missing_role():
+    controller = UserProfileController(FakeClient({1: 1}))
+    assert not controller.reassign_role_users(1, 1)['success']
+    assert controller.reassign_role_users(1, 9)['message'] == 'Target role not found.'
+
+
+def test_cascade_delete_records_each_deleted_user(monkeypatch):
+    monkeypatch.setattr(module, 'CASCADE_DELETE_BATCH_SIZE', 2)
+    changes = []
+    change_tracker.add_listener(changes.append)
+    try:
+        client = FakeClient({1: 1, 2: 1, 3: 1, 4: 2})
+        result = UserProfileController(client).delete_role(1)
+    finally:
+        change_tracker._listeners.remove(changes.append)
+
+    assert result['success'] and result['deleted_users'] == 3
+    assert client.users == {4: 2}
+    # Per-id records are what token revocation acts on
+    assert sorted(c['id'] for c in changes if c['table'] == 'users' and c['action'] == 'deleted') == [1, 2, 3]
@@ -0,0 +1,72 @@
+"""
+Unit tests for single-flight read coalescing
+"""
+import asyncio
+import sys
+from pathlib import Path
+
+import pytest
+
+SRC_ROOT = Path(__file__).resolve().parents[1]
+if str(SRC_ROOT) not in sys.path:
+    sys.path.insert(0, str(SRC_ROOT))
+
+from data.single_flight import SingleFlight
+
+
+def test_concurrent_identical_reads_share_one_call():
+    flight = SingleFlight()
+    calls = []
+
+    async def fetch_users():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return ['alice', 'bob']
+
+    async def run():
+        return await asyncio.gather(*[flight.do(('users',), fetch_users) for _ in range(5)])
+
+    results = asyncio.run(run())
+    assert len(calls) == 1
+    assert all(r == ['alice', 'bob'] for r in results)
+    stats = flight.get_stats()
+    assert stats['saved_db_calls'] == 4
+    assert stats['queries']['users'] == {'calls': 5, 'executions': 1, 'coalesced': 4, 'errors': 0}
+    assert stats['in_flight'] == 0
+
+
+def test_different_keys_and_sequential_calls_are_not_coalesced():
+    flight = SingleFlight()
+    calls = []
+
+    def fetch_role(role_id):
+        calls.append(role_id)
+        return {'id': role_id}
+
+    async def run():
+        first = await asyncio.gather(
+            flight.do_blocking(('role', 1), fetch_role, 1),
+            flight.do_blocking(('role', 2), fetch_role, 2)
+        )
+        second = await flight.do_blocking(('role', 1), fetch_role, 1)
+        return first, second
+
+    first, second = asyncio.run(run())
+    assert first == [{'id': 1}, {'id': 2}]
+    assert second == {'id': 1}
+    assert sorted(calls) == [1, 1, 2]
+
+
+def test_errors_are_shared_with_every_waiter():
+    flight = SingleFlight()
+
+    async def failing():
+        await asyncio.sleep(0.01)
+        raise RuntimeError('db down')
+
+    async def run():
+        return await asyncio.gather(*[flight.do(('users',), failing) for _ in range(3)], return_exceptions=True)
+
+    results = asyncio.run(run())
+    assert all(isinstance(r, RuntimeError) for r in results)
+    assert flight.get_stats()['queries']['users']['errors'] == 1
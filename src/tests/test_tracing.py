@@ -0,0 +1,94 @@
+"""
+Tests for request, controller, query and bcrypt tracing
+"""
+import sys
+from pathlib import Path
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+SRC_ROOT = Path(__file__).resolve().parents[1]
+if str(SRC_ROOT) not in sys.path:
+    sys.path.insert(0, str(SRC_ROOT))
+
+pytest.importorskip('opentelemetry.sdk')
+from opentelemetry.sdk.trace.export.in_memory_span_exporter import InMemorySpanExporter
+
+import tracing
+from data.circuit_breaker import CircuitBreaker
+from data.data_client import DataClient
+from middleware.tracing import TracingMiddleware
+from security import password_hashing
+
+TRACE_ID = '4bf92f3577b34da6a3ce929d0e0e4736'
+
+
+class FakeRawClient:
+    def table(self, name):
+        return self
+
+    def __getattr__(self, name):
+        return lambda *args, **kwargs: self
+
+    def execute(self):
+        return type('Response', (), {'data': [{'id': 1}]})()
+
+
+class UsersController:
+    def __init__(self, data_client):
+        self.data_client = data_client
+
+    def get_user(self, user_id):
+        rows = self.data_client.table('users').select('*').eq('id', user_id).execute().data
+        password_hashing.verify_password('secret', password_hashing.hash_password('secret', rounds=4))
+        return rows[0]
+
+
+@pytest.fixture
+def exporter():
+    exporter = InMemorySpanExporter()
+    tracing.configure_tracing(exporter, batch=False)
+    yield exporter
+    tracing.shutdown_tracing()
+
+
+def _client():
+    data_client = DataClient(FakeRawClient(), breaker=CircuitBreaker('tracing-test'))
+    data_client.add_observer(tracing.observe_query)
+    controller = tracing.instrument(UsersController(data_client))
+    app = FastAPI()
+
+    @app.get('/api/users/{user_id}')
+    def get_user(user_id: int):
+        return controller.get_user(user_id)
+
+    return TestClient(TracingMiddleware(app))
+
+
+def test_request_spans_nest_and_continue_incoming_trace(exporter):
+    response = _client().get('/api/users/7', headers={'traceparent': f'00-{TRACE_ID}-00f067aa0ba902b7-01'})
+    assert response.status_code == 200
+
+    spans = {span.name: span for span in exporter.get_finished_spans()}
+    assert set(spans) == {'GET /api/users/{user_id}', 'UsersController.get_user', 'db users.select',
+                          'bcrypt.hash', 'bcrypt.verify'}
+    request = spans['GET /api/users/{user_id}']
+    assert format(request.context.trace_id, '032x') == TRACE_ID
+    assert request.attributes['http.response.status_code'] == 200
+    controller = spans['UsersController.get_user']
+    assert controller.parent.span_id == request.context.span_id
+    for child in ('db users.select', 'bcrypt.hash', 'bcrypt.verify'):
+        assert spans[child].parent.span_id == controller.context.span_id
+    assert spans['db users.select'].attributes['db.statement'] == 'users select(*) eq:id'
+
+
+def test_unsampled_parent_records_nothing(exporter):
+    _client().get('/api/users/7', headers={'traceparent': f'00-{TRACE_ID}-00f067aa0ba902b7-00'})
+    assert exporter.get_finished_spans() == ()
+
+
+def test_instrument_is_a_no_op_while_tracing_is_off():
+    controller = UsersController(None)
+    assert tracing.instrument(controller) is controller
+    assert 'get_user' not in vars(controller)
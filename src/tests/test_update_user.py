@@ -0,0 +1,74 @@
+"""
+Tests for the single round-trip user update path
+"""
+import sys
+from pathlib import Path
+
+from postgrest.exceptions import APIError
+
+SRC_ROOT = Path(__file__).resolve().parents[1]
+if str(SRC_ROOT) not in sys.path:
+    sys.path.insert(0, str(SRC_ROOT))
+
+from controller.update_user_account_controller import UpdateUserAccountController
+from data.db_errors import unique_violation_field
+
+
+class FakeQuery:
+    def __init__(self, client):
+        self.client = client
+
+    def update(self, data):
+        return self
+
+    def eq(self, column, value):
+        return self
+
+    def execute(self):
+        self.client.round_trips += 1
+        if isinstance(self.client.outcome, Exception):
+            raise self.client.outcome
+        return type('Response', (), {'data': self.client.outcome})()
+
+
+class FakeClient:
+    def __init__(self, outcome):
+        self.outcome = outcome
+        self.round_trips = 0
+
+    def table(self, name):
+        return FakeQuery(self)
+
+
+def _unique_violation(constraint, key):
+    return APIError({
+        'code': '23505',
+        'message': f'duplicate key value violates unique constraint "{constraint}"',
+        'details': f'Key ({key})=(taken) already exists.'
+    })
+
+
+def test_unique_violation_field_reads_key_or_constraint():
+    assert unique_violation_field(_unique_violation('users_username_key', 'username'), ('username', 'email')) == 'username'
+    assert unique_violation_field(_unique_violation('users_email_lower_key', 'lower((email)::text)'), ('username', 'email')) == 'email'
+    assert unique_violation_field(APIError({'code': '23503', 'message': 'fk'}), ('username',)) is None
+
+
+def test_update_is_one_round_trip():
+    client = FakeClient([{'id': 4, 'full_name': 'New Name'}])
+    result = UpdateUserAccountController(client).update_user(4, full_name='New Name', email='new@example.com')
+    assert result['success'] is True
+    assert client.round_trips == 1
+
+
+def test_missing_user_and_conflicts_map_to_existing_messages():
+    missing = UpdateUserAccountController(FakeClient([])).update_user(99, full_name='Nobody')
+    assert missing == {'success': False, 'message': 'User not found.'}
+
+    client = FakeClient(_unique_violation('users_email_key', 'email'))
+    conflict = UpdateUserAccountController(client).update_user(4, email='taken@example.com')
+    assert conflict['message'] == 'Email already exists. Please use a different email address.'
+    assert client.round_trips == 1
+
+    taken = UpdateUserAccountController(FakeClient(_unique_violation('users_username_key', 'username'))).update_user(4, username='taken')
+    assert taken['message'] == 'Username already exists. Please choose a different username.'
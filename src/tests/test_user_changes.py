@@ -0,0 +1,128 @@
+"""
+Tests for the user change feed (GET /api/users/changes)
+"""
+import asyncio
+import sys
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+SRC_ROOT = Path(__file__).resolve().parents[1]
+if str(SRC_ROOT) not in sys.path:
+    sys.path.insert(0, str(SRC_ROOT))
+
+from controller import user_account_controller
+from controller.user_account_controller import ViewUserAccountController
+
+T0 = datetime(2026, 10, 19, 12, 0, 0, tzinfo=timezone.utc)
+
+
+def _at(seconds):
+    return (T0 + timedelta(seconds=seconds)).isoformat()
+
+
+class FakeQuery:
+    def __init__(self, rows):
+        self.rows = rows
+
+    def select(self, *args, **kwargs):
+        return self
+
+    def gte(self, column, value):
+        since = datetime.fromisoformat(value)
+        return FakeQuery([row for row in self.rows if datetime.fromisoformat(row[column]) >= since])
+
+    def order(self, column, **kwargs):
+        return FakeQuery(sorted(self.rows, key=lambda row: row[column]))
+
+    def limit(self, size):
+        return FakeQuery(self.rows[:size])
+
+    def execute(self):
+        return type('Response', (), {'data': list(self.rows)})()
+
+
+class FakeClient:
+    def __init__(self):
+        self.users = []
+        self.tombstones = []
+        self.clock = 0
+
+    def table(self, name):
+        return FakeQuery(self.tombstones if name == 'user_tombstones' else self.users)
+
+    from_ = table
+
+    def rpc(self, fn, params=None, read_only=False):
+        assert fn == 'change_feed_now'
+        return type('Query', (), {'execute': lambda _: type('Response', (), {'data': _at(self.clock)})()})()
+
+    def write(self, user_id, seconds):
+        self.users = [row for row in self.users if row['id'] != user_id]
+        self.users.append({'id': user_id, 'username': f'user{user_id}', 'full_name': f'User {user_id}',
+                           'updated_at': _at(seconds)})
+
+
+def _changes(controller, since=None, limit=user_account_controller.CHANGE_FEED_PAGE_SIZE):
+    return asyncio.run(controller.get_user_changes(since, limit))
+
+
+def test_cursor_round_trip_and_tombstones(monkeypatch):
+    monkeypatch.setattr(user_account_controller, 'CHANGE_FEED_SAFETY_LAG', timedelta(0))
+    client = FakeClient()
+    controller = ViewUserAccountController(client)
+    client.write(1, 0)
+    client.write(2, 1)
+    client.clock = 1
+
+    first = _changes(controller)
+    assert [user.id for user in first['users']] == [1, 2]
+    assert datetime.fromisoformat(first['cursor'].replace('Z', '+00:00')) == T0 + timedelta(seconds=1)
+
+    client.write(3, 2)
+    client.tombstones.append({'user_id': 1, 'deleted_at': _at(3)})
+    client.clock = 3
+    second = _changes(controller, first['cursor'])
+    # gte: user 2 shares the old cursor timestamp and is re-sent rather than missed
+    assert [user.id for user in second['users']] == [2, 3]
+    assert second['deleted'] == [1]
+
+    assert _changes(controller, 'not-a-cursor')['success'] is False
+
+
+def test_cursor_trails_newest_row_so_late_commits_are_delivered(monkeypatch):
+    monkeypatch.setattr(user_account_controller, 'CHANGE_FEED_SAFETY_LAG', timedelta(seconds=5))
+    client = FakeClient()
+    controller = ViewUserAccountController(client)
+    client.write(1, 10)
+    client.clock = 11
+
+    first = _changes(controller)
+    # A transaction stamped at +8 commits after this poll
+    client.write(2, 8)
+    client.clock = 12
+    second = _changes(controller, first['cursor'])
+    assert 2 in [user.id for user in second['users']]
+
+    # Once writes stop, the cursor catches up with the clock and the burst is not re-sent
+    client.clock = 60
+    third = _changes(controller, second['cursor'])
+    assert _changes(controller, third['cursor'])['users'] == []
+
+
+def test_large_bursts_are_paged(monkeypatch):
+    monkeypatch.setattr(user_account_controller, 'CHANGE_FEED_SAFETY_LAG', timedelta(0))
+    client = FakeClient()
+    controller = ViewUserAccountController(client)
+    for user_id in range(1, 251):
+        client.write(user_id, user_id / 1000)
+    client.clock = 60
+
+    seen, cursor, pages = set(), None, 0
+    while True:
+        page = _changes(controller, cursor, limit=100)
+        assert len(page['users']) <= 100
+        seen.update(user.id for user in page['users'])
+        cursor, pages = page['cursor'], pages + 1
+        if not page['has_more']:
+            break
+    assert seen == set(range(1, 251)) and pages == 3
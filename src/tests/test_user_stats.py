@@ -0,0 +1,70 @@
+"""
+Tests for the cached dashboard stats endpoint
+"""
+import importlib
+import sys
+from pathlib import Path
+
+from fastapi.testclient import TestClient
+
+SRC_ROOT = Path(__file__).resolve().parents[1]
+if str(SRC_ROOT) not in sys.path:
+    sys.path.insert(0, str(SRC_ROOT))
+
+main = importlib.import_module('main')
+from controller.user_stats_controller import UserStatsController
+from data.change_tracker import ChangeTracker
+
+client = TestClient(main.app)
+
+
+class FakeClient:
+    def __init__(self):
+        self.calls = 0
+
+    def rpc(self, fn, params=None, read_only=False):
+        assert fn == 'get_user_stats' and read_only
+        return self
+
+    def execute(self):
+        self.calls += 1
+        return type('Response', (), {'data': {'total_users': 10 + self.calls}})()
+
+
+def test_stats_are_cached_until_a_user_or_role_change():
+    fake = FakeClient()
+    controller = UserStatsController(fake, ttl_seconds=60)
+    tracker = ChangeTracker()
+    tracker.add_listener(controller.invalidate)
+
+    assert controller.get_stats() == {'total_users': 11, 'cached': False}
+    assert controller.get_stats() == {'total_users': 11, 'cached': True}
+
+    tracker.record('sessions', 'created')  # unrelated table
+    assert controller.get_stats()['cached']
+
+    tracker.record('users', 'suspended', 3)
+    assert controller.get_stats() == {'total_users': 12, 'cached': False}
+    assert fake.calls == 2
+
+
+def test_logins_keep_the_cache():
+    fake = FakeClient()
+    controller = UserStatsController(fake, ttl_seconds=60)
+    tracker = ChangeTracker()
+    tracker.add_listener(controller.invalidate)
+
+    controller.get_stats()
+    tracker.record('users', 'login', 3)
+    tracker.record('users', 'rehashed', 3)
+    assert controller.get_stats() == {'total_users': 11, 'cached': True}
+    assert fake.calls == 1
+
+
+def test_stats_route_is_not_shadowed_by_user_id(monkeypatch):
+    main.app.dependency_overrides[main.get_current_user_claims] = lambda: {'sub': '1', 'role': 'USER_ADMIN'}
+    monkeypatch.setattr(main.user_stats_controller, 'get_stats', lambda: {'total_users': 3, 'cached': False})
+
+    response = client.get('/api/users/stats')
+    assert response.status_code == 200
+    assert response.json()['stats']['total_users'] == 3
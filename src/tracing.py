@@ -0,0 +1,179 @@
+"""
+Tracing
+OpenTelemetry spans for routes (middleware/tracing.py), controller methods,
+Supabase queries and bcrypt, so a slow request can be broken down into the
+queries and hashing it spent its time on.
+
+OpenTelemetry is an optional dependency. Tracing is off unless TRACING_EXPORTER
+is set (and the packages are installed); while it is off, the middleware and
+query observer are not installed, controllers are not wrapped, and each span()
+call (such as the ones around bcrypt) costs one global check.
+"""
+import functools
+import inspect
+import os
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, Optional
+
+try:
+    from opentelemetry import trace
+    from opentelemetry.sdk.resources import Resource
+    from opentelemetry.sdk.trace import TracerProvider
+    from opentelemetry.sdk.trace.export import BatchSpanProcessor, ConsoleSpanExporter, SimpleSpanProcessor
+    from opentelemetry.sdk.trace.sampling import ParentBased, TraceIdRatioBased
+    from opentelemetry.trace import SpanKind, Status, StatusCode
+except ImportError:  # optional dependency
+    trace = None
+
+_tracer: Optional[Any] = None
+_provider: Optional[Any] = None
+
+
+def configure_tracing(exporter: Any, sample_ratio: float = 1.0, service_name: str = 'csr-api',
+                      batch: bool = True) -> None:
+    """
+    Start exporting spans.
+
+    Incoming traceparent headers decide sampling for requests that carry
+    them; other traces are sampled at sample_ratio.
+
+    Args:
+        exporter: OpenTelemetry SpanExporter (OTLP, console, or in-memory for tests)
+        sample_ratio: Fraction of new traces to record
+        service_name: service.name resource attribute
+        batch: Export in a background batch (False exports each span synchronously, for tests)
+    """
+    global _tracer, _provider
+    if trace is None:
+        raise ImportError("Tracing requires the 'opentelemetry-sdk' package (pip install opentelemetry-sdk)")
+    shutdown_tracing()
+    _provider = TracerProvider(
+        resource=Resource.create({'service.name': service_name}),
+        sampler=ParentBased(TraceIdRatioBased(sample_ratio))
+    )
+    _provider.add_span_processor(BatchSpanProcessor(exporter) if batch else SimpleSpanProcessor(exporter))
+    _tracer = _provider.get_tracer('csr')
+
+
+def shutdown_tracing() -> None:
+    """Flush pending spans and turn tracing off"""
+    global _tracer, _provider
+    if _provider is not None:
+        _provider.shutdown()
+    _tracer = _provider = None
+
+
+def get_tracer() -> Optional[Any]:
+    return _tracer
+
+
+@contextmanager
+def span(name: str, attributes: Optional[Dict[str, Any]] = None) -> Iterator[Optional[Any]]:
+    """Run a block inside a span (a no-op while tracing is off); exceptions mark the span as failed"""
+    if _tracer is None:
+        yield None
+        return
+    with _tracer.start_as_current_span(name, attributes=attributes) as current:
+        yield current
+
+
+def _wrap_method(name: str, method: Callable) -> Callable:
+    if inspect.iscoroutinefunction(method):
+        @functools.wraps(method)
+        async def async_wrapper(*args, **kwargs):
+            with _tracer.start_as_current_span(name):
+                return await method(*args, **kwargs)
+        return async_wrapper
+
+    @functools.wraps(method)
+    def wrapper(*args, **kwargs):
+        with _tracer.start_as_current_span(name):
+            return method(*args, **kwargs)
+    return wrapper
+
+
+def instrument(controller: Any) -> Any:
+    """
+    Wrap every public method of a controller instance in a span named
+    'ClassName.method'. Does nothing while tracing is off, so call it after
+    create_tracing().
+
+    Args:
+        controller: Controller instance (changed in place)
+
+    Returns:
+        The same controller
+    """
+    if _tracer is None:
+        return controller
+    class_name = type(controller).__name__
+    for name, method in inspect.getmembers(controller, inspect.ismethod):
+        if not name.startswith('_'):
+            setattr(controller, name, _wrap_method(f'{class_name}.{name}', method))
+    return controller
+
+
+def observe_query(event: Dict[str, Any]) -> None:
+    """
+    DataClient observer: one CLIENT span per Supabase round trip, back-dated
+    to when the call started. The statement is the query fingerprint, which
+    never contains filter values.
+    """
+    if _tracer is None:
+        return
+    end = time.time_ns()
+    query = event['query']
+    query_span = _tracer.start_span(
+        f"db {event['label']}",
+        kind=SpanKind.CLIENT,
+        start_time=end - int(event['seconds'] * 1e9),
+        attributes={
+            'db.system': 'postgresql',
+            'db.statement': query.fingerprint,
+            'db.endpoint': event['endpoint'],
+            'db.rows': event['rows'] if event['rows'] is not None else -1
+        }
+    )
+    if not event['ok']:
+        query_span.set_status(Status(StatusCode.ERROR, event['error']))
+    query_span.end(end_time=end)
+
+
+def create_tracing() -> bool:
+    """
+    Configure tracing from the environment.
+
+    TRACING_EXPORTER: 'otlp' (OTLP/HTTP to OTEL_EXPORTER_OTLP_ENDPOINT, default
+    http://localhost:4318, e.g. a local collector or Jaeger) or 'console';
+    unset or 'none' leaves tracing off. TRACING_SAMPLE_RATIO (default 1.0)
+    and OTEL_SERVICE_NAME (default csr-api) are optional. Tests pass an
+    InMemorySpanExporter to configure_tracing() instead.
+
+    Returns:
+        True if tracing is on
+    """
+    exporter_name = os.getenv('TRACING_EXPORTER', 'none').lower()
+    if exporter_name == 'none':
+        return False
+    if trace is None:
+        print("TRACING_EXPORTER is set but opentelemetry-sdk is not installed; tracing is off")
+        return False
+    if exporter_name == 'otlp':
+        try:
+            from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
+        except ImportError:
+            print("TRACING_EXPORTER=otlp requires opentelemetry-exporter-otlp-proto-http; tracing is off")
+            return False
+        exporter = OTLPSpanExporter()
+    elif exporter_name == 'console':
+        exporter = ConsoleSpanExporter()
+    else:
+        raise ValueError(f"Unknown TRACING_EXPORTER '{exporter_name}' (expected otlp, console or none)")
+    configure_tracing(
+        exporter,
+        sample_ratio=float(os.getenv('TRACING_SAMPLE_RATIO', '1.0')),
+        service_name=os.getenv('OTEL_SERVICE_NAME', 'csr-api')
+    )
+    print(f"Tracing enabled ({exporter_name} exporter)")
+    return True